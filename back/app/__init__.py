@@ -5,6 +5,20 @@ from pythonjsonlogger import jsonlogger
 
 from app.config import config
 from app.extensions import db, jwt, ma, cors, limiter
+from app.utils.identity import init_identity_cache
+from app.utils.permission_matrix import init_permission_matrix
+from app.utils.passwords import passwords
+from app.utils.shared_store import shared_store
+from app.utils.token_blocklist import blocklist
+from app.utils.activity_buffer import activity
+from app.utils.scheduler import scheduler
+from app.blueprints.whoiswho.organigrama import init_organigrama_cache
+from app.blueprints.whoiswho.typeahead import init_personal_typeahead
+from app.blueprints.protocol.extraction import extractor
+from app.blueprints.search.servicies import global_search
+from app.blueprints.capacitacion.suggestions import capacitacion_suggestions
+from app.blueprints.capacitacion.stats import init_capacitacion_stats
+from app.cli import register_cli_commands
 
 
 def create_app(config_name=None):
@@ -25,6 +39,38 @@ def create_app(config_name=None):
     cors.init_app(app, resources={r"/api/*": {"origins": app.config['CORS_ORIGINS']}})
     limiter.init_app(app)
     
+    # Caché de identidades y matriz de permisos para los decoradores
+    init_identity_cache(app)
+    init_permission_matrix(app)
+    
+    # Hasher de contraseñas (algoritmo, costo y pool de verificación)
+    passwords.init_app(app)
+    
+    # Almacenamiento compartido entre workers y blocklist de tokens
+    shared_store.init_app(app)
+    blocklist.init_app(app)
+    
+    # Buffer write-behind de actividad de sesiones
+    activity.init_app(app)
+    register_activity_tracking(app)
+    
+    # Organigrama y typeahead del directorio (versión compartida entre workers)
+    init_organigrama_cache(app)
+    init_personal_typeahead(app)
+    
+    # Pool de extracción de texto de documentos de protocolos
+    extractor.init_app(app)
+    
+    # Búsqueda global en paralelo (plazo por request)
+    global_search.init_app(app)
+    
+    # Sugerencias de capacitaciones en memoria
+    capacitacion_suggestions.init_app(app)
+    init_capacitacion_stats(app)
+    
+    # Propagar el request_id del envelope en la cabecera de respuesta
+    register_request_id(app)
+    
     # Registrar blueprints
     register_blueprints(app)
     
@@ -34,6 +80,11 @@ def create_app(config_name=None):
     # JWT callbacks
     register_jwt_callbacks(app)
     
+    # Comandos de CLI y tareas programadas
+    register_cli_commands(app)
+    register_scheduled_tasks(app)
+    scheduler.init_app(app)
+    
     # Crear directorios necesarios
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'carinfo'), exist_ok=True)
@@ -71,12 +122,72 @@ def register_blueprints(app):
     from app.blueprints.whoiswho import whoiswho_bp
     from app.blueprints.protocol import protocolo_bp
     from app.blueprints.capacitacion import capacitacion_bp
+    from app.blueprints.search import search_bp
+    
+    # Presupuestos de rate limiting por blueprint (clave: usuario del JWT)
+    for bp in (carinfo_bp, whoiswho_bp, protocolo_bp, capacitacion_bp, search_bp):
+        budget = app.config['RATELIMIT_BLUEPRINTS'].get(bp.name)
+        if budget:
+            limiter.limit(budget)(bp)
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(carinfo_bp, url_prefix='/api/carinfo')
     app.register_blueprint(whoiswho_bp, url_prefix='/api/whoiswho')
     app.register_blueprint(protocolo_bp, url_prefix='/api/protocolos')
     app.register_blueprint(capacitacion_bp, url_prefix='/api/capacitaciones')
+    app.register_blueprint(search_bp, url_prefix='/api/search')
+
+
+def register_request_id(app):
+    """Devolver X-Request-ID (el recibido o el generado para la request)"""
+    from app.utils.responses import get_request_id
+    
+    @app.after_request
+    def add_request_id_header(response):
+        response.headers['X-Request-ID'] = get_request_id()
+        return response
+
+
+def register_activity_tracking(app):
+    """Registrar la última actividad de la sesión en cada request autenticada"""
+    from datetime import datetime
+    from flask_jwt_extended import get_jwt
+    
+    @app.after_request
+    def track_session_activity(response):
+        try:
+            claims = get_jwt()
+        except RuntimeError:
+            # La request no verificó ningún JWT
+            return response
+        
+        if claims.get('sid'):
+            activity.touch_session(claims['sid'], datetime.utcnow())
+        return response
+
+
+def register_scheduled_tasks(app):
+    """Registrar tareas del scheduler en proceso"""
+    from app.utils.maintenance import purge_auth_tables
+    from app.blueprints.capacitacion.alertas import evaluate_alertas
+    
+    scheduler.register(
+        'purge-auth',
+        lambda: purge_auth_tables(batch_size=app.config['MAINTENANCE_BATCH_SIZE']),
+        app.config['MAINTENANCE_PURGE_INTERVAL']
+    )
+    
+    scheduler.register(
+        'extract-documents',
+        extractor.sweep,
+        app.config['DOCUMENT_EXTRACTION_SWEEP_INTERVAL']
+    )
+    
+    scheduler.register(
+        'evaluate-alerts',
+        evaluate_alertas,
+        app.config['ALERTAS_INTERVAL']
+    )
 
 
 def register_error_handlers(app):
@@ -127,4 +238,9 @@ def register_jwt_callbacks(app):
     
     @jwt.revoked_token_loader
     def revoked_token_callback(jwt_header, jwt_payload):
-        return error_response('TOKEN_REVOKED', 'El token ha sido revocado', 401)
\ No newline at end of file
+        return error_response('TOKEN_REVOKED', 'El token ha sido revocado', 401)
+    
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        # Búsqueda en memoria; sincroniza con el almacenamiento compartido
+        return blocklist.is_revoked(jwt_payload)
\ No newline at end of file
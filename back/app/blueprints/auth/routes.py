@@ -1,23 +1,33 @@
+import time
+import uuid
 from datetime import datetime, timedelta
-from flask import request
+from flask import request, current_app
 from flask_jwt_extended import (
     create_access_token, 
     create_refresh_token,
     jwt_required,
     get_jwt_identity,
-    get_jwt
+    get_jwt,
+    get_jti,
+    decode_token
 )
-from werkzeug.security import check_password_hash
+from flask_limiter.util import get_remote_address
 
 from app.blueprints.auth import auth_bp
 from app.extensions import db, limiter
 from app.models.user import User, RefreshToken, Sesion
 from app.blueprints.auth.schemas import LoginSchema, ChangePasswordSchema
 from app.utils.responses import success_response, error_response
+from app.utils.identity import resolve_identity
+from app.utils.passwords import PasswordHasherBusy
+from app.utils.token_blocklist import blocklist
+from app.utils.rate_limit import login_rate_limit_key
+from app.utils.activity_buffer import activity, register_failed_login, reset_failed_logins
 
 
 @auth_bp.route('/login', methods=['POST'])
-@limiter.limit("5 per minute")
+@limiter.limit(lambda: current_app.config['RATELIMIT_LOGIN_PER_LEGAJO'], key_func=login_rate_limit_key)
+@limiter.limit(lambda: current_app.config['RATELIMIT_LOGIN_PER_IP'], key_func=get_remote_address)
 def login():
     """Login de usuario con validación completa"""
     
@@ -47,50 +57,65 @@ def login():
             403
         )
     
-    # Verificar contraseña
-    if not check_password_hash(user.password_hash, password):
-        # Incrementar intentos fallidos
-        user.failed_login_attempts += 1
+    # Verificar contraseña (pool acotado; re-hashea si cambió el costo)
+    try:
+        password_ok = user.check_password(password)
+    except PasswordHasherBusy:
+        return error_response('SERVICE_BUSY', 'Servicio ocupado, intente nuevamente', 503)
+    
+    if not password_ok:
+        # Incrementar intentos fallidos (contador compartido entre workers;
+        # el espejo en la base se escribe en lote)
+        lockout_minutes = current_app.config['LOGIN_LOCKOUT_MINUTES']
+        attempts = register_failed_login(user.id, window_seconds=lockout_minutes * 60)
         
-        # Bloquear cuenta después de 5 intentos fallidos
-        if user.failed_login_attempts >= 5:
-            user.account_locked_until = datetime.utcnow() + timedelta(minutes=30)
+        # Bloquear cuenta después de N intentos fallidos (se persiste de inmediato)
+        if attempts >= current_app.config['LOGIN_MAX_ATTEMPTS']:
+            user.failed_login_attempts = attempts
+            user.account_locked_until = datetime.utcnow() + timedelta(minutes=lockout_minutes)
             db.session.commit()
+            reset_failed_logins(user.id)
             return error_response(
                 'ACCOUNT_LOCKED', 
-                'Cuenta bloqueada por múltiples intentos fallidos. Intente en 30 minutos', 
+                f'Cuenta bloqueada por múltiples intentos fallidos. Intente en {lockout_minutes} minutos', 
                 403
             )
         
-        db.session.commit()
         return error_response('INVALID_CREDENTIALS', 'Credenciales inválidas', 401)
     
     # Verificar si el usuario está activo
     if not user.activo:
         return error_response('USER_INACTIVE', 'Usuario inactivo', 403)
     
-    # Login exitoso - resetear intentos fallidos
-    user.failed_login_attempts = 0
-    user.account_locked_until = None
-    user.last_login = datetime.utcnow()
+    # Login exitoso - resetear intentos fallidos (sólo se escribe si hace falta)
+    now = datetime.utcnow()
+    reset_failed_logins(user.id)
+    if user.account_locked_until is not None:
+        user.account_locked_until = None
+    
+    # last_login y el reseteo de failed_login_attempts van por el buffer write-behind
+    activity.record_login(user.id, now)
     
-    # Crear tokens JWT
-    access_token = create_access_token(identity=user.id)
-    refresh_token_jwt = create_refresh_token(identity=user.id)
+    # Crear tokens JWT ligados a la sesión (claim 'sid') para poder revocarlos juntos
+    sesion_id = str(uuid.uuid4())
+    access_token = create_access_token(identity=user.id, additional_claims={'sid': sesion_id})
+    refresh_token_jwt = create_refresh_token(identity=user.id, additional_claims={'sid': sesion_id})
     
-    # Guardar refresh token en la base de datos
+    # Guardar el JTI del refresh token (no el JWT completo)
     refresh_token_record = RefreshToken(
         user_id=user.id,
-        token=refresh_token_jwt,
-        expires_at=datetime.utcnow() + timedelta(days=30)
+        jti=get_jti(refresh_token_jwt),
+        expires_at=datetime.utcnow() + current_app.config['JWT_REFRESH_TOKEN_EXPIRES']
     )
     db.session.add(refresh_token_record)
     
     # Crear sesión
     sesion = Sesion(
+        id=sesion_id,
         user_id=user.id,
         ip_address=request.remote_addr,
         user_agent=request.headers.get('User-Agent', ''),
+        token_jti=get_jti(access_token),
         expires_at=datetime.utcnow() + timedelta(hours=24)
     )
     db.session.add(sesion)
@@ -99,6 +124,7 @@ def login():
     
     # Preparar respuesta con información del usuario
     user_data = user.to_dict(include_permissions=True)
+    user_data['last_login'] = now.isoformat()
     
     return success_response({
         'access_token': access_token,
@@ -115,17 +141,12 @@ def refresh():
     user_id = get_jwt_identity()
     
     # Verificar que el usuario existe y está activo
-    user = User.query.get(user_id)
-    if not user or not user.activo:
+    identity = resolve_identity(user_id)
+    if not identity or not identity.activo:
         return error_response('USER_INACTIVE', 'Usuario inactivo', 403)
     
-    # Verificar que el refresh token existe y no está revocado
-    refresh_token = request.json.get('refresh_token')
-    token_record = RefreshToken.query.filter_by(
-        token=refresh_token,
-        user_id=user_id,
-        revoked=False
-    ).first()
+    # Verificar que el refresh token existe y no está revocado (lookup por JTI)
+    token_record = RefreshToken.find_active(get_jwt()['jti'], user_id)
     
     if not token_record:
         return error_response('INVALID_TOKEN', 'Token inválido o revocado', 401)
@@ -134,8 +155,12 @@ def refresh():
     if token_record.expires_at < datetime.utcnow():
         return error_response('TOKEN_EXPIRED', 'Token expirado', 401)
     
-    # Crear nuevo access token
-    access_token = create_access_token(identity=user_id)
+    # Crear nuevo access token (misma sesión que el refresh token)
+    sid = get_jwt().get('sid')
+    access_token = create_access_token(
+        identity=user_id,
+        additional_claims={'sid': sid} if sid else None
+    )
     
     return success_response({
         'access_token': access_token,
@@ -148,19 +173,30 @@ def refresh():
 def logout():
     """Logout - revocar tokens"""
     user_id = get_jwt_identity()
+    claims = get_jwt()
+    
+    # Revocar el access token actual y, si existe, toda su sesión
+    blocklist.revoke_token(claims['jti'], claims['exp'])
+    if claims.get('sid'):
+        blocklist.revoke_session(
+            claims['sid'],
+            time.time() + current_app.config['JWT_REFRESH_TOKEN_EXPIRES'].total_seconds()
+        )
+        Sesion.query.filter_by(id=claims['sid'], user_id=user_id)\
+                    .update({'expires_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
     
     # Obtener refresh token del request
-    refresh_token = request.json.get('refresh_token')
+    refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
     
     if refresh_token:
-        # Revocar el refresh token
-        token_record = RefreshToken.query.filter_by(
-            token=refresh_token,
-            user_id=user_id
-        ).first()
+        try:
+            refresh_jti = decode_token(refresh_token, allow_expired=True)['jti']
+        except Exception:
+            refresh_jti = None
         
-        if token_record:
-            token_record.revoked = True
+        # Revocar el refresh token en una sola sentencia indexada
+        if refresh_jti and RefreshToken.revoke(refresh_jti, user_id):
             db.session.commit()
     
     return success_response(message='Logout exitoso')
@@ -199,20 +235,27 @@ def change_password():
     if not user:
         return error_response('USER_NOT_FOUND', 'Usuario no encontrado', 404)
     
-    # Verificar contraseña actual
-    if not check_password_hash(user.password_hash, data['old_password']):
-        return error_response('INVALID_PASSWORD', 'Contraseña actual incorrecta', 401)
-    
-    # Actualizar contraseña
-    from werkzeug.security import generate_password_hash
-    user.password_hash = generate_password_hash(data['new_password'])
-    user.password_changed_at = datetime.utcnow()
+    try:
+        # Verificar contraseña actual
+        if not user.check_password(data['old_password']):
+            return error_response('INVALID_PASSWORD', 'Contraseña actual incorrecta', 401)
+        
+        # Actualizar contraseña
+        user.set_password(data['new_password'])
+    except PasswordHasherBusy:
+        return error_response('SERVICE_BUSY', 'Servicio ocupado, intente nuevamente', 503)
     
     # Revocar todos los refresh tokens del usuario
-    RefreshToken.query.filter_by(user_id=user_id, revoked=False).update({'revoked': True})
+    RefreshToken.revoke_all(user_id)
     
     db.session.commit()
     
+    # Invalidar también los access tokens ya emitidos
+    blocklist.revoke_user_tokens(
+        user_id,
+        time.time() + current_app.config['JWT_REFRESH_TOKEN_EXPIRES'].total_seconds()
+    )
+    
     return success_response(message='Contraseña cambiada exitosamente')
 
 
@@ -253,4 +296,36 @@ def revoke_session(session_id):
     db.session.delete(sesion)
     db.session.commit()
     
-    return success_response(message='Sesión revocada exitosamente')
\ No newline at end of file
+    # Los tokens de la sesión dejan de ser válidos de inmediato
+    blocklist.revoke_session(
+        session_id,
+        time.time() + current_app.config['JWT_REFRESH_TOKEN_EXPIRES'].total_seconds()
+    )
+    
+    return success_response(message='Sesión revocada exitosamente')
+
+@auth_bp.route('/permissions', methods=['GET', 'POST'])
+@jwt_required()
+def check_permissions():
+    """
+    Verificar varios permisos en una sola llamada.
+    GET ?check=a,b,c  |  POST {"permissions": ["a", "b", "c"]}
+    """
+    identity = resolve_identity(get_jwt_identity())
+    if not identity or not identity.activo:
+        return error_response('USER_INACTIVE', 'Usuario inactivo', 403)
+    
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        requested = data.get('permissions', []) if isinstance(data, dict) else None
+    else:
+        requested = [p for p in request.args.get('check', '').split(',') if p]
+    
+    if not isinstance(requested, list) or not all(isinstance(p, str) for p in requested):
+        return error_response('VALIDATION_ERROR', 'permissions debe ser una lista de textos', 400)
+    
+    return success_response({
+        'role': identity.role_name,
+        'permissions': identity.permissions,
+        'checks': identity.check_permissions(requested)
+    })
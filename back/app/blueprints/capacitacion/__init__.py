@@ -1,6 +1,8 @@
-from flask import Blueprint, request, send_file
+from flask import Blueprint, Response, current_app, request, send_file, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
+import csv
+import io
 import os
 from datetime import datetime
 
@@ -9,19 +11,29 @@ from app.models import Capacitacion, ParticipanteCapacitacion, Personal, AuditLo
 from app.utils.responses import success_response, error_response, paginated_response
 from app.utils.validators import validate_file_upload
 from app.utils.permissions import require_permission
+from app.utils.pagination import get_pagination_args, paginate_query, InvalidCursor
+from app.blueprints.whoiswho.typeahead import personal_typeahead
+from app.blueprints.capacitacion.suggestions import capacitacion_suggestions, KINDS
+from app.blueprints.capacitacion.stats import capacitacion_stats
+from app.blueprints.capacitacion.tendencias import tendencias_por_periodo
+from app.blueprints.capacitacion.alertas import alertas_vigentes
+from app.blueprints.capacitacion import cumplimiento
+from app.blueprints.capacitacion.inscripcion import inscribir_masivo
 
 capacitacion_bp = Blueprint('capacitacion', __name__)
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf'}
 
+# Campos que acepta la actualización masiva de participantes
+BULK_UPDATE_FIELDS = {'asistio', 'aprobado', 'observaciones'}
+
 
 @capacitacion_bp.route('', methods=['GET'])
 @jwt_required()
 def get_capacitaciones():
     """Obtener lista de capacitaciones con filtros y paginación"""
     try:
-        page = request.args.get('page', 1, type=int)
-        limit = request.args.get('limit', 20, type=int)
+        pagination = get_pagination_args()
         area = request.args.get('area')
         modalidad = request.args.get('modalidad')
         es_obligatorio = request.args.get('es_obligatorio')
@@ -38,24 +50,31 @@ def get_capacitaciones():
         if es_obligatorio is not None:
             query = query.filter_by(es_obligatorio=es_obligatorio == 'true')
         
-        if search:
-            query = query.filter(
-                db.or_(
-                    Capacitacion.nombre.ilike(f'%{search}%'),
-                    Capacitacion.detalle.ilike(f'%{search}%')
-                )
-            )
+        search_filter = Capacitacion.search_filter(search)
+        if search_filter is not None:
+            query = query.filter(search_filter)
         
-        total = query.count()
-        capacitaciones = query.order_by(Capacitacion.fecha.desc()).offset((page - 1) * limit).limit(limit).all()
+        result = paginate_query(
+            query,
+            [(Capacitacion.fecha, 'desc'), (Capacitacion.id, 'desc')],
+            **pagination
+        )
+        
+        if search_filter is not None and result.items and pagination['page'] == 1 and not pagination['cursor']:
+            capacitacion_suggestions.record_search(search)
         
         return paginated_response(
-            data=[c.to_dict() for c in capacitaciones],
-            page=page,
-            limit=limit,
-            total=total
+            data=Capacitacion.serialize_many(result.items),
+            page=result.page,
+            limit=result.limit,
+            total=result.total,
+            next_cursor=result.next_cursor,
+            has_more=result.has_more,
+            total_estimated=result.total_estimated
         )
     
+    except InvalidCursor as e:
+        return error_response('INVALID_CURSOR', str(e), 400)
     except Exception as e:
         return error_response('FETCH_ERROR', str(e), 500)
 
@@ -219,6 +238,52 @@ def delete_capacitacion(capacitacion_id):
         return error_response('DELETE_ERROR', str(e), 500)
 
 
+@capacitacion_bp.route('/<capacitacion_id>/participantes', methods=['GET'])
+@jwt_required()
+def get_participantes(capacitacion_id):
+    """Obtener participantes de una capacitación, paginados"""
+    try:
+        capacitacion = Capacitacion.query.get(capacitacion_id)
+        
+        if not capacitacion or not capacitacion.activo:
+            return error_response('NOT_FOUND', 'Capacitación no encontrada', 404)
+        
+        pagination = get_pagination_args(default_limit=50)
+        asistio = request.args.get('asistio')
+        aprobado = request.args.get('aprobado')
+        
+        query = ParticipanteCapacitacion.with_personal().filter(
+            ParticipanteCapacitacion.capacitacion_id == capacitacion_id
+        )
+        
+        if asistio is not None:
+            query = query.filter(ParticipanteCapacitacion.asistio == (asistio == 'true'))
+        
+        if aprobado is not None:
+            query = query.filter(ParticipanteCapacitacion.aprobado == (aprobado == 'true'))
+        
+        result = paginate_query(
+            query,
+            [(ParticipanteCapacitacion.created_at, 'asc'), (ParticipanteCapacitacion.id, 'asc')],
+            **pagination
+        )
+        
+        return paginated_response(
+            data=[p.to_dict() for p in result.items],
+            page=result.page,
+            limit=result.limit,
+            total=result.total,
+            next_cursor=result.next_cursor,
+            has_more=result.has_more,
+            total_estimated=result.total_estimated
+        )
+    
+    except InvalidCursor as e:
+        return error_response('INVALID_CURSOR', str(e), 400)
+    except Exception as e:
+        return error_response('FETCH_ERROR', str(e), 500)
+
+
 @capacitacion_bp.route('/<capacitacion_id>/participantes', methods=['POST'])
 @jwt_required()
 @require_permission('capacitaciones.gestionar_participantes')
@@ -394,7 +459,7 @@ def get_capacitaciones_personal(personal_id):
         if not personal or not personal.activo:
             return error_response('NOT_FOUND', 'Personal no encontrado', 404)
         
-        participaciones = ParticipanteCapacitacion.query.filter_by(
+        participaciones = ParticipanteCapacitacion.with_personal().filter_by(
             personal_id=personal_id
         ).join(Capacitacion).filter(Capacitacion.activo == True).all()
         
@@ -406,75 +471,16 @@ def get_capacitaciones_personal(personal_id):
 @capacitacion_bp.route('/stats', methods=['GET'])
 @jwt_required()
 def get_stats():
-    """Obtener estadísticas para el dashboard"""
+    """Obtener estadísticas para el dashboard (mes, trimestre o año)"""
     try:
-        periodo = request.args.get('periodo', 'mes')
-        
-        # Calcular fechas según período
-        from datetime import datetime, timedelta
-        now = datetime.utcnow()
-        if periodo == 'mes':
-            fecha_inicio = now - timedelta(days=30)
-        elif periodo == 'trimestre':
-            fecha_inicio = now - timedelta(days=90)
-        else:  # año
-            fecha_inicio = now - timedelta(days=365)
-        
-        # Estadísticas principales
-        total_capacitaciones = Capacitacion.query.filter_by(activo=True).count()
-        
-        # Capacitaciones por estado
-        proximas = Capacitacion.query.filter(
-            Capacitacion.activo == True,
-            Capacitacion.fecha > now
-        ).count()
-        
-        completadas = Capacitacion.query.filter(
-            Capacitacion.activo == True,
-            Capacitacion.fecha <= now
-        ).count()
-        
-        caducadas = Capacitacion.query.filter(
-            Capacitacion.activo == True,
-            Capacitacion.fecha_caducidad < now
-        ).count()
-        
-        # Participantes activos
-        participantes_activos = db.session.query(
-            ParticipanteCapacitacion.personal_id
-        ).distinct().count()
-        
-        # Tasas de asistencia y aprobación
-        total_participaciones = ParticipanteCapacitacion.query.count()
-        asistencias = ParticipanteCapacitacion.query.filter_by(asistio=True).count()
-        aprobaciones = ParticipanteCapacitacion.query.filter_by(aprobado=True).count()
-        
-        tasa_asistencia = round((asistencias / total_participaciones) * 100) if total_participaciones > 0 else 0
-        tasa_aprobacion = round((aprobaciones / total_participaciones) * 100) if total_participaciones > 0 else 0
-        
-        # Capacitaciones por tipo
-        por_tipo = db.session.query(
-            Capacitacion.tipo_formacion,
-            db.func.count(Capacitacion.id).label('cantidad')
-        ).filter_by(activo=True).group_by(Capacitacion.tipo_formacion).all()
-        
-        return success_response({
-            'total_capacitaciones': total_capacitaciones,
-            'participantes_activos': participantes_activos,
-            'tasa_asistencia': tasa_asistencia,
-            'tasa_aprobacion': tasa_aprobacion,
-            'proximas': proximas,
-            'completadas': completadas,
-            'caducadas': caducadas,
-            'por_tipo': [{'tipo_formacion': t[0], 'cantidad': t[1]} for t in por_tipo]
-        })
+        return success_response(capacitacion_stats.get(request.args.get('periodo', 'mes')))
     except Exception as e:
         return error_response('STATS_ERROR', str(e), 500)
 
 @capacitacion_bp.route('/search', methods=['GET'])
 @jwt_required()
 def search_intelligent():
-    """Búsqueda inteligente por conceptos"""
+    """Búsqueda inteligente por conceptos (la búsqueda global es /api/search)"""
     try:
         query = request.args.get('q', '')
         include_personal = request.args.get('include_personal', 'false') == 'true'
@@ -486,49 +492,33 @@ def search_intelligent():
             'conceptos': []
         }
         
-        if len(query) < 3:
+        search_filter = Capacitacion.search_filter(query)
+        if len(query) < 3 or search_filter is None:
             return success_response(results)
         
         # Buscar capacitaciones
         capacitaciones = Capacitacion.query.filter(
             Capacitacion.activo == True,
-            db.or_(
-                Capacitacion.nombre.ilike(f'%{query}%'),
-                Capacitacion.detalle.ilike(f'%{query}%'),
-                Capacitacion.area.ilike(f'%{query}%'),
-                Capacitacion.tipo_formacion.ilike(f'%{query}%')
-            )
+            search_filter
         ).limit(10).all()
         
-        results['capacitaciones'] = [c.to_dict() for c in capacitaciones]
+        results['capacitaciones'] = Capacitacion.serialize_many(capacitaciones)
+        if capacitaciones:
+            capacitacion_suggestions.record_search(query)
         
         # Buscar personal si se solicita
         if include_personal:
-            from app.models import Personal
-            personal = Personal.query.filter(
-                Personal.activo == True,
-                db.or_(
-                    Personal.nombre.ilike(f'%{query}%'),
-                    Personal.apellido.ilike(f'%{query}%'),
-                    Personal.legajo.ilike(f'%{query}%'),
-                    Personal.area.ilike(f'%{query}%')
-                )
-            ).limit(5).all()
-            
-            results['personal'] = [p.to_dict() for p in personal]
+            # Índice de typeahead en memoria; se lee sólo la página de ids
+            ids = personal_typeahead.search_ids(query, limit=5)
+            personal = {p.id: p for p in Personal.query.filter(Personal.id.in_(ids))} if ids else {}
+            results['personal'] = [personal[pid].to_dict() for pid in ids if pid in personal]
         
         # Conceptos relacionados si se solicita
         if include_concepts:
-            # Buscar términos similares en base a palabras existentes
-            conceptos_query = db.session.query(
-                Capacitacion.tipo_formacion.label('term'),
-                db.func.count().label('count')
-            ).filter(
-                Capacitacion.activo == True,
-                Capacitacion.tipo_formacion.ilike(f'%{query}%')
-            ).group_by(Capacitacion.tipo_formacion).all()
-            
-            results['conceptos'] = [{'term': c.term, 'count': c.count} for c in conceptos_query]
+            # Tipos de formación que empiezan con alguna palabra de la búsqueda (en memoria)
+            results['conceptos'] = capacitacion_suggestions.suggest(
+                query, limit=10, kinds=('tipo_formacion',)
+            )
         
         return success_response(results)
     except Exception as e:
@@ -537,17 +527,17 @@ def search_intelligent():
 @capacitacion_bp.route('/suggestions', methods=['GET'])
 @jwt_required()
 def get_suggestions():
-    """Obtener sugerencias populares para búsqueda"""
+    """Obtener sugerencias populares para búsqueda (por prefijo con ?q=)"""
     try:
-        # Términos más frecuentes
-        suggestions = db.session.query(
-            Capacitacion.tipo_formacion.label('term'),
-            db.func.count().label('count')
-        ).filter_by(activo=True).group_by(
-            Capacitacion.tipo_formacion
-        ).order_by(db.desc('count')).limit(8).all()
-        
-        return success_response([{'term': s.term, 'count': s.count} for s in suggestions])
+        limit = max(1, min(request.args.get('limit', 8, type=int) or 8, 50))
+        kinds = None
+        if request.args.get('tipo'):
+            kinds = tuple(k for k in request.args['tipo'].split(',') if k in KINDS + ('busqueda',))
+        
+        suggestions = capacitacion_suggestions.suggest(
+            request.args.get('q', ''), limit=limit, kinds=kinds
+        )
+        return success_response(suggestions)
     except Exception as e:
         return error_response('SUGGESTIONS_ERROR', str(e), 500)
 
@@ -556,140 +546,40 @@ def get_suggestions():
 @require_permission('capacitaciones.asignar')
 def asignacion_masiva(capacitacion_id):
     """Asignación masiva de personal a capacitación"""
-    try:
-        capacitacion = Capacitacion.query.get(capacitacion_id)
-        if not capacitacion or not capacitacion.activo:
-            return error_response('NOT_FOUND', 'Capacitación no encontrada', 404)
-        
-        data = request.get_json()
-        personal_ids = data.get('personal_ids', [])
-        
-        if not personal_ids:
-            return error_response('VALIDATION_ERROR', 'Debe seleccionar al menos un personal', 400)
-        
-        # Verificar que no estén ya inscritos
-        ya_inscritos = ParticipanteCapacitacion.query.filter(
-            ParticipanteCapacitacion.capacitacion_id == capacitacion_id,
-            ParticipanteCapacitacion.personal_id.in_(personal_ids)
-        ).all()
-        
-        ids_ya_inscritos = [p.personal_id for p in ya_inscritos]
-        ids_nuevos = [pid for pid in personal_ids if pid not in ids_ya_inscritos]
-        
-        # Agregar nuevos participantes
-        for personal_id in ids_nuevos:
-            participante = ParticipanteCapacitacion(
-                capacitacion_id=capacitacion_id,
-                personal_id=personal_id
-            )
-            db.session.add(participante)
-        
-        db.session.commit()
-        
-        # Registrar auditoría
-        user_id = get_jwt_identity()
-        AuditLog.log(
-            user_id=user_id,
-            accion='ASIGNACION_MASIVA',
-            modulo='CAPACITACIONES',
-            detalles={
-                'capacitacion_id': capacitacion_id,
-                'personal_agregado': len(ids_nuevos),
-                'ya_inscritos': len(ids_ya_inscritos)
-            }
-        )
-        
-        return success_response({
-            'agregados': len(ids_nuevos),
-            'ya_inscritos': len(ids_ya_inscritos),
-            'total_intentos': len(personal_ids)
-        }, f'Se agregaron {len(ids_nuevos)} participantes exitosamente')
-        
-    except Exception as e:
-        db.session.rollback()
-        return error_response('ASIGNACION_ERROR', str(e), 500)
+    return _inscripcion_masiva(capacitacion_id)
 
 @capacitacion_bp.route('/<capacitacion_id>/participantes/bulk', methods=['POST'])
 @jwt_required()
 @require_permission('capacitaciones.gestionar_participantes')  
 def bulk_add_participantes(capacitacion_id):
     """Agregar múltiples participantes"""
+    return _inscripcion_masiva(capacitacion_id)
+
+def _inscripcion_masiva(capacitacion_id):
+    """Inscribir personal_ids por lotes; informa insertados, omitidos y no encontrados"""
     try:
         capacitacion = Capacitacion.query.get(capacitacion_id)
         if not capacitacion or not capacitacion.activo:
             return error_response('NOT_FOUND', 'Capacitación no encontrada', 404)
         
-        data = request.get_json()
+        data = request.get_json() or {}
         personal_ids = data.get('personal_ids', [])
         
-        if not personal_ids:
+        if not isinstance(personal_ids, list) or not personal_ids:
             return error_response('VALIDATION_ERROR', 'Debe seleccionar al menos un personal', 400)
         
-        # Convertir IDs a string si vienen como números
-        personal_ids = [str(pid) for pid in personal_ids]
-        
-        # Verificar que el personal existe
-        from app.models import Personal  # Ajustar el import según tu estructura
-        personal_existente = Personal.query.filter(Personal.id.in_(personal_ids)).all()
-        personal_existente_ids = [p.id for p in personal_existente]
-        
-        # Verificar personal que no existe
-        personal_no_existe = [pid for pid in personal_ids if pid not in personal_existente_ids]
-        if personal_no_existe:
-            return error_response('VALIDATION_ERROR', 
-                f'Personal no encontrado: {", ".join(personal_no_existe)}', 400)
-        
-        # Verificar que no estén ya inscritos
-        ya_inscritos = ParticipanteCapacitacion.query.filter(
-            ParticipanteCapacitacion.capacitacion_id == capacitacion_id,
-            ParticipanteCapacitacion.personal_id.in_(personal_ids)
-        ).all()
-        
-        ids_ya_inscritos = [p.personal_id for p in ya_inscritos]
-        ids_nuevos = [pid for pid in personal_ids if pid not in ids_ya_inscritos]
-        
-        # Agregar nuevos participantes
-        participantes_nuevos = []
-        for personal_id in ids_nuevos:
-            participante = ParticipanteCapacitacion(
-                capacitacion_id=capacitacion_id,
-                personal_id=personal_id
-            )
-            db.session.add(participante)
-            participantes_nuevos.append(participante)
-        
-        # Commit la inserción antes de la auditoría
-        db.session.commit()
-        
-        # Registrar auditoría DESPUÉS del commit
-        try:
-            user_id = get_jwt_identity()
-            AuditLog.log(
-                user_id=user_id,
-                accion='ASIGNACION_MASIVA',
-                modulo='CAPACITACIONES',
-                detalles={
-                    'capacitacion_id': capacitacion_id,
-                    'personal_agregado': len(ids_nuevos),
-                    'ya_inscritos': len(ids_ya_inscritos),
-                    'personal_ids': ids_nuevos
-                }
-            )
-            db.session.commit()
-        except Exception as audit_error:
-            # Si falla la auditoría, solo loggear pero no fallar la operación
-            print(f"Error en auditoría: {audit_error}")
+        resultado = inscribir_masivo(
+            capacitacion, personal_ids, get_jwt_identity(),
+            chunk_size=current_app.config['INSCRIPCION_CHUNK_SIZE']
+        )
         
-        return success_response({
-            'agregados': len(ids_nuevos),
-            'ya_inscritos': len(ids_ya_inscritos),
-            'total_intentos': len(personal_ids),
-            'personal_no_encontrado': personal_no_existe
-        }, f'Se agregaron {len(ids_nuevos)} participantes exitosamente')
+        return success_response(
+            resultado.to_dict(),
+            f'Se agregaron {len(resultado.insertados)} participantes exitosamente'
+        )
         
     except Exception as e:
         db.session.rollback()
-        print(f"Error en bulk_add_participantes: {str(e)}")
         return error_response('ASIGNACION_ERROR', f'Error en la asignación masiva: {str(e)}', 500)
 
 @capacitacion_bp.route('/<capacitacion_id>/participantes/bulk', methods=['PUT'])
@@ -705,13 +595,21 @@ def bulk_update_participantes(capacitacion_id):
         if not participante_ids or not updates:
             return error_response('VALIDATION_ERROR', 'Datos insuficientes', 400)
         
-        # Actualizar participantes
-        query = ParticipanteCapacitacion.query.filter(
+        # Sólo campos de seguimiento; por objeto para mantener estadísticas y tendencias
+        campos_invalidos = set(updates) - BULK_UPDATE_FIELDS
+        if campos_invalidos:
+            return error_response('VALIDATION_ERROR',
+                f'Campos no actualizables: {", ".join(sorted(campos_invalidos))}', 400)
+        
+        participantes = ParticipanteCapacitacion.query.filter(
             ParticipanteCapacitacion.capacitacion_id == capacitacion_id,
             ParticipanteCapacitacion.id.in_(participante_ids)
-        )
+        ).all()
         
-        updated_count = query.update(updates)
+        for participante in participantes:
+            for campo, valor in updates.items():
+                setattr(participante, campo, valor)
+        updated_count = len(participantes)
         db.session.commit()
         
         return success_response({
@@ -762,7 +660,8 @@ def export_to_excel(capacitaciones):
     import pandas as pd
     from io import BytesIO
     
-    # Convertir a DataFrame
+    # Convertir a DataFrame (participantes agregados en una sola consulta)
+    stats = ParticipanteCapacitacion.stats_by_capacitacion([c.id for c in capacitaciones])
     data = []
     for c in capacitaciones:
         row = {
@@ -772,7 +671,7 @@ def export_to_excel(capacitaciones):
             'Modalidad': c.modalidad,
             'Área': c.area,
             'Obligatorio': 'Sí' if c.es_obligatorio else 'No',
-            'Participantes': len(c.participantes) if c.participantes else 0
+            'Participantes': stats.get(c.id, ParticipanteCapacitacion.EMPTY_STATS)['total']
         }
         data.append(row)
     
@@ -795,42 +694,131 @@ def export_to_excel(capacitaciones):
 @capacitacion_bp.route('/alertas', methods=['GET'])
 @jwt_required()
 def get_alertas():
-    """Obtener alertas importantes"""
+    """Obtener alertas importantes (última evaluación del motor de alertas)"""
     try:
-        alertas = []
-        now = datetime.utcnow()
-        
-        # Capacitaciones próximas a caducar (30 días)
-        proximas_caducar = Capacitacion.query.filter(
-            Capacitacion.activo == True,
-            Capacitacion.fecha_caducidad.between(now, now + timedelta(days=30))
-        ).count()
-        
-        if proximas_caducar > 0:
-            alertas.append({
-                'titulo': f'{proximas_caducar} capacitaciones próximas a caducar',
-                'descripcion': 'Requieren renovación en los próximos 30 días',
-                'fecha': now.strftime('%Y-%m-%d'),
-                'tipo': 'warning'
-            })
-        
-        # Capacitaciones con baja asistencia
-        # ... más lógica de alertas
-        
-        return success_response(alertas)
+        return success_response(alertas_vigentes(max_age=current_app.config['ALERTAS_MAX_AGE']))
     except Exception as e:
         return error_response('ALERTAS_ERROR', str(e), 500)
 
 @capacitacion_bp.route('/tendencias', methods=['GET'])
 @jwt_required()
 def get_tendencias():
-    """Obtener tendencias de participación"""
+    """Obtener tendencias de participación (desde los agregados diarios)"""
+    try:
+        return success_response(tendencias_por_periodo(
+            request.args.get('periodo', 'mes'),
+            area=request.args.get('area'),
+            tipo_formacion=request.args.get('tipo_formacion'),
+            modalidad=request.args.get('modalidad')
+        ))
+    except Exception as e:
+        return error_response('TENDENCIAS_ERROR', str(e), 500)
+
+def _filtros_cumplimiento():
+    return {
+        name: request.args.get(name)
+        for name in ('area', 'dependencia', 'rango', 'capacitacion_id', 'personal_id', 'estado')
+    }
+
+@capacitacion_bp.route('/cumplimiento', methods=['GET'])
+@jwt_required()
+def get_cumplimiento():
+    """Matriz de cumplimiento de obligatorias (por área, dependencia, rango y estado)"""
     try:
-        periodo = request.args.get('periodo', 'mes')
+        pagination = get_pagination_args()
+        filtros = _filtros_cumplimiento()
+        if filtros['estado'] and filtros['estado'] not in cumplimiento.ESTADOS_FILTRO:
+            return error_response('VALIDATION_ERROR',
+                f'Estado inválido. Opciones: {", ".join(cumplimiento.ESTADOS_FILTRO)}', 400)
         
-        # Lógica para calcular tendencias por período
-        # ... implementar según necesidades
+        now = datetime.utcnow()
+        result = paginate_query(cumplimiento.cumplimiento_query(filtros, now), cumplimiento.KEYSET, **pagination)
+        
+        return paginated_response(
+            data=[cumplimiento.serialize(row, now) for row in result.items],
+            page=result.page,
+            limit=result.limit,
+            total=result.total,
+            next_cursor=result.next_cursor,
+            has_more=result.has_more,
+            total_estimated=result.total_estimated
+        )
+    
+    except InvalidCursor as e:
+        return error_response('INVALID_CURSOR', str(e), 400)
+    except Exception as e:
+        return error_response('CUMPLIMIENTO_ERROR', str(e), 500)
+
+@capacitacion_bp.route('/cumplimiento/resumen', methods=['GET'])
+@jwt_required()
+def get_cumplimiento_resumen():
+    """Totales de cumplimiento agrupados por área, dependencia o rango"""
+    try:
+        agrupar = request.args.get('agrupar', 'area')
+        filtros = _filtros_cumplimiento()
+        if agrupar not in cumplimiento.AGRUPACIONES:
+            return error_response('VALIDATION_ERROR',
+                f'Agrupación inválida. Opciones: {", ".join(cumplimiento.AGRUPACIONES)}', 400)
+        if filtros['estado'] and filtros['estado'] not in cumplimiento.ESTADOS_FILTRO:
+            return error_response('VALIDATION_ERROR',
+                f'Estado inválido. Opciones: {", ".join(cumplimiento.ESTADOS_FILTRO)}', 400)
+        
+        return success_response(cumplimiento.resumen_cumplimiento(agrupar, filtros, datetime.utcnow()))
+    except Exception as e:
+        return error_response('CUMPLIMIENTO_ERROR', str(e), 500)
+
+@capacitacion_bp.route('/cumplimiento/export', methods=['GET'])
+@jwt_required()
+@require_permission('capacitaciones.exportar')
+def export_cumplimiento():
+    """Exportar la matriz de cumplimiento filtrada (csv por streaming o excel)"""
+    try:
+        formato = request.args.get('formato', 'csv')  # csv, excel
+        filtros = _filtros_cumplimiento()
+        if filtros['estado'] and filtros['estado'] not in cumplimiento.ESTADOS_FILTRO:
+            return error_response('VALIDATION_ERROR',
+                f'Estado inválido. Opciones: {", ".join(cumplimiento.ESTADOS_FILTRO)}', 400)
         
-        return success_response([])
+        now = datetime.utcnow()
+        filename = f'cumplimiento_{now.strftime("%Y%m%d")}'
+        rows = cumplimiento.export_rows(filtros, now)
+        
+        if formato == 'csv':
+            return Response(
+                stream_with_context(_csv_stream(cumplimiento.EXPORT_COLUMNS, rows)),
+                mimetype='text/csv',
+                headers={'Content-Disposition': f'attachment; filename={filename}.csv'}
+            )
+        elif formato == 'excel':
+            import pandas as pd
+            
+            output = io.BytesIO()
+            with pd.ExcelWriter(output, engine='openpyxl') as writer:
+                pd.DataFrame(list(rows), columns=cumplimiento.EXPORT_COLUMNS)\
+                    .to_excel(writer, sheet_name='Cumplimiento', index=False)
+            output.seek(0)
+            
+            return send_file(
+                output,
+                as_attachment=True,
+                download_name=f'{filename}.xlsx',
+                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+        else:
+            return error_response('FORMAT_ERROR', 'Formato no soportado', 400)
+    
     except Exception as e:
-        return error_response('TENDENCIAS_ERROR', str(e), 500)
\ No newline at end of file
+        return error_response('EXPORT_ERROR', str(e), 500)
+
+def _csv_stream(columns, rows, chunk_size=64 * 1024):
+    """CSV en bloques de ~64 KB (sin armar el archivo completo en memoria)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,257 @@
+"""
+Motor de alertas del dashboard de capacitaciones.
+
+Cada regla es una función `regla(now) -> [alerta]` que resuelve todos los
+casos con una consulta agregada (sin recorrer capacitaciones una por una).
+El scheduler evalúa todas las reglas cada ALERTAS_INTERVAL segundos y guarda
+el resultado en `resumen_alertas` con la fecha de generación; /alertas sólo
+lee esa fila. Si la evaluación tiene más de ALERTAS_MAX_AGE segundos (por
+ejemplo, con el scheduler apagado) la request que la lee la regenera, con
+un lock compartido para que la regenere una sola.
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, distinct, func
+
+from app.extensions import db
+from app.models.protocolo import Capacitacion, ParticipanteCapacitacion, Protocolo, ResumenAlertas
+from app.utils.shared_store import shared_store
+
+logger = logging.getLogger(__name__)
+
+MODULO = 'capacitaciones'
+
+# Umbrales de las reglas
+DIAS_AVISO_CADUCIDAD = 30
+DIAS_BAJA_ASISTENCIA = 90
+MIN_PARTICIPANTES_ASISTENCIA = 5
+TASA_ASISTENCIA_MINIMA = 0.6
+OCUPACION_AVISO = 0.9
+DIAS_AVISO_PROTOCOLOS = 30
+
+# Capacitaciones o protocolos que se detallan por alerta
+MAX_ITEMS = 10
+
+_SEVERIDAD = {'danger': 0, 'warning': 1, 'info': 2}
+
+
+def _alerta(regla, tipo, titulo, descripcion, cantidad, items):
+    return {
+        'regla': regla,
+        'tipo': tipo,
+        'titulo': titulo,
+        'descripcion': descripcion,
+        'cantidad': cantidad,
+        'items': items[:MAX_ITEMS]
+    }
+
+
+def _fecha(value):
+    return value.isoformat() if value else None
+
+
+# --- Reglas -------------------------------------------------------------------
+
+def regla_caducidad_proxima(now):
+    """Capacitaciones activas que caducan en los próximos días"""
+    rows = db.session.query(Capacitacion.id, Capacitacion.nombre, Capacitacion.fecha_caducidad)\
+        .filter(Capacitacion.activo == True,
+                Capacitacion.fecha_caducidad.between(now, now + timedelta(days=DIAS_AVISO_CADUCIDAD)))\
+        .order_by(Capacitacion.fecha_caducidad)\
+        .all()
+    if not rows:
+        return []
+    return [_alerta(
+        'caducidad_proxima', 'warning',
+        f'{len(rows)} capacitaciones próximas a caducar',
+        f'Requieren renovación en los próximos {DIAS_AVISO_CADUCIDAD} días',
+        len(rows),
+        [{'id': r.id, 'nombre': r.nombre, 'fecha_caducidad': _fecha(r.fecha_caducidad)} for r in rows]
+    )]
+
+
+def regla_certificaciones_por_vencer(now):
+    """Personal aprobado en capacitaciones con certificación que caduca pronto"""
+    P = ParticipanteCapacitacion
+    personal, capacitaciones = db.session.query(
+        func.count(distinct(P.personal_id)),
+        func.count(distinct(P.capacitacion_id))
+    ).join(Capacitacion, Capacitacion.id == P.capacitacion_id).filter(
+        Capacitacion.activo == True,
+        Capacitacion.certificacion == True,
+        Capacitacion.fecha_caducidad.between(now, now + timedelta(days=DIAS_AVISO_CADUCIDAD)),
+        P.aprobado == True
+    ).one()
+    if not personal:
+        return []
+    return [_alerta(
+        'certificaciones_por_vencer', 'warning',
+        f'{personal} certificaciones por vencer',
+        f'Personal aprobado en {capacitaciones} capacitaciones cuya certificación '
+        f'caduca en los próximos {DIAS_AVISO_CADUCIDAD} días',
+        personal, []
+    )]
+
+
+def regla_baja_asistencia(now):
+    """Capacitaciones recientes con asistencia por debajo del mínimo"""
+    P = ParticipanteCapacitacion
+    total = func.count(P.id)
+    asistieron = func.sum(case((P.asistio == True, 1), else_=0))
+    rows = db.session.query(
+        Capacitacion.id, Capacitacion.nombre, Capacitacion.fecha, total.label('total'),
+        asistieron.label('asistieron')
+    ).join(P, P.capacitacion_id == Capacitacion.id).filter(
+        Capacitacion.activo == True,
+        Capacitacion.fecha.between(now - timedelta(days=DIAS_BAJA_ASISTENCIA), now)
+    ).group_by(
+        Capacitacion.id, Capacitacion.nombre, Capacitacion.fecha
+    ).having(
+        total >= MIN_PARTICIPANTES_ASISTENCIA,
+        asistieron < total * TASA_ASISTENCIA_MINIMA
+    ).order_by((asistieron * 1.0 / total)).all()
+    if not rows:
+        return []
+    return [_alerta(
+        'baja_asistencia', 'warning',
+        f'{len(rows)} capacitaciones con baja asistencia',
+        f'Asistencia menor al {round(TASA_ASISTENCIA_MINIMA * 100)}% en los últimos '
+        f'{DIAS_BAJA_ASISTENCIA} días',
+        len(rows),
+        [{
+            'id': r.id, 'nombre': r.nombre, 'fecha': _fecha(r.fecha),
+            'tasa_asistencia': round(int(r.asistieron or 0) / r.total * 100)
+        } for r in rows]
+    )]
+
+
+def regla_ocupacion(now):
+    """Capacitaciones próximas completas o con sobrecupo"""
+    P = ParticipanteCapacitacion
+    inscriptos = func.count(P.id)
+    rows = db.session.query(
+        Capacitacion.id, Capacitacion.nombre, Capacitacion.fecha, Capacitacion.capacidad_maxima,
+        inscriptos.label('inscriptos')
+    ).join(P, P.capacitacion_id == Capacitacion.id).filter(
+        Capacitacion.activo == True,
+        Capacitacion.fecha > now,
+        Capacitacion.capacidad_maxima > 0
+    ).group_by(
+        Capacitacion.id, Capacitacion.nombre, Capacitacion.fecha, Capacitacion.capacidad_maxima
+    ).having(
+        inscriptos >= Capacitacion.capacidad_maxima * OCUPACION_AVISO
+    ).order_by(Capacitacion.fecha).all()
+
+    def item(r):
+        return {'id': r.id, 'nombre': r.nombre, 'fecha': _fecha(r.fecha),
+                'inscriptos': r.inscriptos, 'capacidad_maxima': r.capacidad_maxima}
+
+    excedidas = [item(r) for r in rows if r.inscriptos > r.capacidad_maxima]
+    completas = [item(r) for r in rows if r.inscriptos <= r.capacidad_maxima]
+    alertas = []
+    if excedidas:
+        alertas.append(_alerta(
+            'sobrecupo', 'danger',
+            f'{len(excedidas)} capacitaciones con sobrecupo',
+            'Tienen más inscriptos que su capacidad máxima',
+            len(excedidas), excedidas
+        ))
+    if completas:
+        alertas.append(_alerta(
+            'cupo_completo', 'info',
+            f'{len(completas)} capacitaciones con cupo casi completo',
+            f'Ocupación igual o mayor al {round(OCUPACION_AVISO * 100)}% de la capacidad',
+            len(completas), completas
+        ))
+    return alertas
+
+
+def regla_protocolos_validez(now):
+    """Protocolos activos vencidos o que vencen pronto"""
+    rows = db.session.query(Protocolo.id, Protocolo.nombre, Protocolo.fecha_validez)\
+        .filter(Protocolo.activo == True,
+                Protocolo.fecha_validez < now + timedelta(days=DIAS_AVISO_PROTOCOLOS))\
+        .order_by(Protocolo.fecha_validez)\
+        .all()
+
+    def item(r):
+        return {'id': r.id, 'nombre': r.nombre, 'fecha_validez': _fecha(r.fecha_validez)}
+
+    vencidos = [item(r) for r in rows if r.fecha_validez < now]
+    por_vencer = [item(r) for r in rows if r.fecha_validez >= now]
+    alertas = []
+    if vencidos:
+        alertas.append(_alerta(
+            'protocolos_vencidos', 'danger',
+            f'{len(vencidos)} protocolos vencidos',
+            'Su fecha de validez ya pasó y siguen activos',
+            len(vencidos), vencidos
+        ))
+    if por_vencer:
+        alertas.append(_alerta(
+            'protocolos_por_vencer', 'warning',
+            f'{len(por_vencer)} protocolos por vencer',
+            f'Vencen en los próximos {DIAS_AVISO_PROTOCOLOS} días',
+            len(por_vencer), por_vencer
+        ))
+    return alertas
+
+
+REGLAS = [
+    regla_caducidad_proxima,
+    regla_certificaciones_por_vencer,
+    regla_baja_asistencia,
+    regla_ocupacion,
+    regla_protocolos_validez
+]
+
+
+# --- Evaluación y lectura -----------------------------------------------------
+
+def evaluate_alertas(now=None):
+    """Evaluar todas las reglas y guardar el resultado. Retorna el resumen"""
+    now = now or datetime.utcnow()
+    start = time.monotonic()
+
+    alertas = []
+    for regla in REGLAS:
+        try:
+            alertas.extend(regla(now))
+        except Exception:
+            # Una regla con error no descarta las demás
+            db.session.rollback()
+            logger.exception('Error al evaluar la regla de alertas %s', regla.__name__)
+    alertas.sort(key=lambda a: _SEVERIDAD.get(a['tipo'], 3))
+
+    resumen = ResumenAlertas.query.get(MODULO)
+    if resumen is None:
+        resumen = ResumenAlertas(modulo=MODULO)
+        db.session.add(resumen)
+    resumen.alertas = alertas
+    resumen.generado_en = now
+    resumen.duracion_ms = round((time.monotonic() - start) * 1000)
+    db.session.commit()
+    return resumen
+
+
+def alertas_vigentes(max_age=1800):
+    """Alertas de la última evaluación (se regenera si no hay o es muy vieja)"""
+    resumen = ResumenAlertas.query.get(MODULO)
+    expired = resumen is None or datetime.utcnow() - resumen.generado_en > timedelta(seconds=max_age)
+
+    if expired and shared_store.add(f'alertas:{MODULO}:evaluando', '1', ttl=60):
+        try:
+            resumen = evaluate_alertas()
+        finally:
+            shared_store.delete(f'alertas:{MODULO}:evaluando')
+
+    if resumen is None:
+        return []
+
+    generado_en = resumen.generado_en.isoformat()
+    return [
+        {**alerta, 'fecha': resumen.generado_en.strftime('%Y-%m-%d'), 'generado_en': generado_en}
+        for alerta in resumen.alertas
+    ]
@@ -0,0 +1,398 @@
+"""
+Matriz de cumplimiento de capacitaciones obligatorias.
+
+`cumplimiento_capacitaciones` tiene una fila por persona activa y por
+capacitación obligatoria activa que le corresponde, con la inscripción, la
+aprobación y la fecha de caducidad de la capacitación. El estado (vigente,
+vencido, inscripto, pendiente) se deriva al consultar, así que el paso del
+tiempo no requiere recalcular nada.
+
+La tabla se mantiene en el mismo flush que las escrituras:
+- participantes: se recalculan los pares persona/capacitación tocados;
+- capacitaciones: si cambia la obligatoriedad o el alcance, sus filas se
+  recalculan con un INSERT ... SELECT sobre personal (si sólo cambia la
+  caducidad, se actualiza `vence_en`);
+- personal: si cambia el alta, el legajo, el rango, el cargo, el área o la
+  dependencia, se recalculan sus filas.
+Las escrituras por sentencia (INSERT/UPDATE masivos) deben llamar a
+`refresh_personal`. Para la carga inicial o tras cambios hechos fuera de la
+aplicación: `flask maintenance backfill-cumplimiento`.
+
+Alcance de una capacitación: `nivel_jerarquico` vacío o "Todos los niveles"
+aplica a todos los rangos; si no, a los rangos de ese nivel según
+RANGOS_POR_NIVEL (un nivel que no está en la tabla se compara tal cual con
+el rango). `puestos_objetivo` (lista JSON o separada por comas) restringe
+por cargo. Las comparaciones ignoran mayúsculas y espacios en los extremos.
+"""
+import json
+
+from sqlalchemy import DateTime, String, and_, case, delete, event, func, insert, inspect, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.personal import Personal
+from app.models.protocolo import Capacitacion, ParticipanteCapacitacion, CumplimientoCapacitacion
+
+TODOS_LOS_NIVELES = 'todos los niveles'
+
+RANGOS_POR_NIVEL = {
+    'oficial superior': ('superintendente', 'comisario general', 'comisario mayor',
+                         'comisario inspector', 'comisario'),
+    'oficial subalterno': ('subcomisario', 'principal', 'inspector', 'subinspector', 'ayudante'),
+    'suboficial superior': ('suboficial mayor', 'suboficial principal', 'sargento ayudante',
+                            'sargento primero'),
+    'suboficial subalterno': ('sargento', 'cabo primero', 'cabo'),
+    'tropa': ('agente',)
+}
+
+ESTADOS = ('vigente', 'vencido', 'inscripto', 'pendiente')
+# Además de los estados: 'incumplido' = sin aprobar o vencido
+ESTADOS_FILTRO = ESTADOS + ('incumplido',)
+AGRUPACIONES = ('area', 'dependencia', 'rango')
+
+# Orden de los reportes (legajo es único por persona)
+KEYSET = [(CumplimientoCapacitacion.legajo, 'asc'), (CumplimientoCapacitacion.capacitacion_id, 'asc')]
+
+EXPORT_COLUMNS = ('Legajo', 'Apellido', 'Nombre', 'Rango', 'Área', 'Dependencia',
+                  'Capacitación', 'Estado', 'Vence')
+
+_DIMENSIONS = ('area', 'dependencia', 'rango')
+_COLUMNS = ('personal_id', 'capacitacion_id', 'legajo') + _DIMENSIONS + ('inscripto', 'aprobado', 'vence_en')
+
+
+# --- Alcance ------------------------------------------------------------------
+
+def _norm(value):
+    return (value or '').strip().lower()
+
+
+def _sql_norm(column):
+    return func.lower(func.trim(column))
+
+
+def _lista(value):
+    """Valores de un campo JSON (lista) o separado por comas, normalizados"""
+    if not value:
+        return []
+    try:
+        items = json.loads(value)
+    except ValueError:
+        items = value.split(',')
+    if not isinstance(items, list):
+        items = [items]
+    return [_norm(item) for item in items if isinstance(item, str) and item.strip()]
+
+
+def alcance(nivel_jerarquico, puestos_objetivo):
+    """(rangos, puestos) a los que aplica una capacitación; None = sin restricción"""
+    niveles = _lista(nivel_jerarquico)
+    rangos = None
+    if niveles and TODOS_LOS_NIVELES not in niveles:
+        rangos = set()
+        for nivel in niveles:
+            rangos.update(RANGOS_POR_NIVEL.get(nivel, (nivel,)))
+    return rangos, set(_lista(puestos_objetivo)) or None
+
+
+def _aplica(rangos, puestos, persona):
+    return (rangos is None or _norm(persona.rango) in rangos) and \
+        (puestos is None or _norm(persona.cargo) in puestos)
+
+
+def _alcance_filter(rangos, puestos):
+    clauses = []
+    if rangos is not None:
+        clauses.append(_sql_norm(Personal.rango).in_(sorted(rangos)))
+    if puestos is not None:
+        clauses.append(_sql_norm(Personal.cargo).in_(sorted(puestos)))
+    return clauses
+
+
+# --- Mantenimiento ------------------------------------------------------------
+
+def _obligatorias():
+    return select(
+        Capacitacion.id, Capacitacion.fecha_caducidad, Capacitacion.nivel_jerarquico,
+        Capacitacion.puestos_objetivo
+    ).where(Capacitacion.activo == True, Capacitacion.es_obligatorio == True)
+
+
+def _aprobado():
+    return func.max(case((ParticipanteCapacitacion.aprobado == True, 1), else_=0))
+
+
+def refresh_capacitacion(executor, capacitacion_id):
+    """Recalcular las filas de una capacitación (INSERT ... SELECT). Retorna filas"""
+    table = CumplimientoCapacitacion.__table__
+    executor.execute(delete(table).where(table.c.capacitacion_id == capacitacion_id))
+
+    curso = executor.execute(_obligatorias().where(Capacitacion.id == capacitacion_id)).first()
+    if curso is None:
+        return 0
+
+    P = ParticipanteCapacitacion
+    participaciones = select(P.personal_id, _aprobado().label('aprobado'))\
+        .where(P.capacitacion_id == capacitacion_id)\
+        .group_by(P.personal_id)\
+        .subquery()
+
+    query = select(
+        Personal.id,
+        literal(capacitacion_id, String),
+        Personal.legajo,
+        *(func.coalesce(getattr(Personal, name), '') for name in _DIMENSIONS),
+        participaciones.c.personal_id.isnot(None),
+        func.coalesce(participaciones.c.aprobado, 0) == 1,
+        literal(curso.fecha_caducidad, DateTime)
+    ).select_from(Personal)\
+     .outerjoin(participaciones, participaciones.c.personal_id == Personal.id)\
+     .where(Personal.activo == True,
+            *_alcance_filter(*alcance(curso.nivel_jerarquico, curso.puestos_objetivo)))
+
+    return executor.execute(insert(table).from_select(_COLUMNS, query)).rowcount
+
+
+def refresh_personal(executor, personal_ids, capacitacion_ids=None):
+    """
+    Recalcular las filas de estas personas (sólo de `capacitacion_ids` si se
+    indican). Retorna las filas escritas
+    """
+    personal_ids = list(personal_ids)
+    if not personal_ids:
+        return 0
+
+    table = CumplimientoCapacitacion.__table__
+    cursos = _obligatorias()
+    scope = [table.c.personal_id.in_(personal_ids)]
+    if capacitacion_ids is not None:
+        capacitacion_ids = list(capacitacion_ids)
+        cursos = cursos.where(Capacitacion.id.in_(capacitacion_ids))
+        scope.append(table.c.capacitacion_id.in_(capacitacion_ids))
+    cursos = executor.execute(cursos).all()
+    if not cursos and capacitacion_ids is not None:
+        # Ninguna es obligatoria: no tienen filas
+        return 0
+
+    executor.execute(delete(table).where(*scope))
+    if not cursos:
+        return 0
+
+    personas = executor.execute(select(
+        Personal.id, Personal.legajo, Personal.rango, Personal.cargo, Personal.area, Personal.dependencia
+    ).where(Personal.id.in_(personal_ids), Personal.activo == True)).all()
+    if not personas:
+        return 0
+
+    P = ParticipanteCapacitacion
+    participaciones = {
+        (personal_id, capacitacion_id): aprobado
+        for personal_id, capacitacion_id, aprobado in executor.execute(select(
+            P.personal_id, P.capacitacion_id, _aprobado()
+        ).where(
+            P.personal_id.in_(personal_ids),
+            P.capacitacion_id.in_([curso.id for curso in cursos])
+        ).group_by(P.personal_id, P.capacitacion_id))
+    }
+
+    alcances = [(curso, alcance(curso.nivel_jerarquico, curso.puestos_objetivo)) for curso in cursos]
+    rows = []
+    for persona in personas:
+        for curso, (rangos, puestos) in alcances:
+            if not _aplica(rangos, puestos, persona):
+                continue
+            aprobado = participaciones.get((persona.id, curso.id))
+            rows.append({
+                'personal_id': persona.id,
+                'capacitacion_id': curso.id,
+                'legajo': persona.legajo,
+                **{name: getattr(persona, name) or '' for name in _DIMENSIONS},
+                'inscripto': aprobado is not None,
+                'aprobado': bool(aprobado),
+                'vence_en': curso.fecha_caducidad
+            })
+
+    if rows:
+        executor.execute(insert(table), rows)
+    return len(rows)
+
+
+def backfill_cumplimiento():
+    """Recalcular toda la matriz desde personal y participantes. Retorna filas"""
+    db.session.execute(delete(CumplimientoCapacitacion.__table__))
+    ids = [capacitacion_id for (capacitacion_id,) in db.session.execute(
+        select(Capacitacion.id).where(Capacitacion.activo == True, Capacitacion.es_obligatorio == True)
+    )]
+    total = sum(refresh_capacitacion(db.session, capacitacion_id) for capacitacion_id in ids)
+    db.session.commit()
+    return total
+
+
+_PARTICIPANTE_FIELDS = ('personal_id', 'capacitacion_id', 'aprobado')
+_CAPACITACION_FIELDS = ('activo', 'es_obligatorio', 'nivel_jerarquico', 'puestos_objetivo', 'fecha_caducidad')
+_PERSONAL_FIELDS = ('activo', 'legajo', 'rango', 'cargo', 'area', 'dependencia')
+
+
+def _changed(obj, fields):
+    attrs = inspect(obj).attrs
+    return [name for name in fields if getattr(attrs, name).history.has_changes()]
+
+
+def _previous(obj, name):
+    history = getattr(inspect(obj).attrs, name).history
+    return history.deleted[0] if history.deleted else (history.unchanged or [None])[0]
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_cumplimiento(session, flush_context):
+    capacitaciones = set()  # recalcular todas sus filas
+    caducidades = {}        # capacitacion_id -> nueva fecha_caducidad (único cambio)
+    personas = set()        # recalcular todas sus filas
+    pares = set()           # (personal_id, capacitacion_id) de participantes
+
+    for obj in session.new:
+        if isinstance(obj, ParticipanteCapacitacion):
+            pares.add((obj.personal_id, obj.capacitacion_id))
+        elif isinstance(obj, Capacitacion) and obj.es_obligatorio:
+            capacitaciones.add(obj.id)
+        elif isinstance(obj, Personal):
+            personas.add(obj.id)
+
+    for obj in session.dirty:
+        if isinstance(obj, ParticipanteCapacitacion) and _changed(obj, _PARTICIPANTE_FIELDS):
+            pares.add((_previous(obj, 'personal_id'), _previous(obj, 'capacitacion_id')))
+            pares.add((obj.personal_id, obj.capacitacion_id))
+        elif isinstance(obj, Capacitacion):
+            changed = _changed(obj, _CAPACITACION_FIELDS)
+            if changed == ['fecha_caducidad']:
+                caducidades[obj.id] = obj.fecha_caducidad
+            elif changed:
+                capacitaciones.add(obj.id)
+        elif isinstance(obj, Personal) and _changed(obj, _PERSONAL_FIELDS):
+            personas.add(obj.id)
+
+    for obj in session.deleted:
+        if isinstance(obj, ParticipanteCapacitacion):
+            pares.add((_previous(obj, 'personal_id'), _previous(obj, 'capacitacion_id')))
+        elif isinstance(obj, Capacitacion):
+            capacitaciones.add(obj.id)
+        elif isinstance(obj, Personal):
+            personas.add(obj.id)
+
+    # Los pares de personas o capacitaciones que se recalculan completas sobran
+    pares = {(p, c) for p, c in pares if p not in personas and c not in capacitaciones}
+    if not (capacitaciones or caducidades or personas or pares):
+        return
+
+    conn = session.connection()
+    table = CumplimientoCapacitacion.__table__
+    for capacitacion_id, vence_en in caducidades.items():
+        if capacitacion_id not in capacitaciones:
+            conn.execute(update(table).where(table.c.capacitacion_id == capacitacion_id)
+                         .values(vence_en=vence_en))
+    for capacitacion_id in capacitaciones:
+        refresh_capacitacion(conn, capacitacion_id)
+    if personas:
+        refresh_personal(conn, personas)
+    if pares:
+        refresh_personal(conn, {p for p, _ in pares}, {c for _, c in pares})
+
+
+# --- Consulta -----------------------------------------------------------------
+
+def _estado_filters(now):
+    CC = CumplimientoCapacitacion
+    return {
+        'vigente': and_(CC.aprobado == True, or_(CC.vence_en.is_(None), CC.vence_en >= now)),
+        'vencido': and_(CC.aprobado == True, CC.vence_en < now),
+        'inscripto': and_(CC.inscripto == True, CC.aprobado == False),
+        'pendiente': CC.inscripto == False,
+        'incumplido': or_(CC.aprobado == False, CC.vence_en < now)
+    }
+
+
+def estado(row, now):
+    if row.aprobado:
+        return 'vencido' if row.vence_en is not None and row.vence_en < now else 'vigente'
+    return 'inscripto' if row.inscripto else 'pendiente'
+
+
+def _filtrar(query, filtros, now):
+    """area, dependencia, rango, capacitacion_id, personal_id y estado (ESTADOS_FILTRO)"""
+    CC = CumplimientoCapacitacion
+    for name in _DIMENSIONS + ('capacitacion_id', 'personal_id'):
+        if filtros.get(name):
+            query = query.filter(getattr(CC, name) == filtros[name])
+    if filtros.get('estado'):
+        query = query.filter(_estado_filters(now)[filtros['estado']])
+    return query
+
+
+def cumplimiento_query(filtros, now):
+    """Filas de la matriz con nombre de la persona y de la capacitación (ordenar por KEYSET)"""
+    CC = CumplimientoCapacitacion
+    query = db.session.query(
+        CC.personal_id, CC.legajo, Personal.nombre, Personal.apellido,
+        CC.area, CC.dependencia, CC.rango, CC.capacitacion_id,
+        Capacitacion.nombre.label('capacitacion'), CC.inscripto, CC.aprobado, CC.vence_en
+    ).join(Personal, Personal.id == CC.personal_id)\
+     .join(Capacitacion, Capacitacion.id == CC.capacitacion_id)
+    return _filtrar(query, filtros, now)
+
+
+def serialize(row, now):
+    return {
+        'personal_id': row.personal_id,
+        'legajo': row.legajo,
+        'nombre_completo': f'{row.nombre} {row.apellido}',
+        'area': row.area or None,
+        'dependencia': row.dependencia or None,
+        'rango': row.rango or None,
+        'capacitacion_id': row.capacitacion_id,
+        'capacitacion': row.capacitacion,
+        'estado': estado(row, now),
+        'inscripto': row.inscripto,
+        'aprobado': row.aprobado,
+        'vence_en': row.vence_en.isoformat() if row.vence_en else None
+    }
+
+
+def resumen_cumplimiento(agrupar, filtros, now):
+    """Totales por estado agrupados por área, dependencia o rango (un GROUP BY)"""
+    CC = CumplimientoCapacitacion
+    column = getattr(CC, agrupar)
+    estados = _estado_filters(now)
+
+    def contar(nombre):
+        return func.sum(case((estados[nombre], 1), else_=0))
+
+    query = db.session.query(
+        column, func.count(), contar('vigente'), contar('vencido'), contar('inscripto')
+    )
+    rows = _filtrar(query, filtros, now).group_by(column).order_by(column).all()
+
+    result = []
+    for valor, total, vigentes, vencidos, inscriptos in rows:
+        vigentes, vencidos, inscriptos = int(vigentes or 0), int(vencidos or 0), int(inscriptos or 0)
+        result.append({
+            agrupar: valor or None,
+            'total': total,
+            'vigentes': vigentes,
+            'vencidos': vencidos,
+            'inscriptos': inscriptos,
+            'pendientes': total - vigentes - vencidos - inscriptos,
+            'porcentaje_cumplimiento': round(vigentes / total * 100, 1) if total else 0
+        })
+    return result
+
+
+def export_rows(filtros, now, batch_size=2000):
+    """Filas de la exportación (EXPORT_COLUMNS), leídas por lotes"""
+    query = cumplimiento_query(filtros, now)\
+        .order_by(*(column.asc() for column, _ in KEYSET))\
+        .yield_per(batch_size)
+    for row in query:
+        yield [
+            row.legajo, row.apellido, row.nombre, row.rango, row.area, row.dependencia,
+            row.capacitacion, estado(row, now).capitalize(),
+            row.vence_en.strftime('%Y-%m-%d') if row.vence_en else ''
+        ]
@@ -0,0 +1,144 @@
+"""
+Inscripción masiva de personal a una capacitación.
+
+Los ids (sin repetidos) se procesan en lotes de INSCRIPCION_CHUNK_SIZE (como
+máximo `max_chunk_size`: el tope de parámetros por sentencia del motor
+dividido por las columnas de cada fila). Por
+lote: una consulta indica qué personal existe y está activo, un INSERT ...
+ON CONFLICT DO NOTHING de varias filas inscribe a los que faltan (el índice
+único (capacitacion_id, personal_id) descarta a los ya inscriptos, incluso
+si otra request los inscribe en paralelo) y se registra una auditoría. Cada
+lote se confirma por separado, así que la memoria no depende del total.
+
+El INSERT no pasa por el flush: las tendencias y la matriz de cumplimiento
+se actualizan en la misma transacción del lote y las estadísticas se
+invalidan solas (INSERT por sentencia sobre participantes).
+"""
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import delete, func, select
+
+from app.extensions import db
+from app.models import AuditLog, ParticipanteCapacitacion, Personal
+from app.blueprints.capacitacion.tendencias import add_participaciones
+from app.blueprints.capacitacion.cumplimiento import refresh_personal
+from app.utils.upsert import insert_missing
+
+UNIQUE_INDEX = 'uq_participantes_capacitacion_personal'
+
+# Columnas de cada fila del INSERT (un parámetro por columna y fila)
+COLUMNS = ('id', 'capacitacion_id', 'personal_id', 'fecha_inscripcion', 'asistio', 'aprobado', 'created_at')
+
+# Parámetros por sentencia según el motor (SQLite >= 3.32); otros, el menor
+MAX_BIND_PARAMS = {'postgresql': 65535, 'sqlite': 32766}
+DEFAULT_MAX_BIND_PARAMS = 32766
+
+
+@dataclass
+class Inscripcion:
+    """Resultado de una inscripción masiva (ids en el orden recibido)"""
+    total_intentos: int = 0
+    insertados: list = field(default_factory=list)
+    ya_inscriptos: list = field(default_factory=list)
+    no_encontrados: list = field(default_factory=list)
+
+    def to_dict(self):
+        return {
+            'agregados': len(self.insertados),
+            'ya_inscritos': len(self.ya_inscriptos),
+            'total_intentos': self.total_intentos,
+            'insertados': self.insertados,
+            'omitidos': self.ya_inscriptos,
+            'personal_no_encontrado': self.no_encontrados
+        }
+
+
+def _inscribir_lote(capacitacion, lote, user_id, accion, resultado):
+    existentes = {
+        pid for (pid,) in db.session.execute(
+            select(Personal.id).where(Personal.id.in_(lote), Personal.activo == True)
+        )
+    }
+
+    now = datetime.utcnow()
+    rows = [
+        dict(zip(COLUMNS, (str(uuid.uuid4()), capacitacion.id, pid, now, False, False, now)))
+        for pid in lote if pid in existentes
+    ]
+    insertados = set(insert_missing(
+        db.session, ParticipanteCapacitacion.__table__, rows,
+        keys=('capacitacion_id', 'personal_id'), returning='personal_id'
+    ))
+
+    if insertados:
+        add_participaciones(db.session, capacitacion, len(insertados))
+        refresh_personal(db.session, insertados, [capacitacion.id])
+
+    agregados = [pid for pid in lote if pid in insertados]
+    ya_inscriptos = [pid for pid in lote if pid in existentes and pid not in insertados]
+    no_encontrados = [pid for pid in lote if pid not in existentes]
+
+    # AuditLog.log confirma el lote junto con la auditoría
+    AuditLog.log(
+        user_id=user_id,
+        accion=accion,
+        modulo='CAPACITACIONES',
+        detalles={
+            'capacitacion_id': capacitacion.id,
+            'personal_agregado': len(agregados),
+            'ya_inscritos': len(ya_inscriptos),
+            'no_encontrados': len(no_encontrados),
+            'personal_ids': agregados
+        }
+    )
+
+    resultado.insertados.extend(agregados)
+    resultado.ya_inscriptos.extend(ya_inscriptos)
+    resultado.no_encontrados.extend(no_encontrados)
+
+
+def max_chunk_size(dialect_name):
+    """Filas por INSERT sin superar el tope de parámetros del motor"""
+    return MAX_BIND_PARAMS.get(dialect_name, DEFAULT_MAX_BIND_PARAMS) // len(COLUMNS)
+
+
+def inscribir_masivo(capacitacion, personal_ids, user_id, accion='ASIGNACION_MASIVA', chunk_size=1000):
+    """
+    Inscribir `personal_ids` en `capacitacion`. Los lotes ya confirmados
+    quedan inscriptos aunque falle uno posterior.
+    """
+    chunk_size = max(1, min(chunk_size, max_chunk_size(db.session.get_bind().dialect.name)))
+    personal_ids = list(dict.fromkeys(str(pid) for pid in personal_ids if pid))
+    resultado = Inscripcion(total_intentos=len(personal_ids))
+
+    for start in range(0, len(personal_ids), chunk_size):
+        try:
+            _inscribir_lote(capacitacion, personal_ids[start:start + chunk_size], user_id, accion, resultado)
+        except Exception:
+            db.session.rollback()
+            raise
+    return resultado
+
+
+def dedupe_participantes():
+    """
+    Borrar inscripciones repetidas (queda la aprobada, la que tiene asistencia
+    o la más antigua) y crear el índice único si falta. Retorna filas borradas
+    """
+    P = ParticipanteCapacitacion
+    orden = func.row_number().over(
+        partition_by=(P.capacitacion_id, P.personal_id),
+        order_by=(func.coalesce(P.aprobado, False).desc(), func.coalesce(P.asistio, False).desc(),
+                  P.created_at, P.id)
+    )
+    ranked = select(P.id, orden.label('orden')).subquery()
+    result = db.session.execute(delete(P.__table__).where(
+        P.__table__.c.id.in_(select(ranked.c.id).where(ranked.c.orden > 1))
+    ))
+    db.session.commit()
+
+    index = next(i for i in P.__table__.indexes if i.name == UNIQUE_INDEX)
+    index.create(db.engine, checkfirst=True)
+    return result.rowcount
@@ -0,0 +1,324 @@
+"""
+Estadísticas del dashboard de capacitaciones (/capacitaciones/stats).
+
+Se calculan con dos consultas de agregados condicionales (capacitaciones
+del período agrupadas por tipo de formación, y sus participaciones) y se
+guardan en memoria por período. Las escrituras confirmadas las ajustan:
+
+- altas de capacitaciones y altas, bajas y cambios de asistencia o
+  aprobación de participantes se suman o restan sobre la copia (un alta o
+  baja de participante sólo obliga a recontar el personal distinto);
+- cambios de fecha, caducidad, tipo o estado de capacitaciones, y las
+  escrituras masivas, descartan la copia (se recalcula en la próxima
+  lectura).
+
+Los estados dependen de la hora: cada copia vence en el próximo instante en
+que una capacitación pasa a completada o caducada o sale de la ventana del
+período, o a los CAPACITACION_STATS_TTL segundos. Los demás workers ven los
+cambios por la versión compartida `stats:capacitacion:version`.
+"""
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case, distinct, event, func, inspect
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.protocolo import Capacitacion, ParticipanteCapacitacion
+from app.utils.shared_store import shared_store
+
+_VERSION_KEY = 'stats:capacitacion:version'
+
+# Días hacia atrás de cada período; otro valor se toma como año
+PERIODOS = {'mes': 30, 'trimestre': 90, 'año': 365}
+PERIODO_DEFAULT = 'año'
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+class _Stats:
+    """Agregados de un período y hasta cuándo siguen siendo válidos"""
+
+    def __init__(self, periodo, now):
+        self.periodo = periodo
+        self.dias = PERIODOS[periodo]
+        self.fecha_inicio = now - timedelta(days=self.dias)
+        self.generado_en = now
+        self.actualizado_en = now
+        self.valido_hasta = None
+        self.total = self.proximas = self.caducadas = 0
+        self.por_tipo = {}
+        self.participaciones = self.asistencias = self.aprobaciones = 0
+        self.personal = None  # personal distinto; None = recontar
+
+    def en_periodo(self, activo, fecha):
+        return bool(activo) and fecha is not None and fecha >= self.fecha_inicio
+
+    def vence_en(self, *instantes):
+        for instante in instantes:
+            if instante is not None and (self.valido_hasta is None or instante < self.valido_hasta):
+                self.valido_hasta = instante
+
+    def agregar_capacitacion(self, values, now):
+        if not self.en_periodo(values['activo'], values['fecha']):
+            return
+        self.total += 1
+        if values['fecha'] > now:
+            self.proximas += 1
+        if values['fecha_caducidad'] is not None and values['fecha_caducidad'] < now:
+            self.caducadas += 1
+        tipo = values['tipo_formacion']
+        self.por_tipo[tipo] = self.por_tipo.get(tipo, 0) + 1
+        self.vence_en(
+            values['fecha'] if values['fecha'] > now else None,
+            values['fecha_caducidad'] if values['fecha_caducidad'] and values['fecha_caducidad'] >= now else None,
+            values['fecha'] + timedelta(days=self.dias)
+        )
+
+    def ajustar_participante(self, change):
+        activo, fecha, before, after = change
+        if not self.en_periodo(activo, fecha):
+            return
+        for values, sign in ((before, -1), (after, 1)):
+            if values is not None:
+                self.participaciones += sign
+                self.asistencias += sign * bool(values['asistio'])
+                self.aprobaciones += sign * bool(values['aprobado'])
+        if (before is None) != (after is None):
+            self.personal = None
+
+    def to_dict(self):
+        def tasa(parte):
+            return round((parte / self.participaciones) * 100) if self.participaciones > 0 else 0
+
+        return {
+            'periodo': self.periodo,
+            'fecha_inicio': _iso(self.fecha_inicio),
+            'total_capacitaciones': self.total,
+            'participantes_activos': self.personal,
+            'tasa_asistencia': tasa(self.asistencias),
+            'tasa_aprobacion': tasa(self.aprobaciones),
+            'proximas': self.proximas,
+            'completadas': self.total - self.proximas,
+            'caducadas': self.caducadas,
+            'por_tipo': [
+                {'tipo_formacion': tipo, 'cantidad': cantidad}
+                for tipo, cantidad in self.por_tipo.items() if cantidad > 0
+            ],
+            'generado_en': _iso(self.generado_en),
+            'actualizado_en': _iso(self.actualizado_en)
+        }
+
+
+def _scope(stats):
+    return and_(Capacitacion.activo == True, Capacitacion.fecha >= stats.fecha_inicio)
+
+
+def _count_personal(stats):
+    return db.session.query(func.count(distinct(ParticipanteCapacitacion.personal_id)))\
+        .join(Capacitacion, Capacitacion.id == ParticipanteCapacitacion.capacitacion_id)\
+        .filter(_scope(stats))\
+        .scalar() or 0
+
+
+def compute_stats(periodo, now=None, ttl=300):
+    """Estadísticas de un período con dos consultas de agregados condicionales"""
+    now = now or datetime.utcnow()
+    stats = _Stats(periodo, now)
+
+    rows = db.session.query(
+        Capacitacion.tipo_formacion,
+        func.count(Capacitacion.id),
+        func.sum(case((Capacitacion.fecha > now, 1), else_=0)),
+        func.sum(case((Capacitacion.fecha_caducidad < now, 1), else_=0)),
+        func.min(Capacitacion.fecha),
+        func.min(case((Capacitacion.fecha > now, Capacitacion.fecha))),
+        func.min(case((Capacitacion.fecha_caducidad >= now, Capacitacion.fecha_caducidad)))
+    ).filter(_scope(stats)).group_by(Capacitacion.tipo_formacion).all()
+
+    stats.vence_en(now + timedelta(seconds=ttl))
+    for tipo, total, proximas, caducadas, primera, proxima, caducidad in rows:
+        stats.total += total
+        stats.proximas += int(proximas or 0)
+        stats.caducadas += int(caducadas or 0)
+        stats.por_tipo[tipo] = total
+        stats.vence_en(primera + timedelta(days=stats.dias) if primera else None, proxima, caducidad)
+
+    P = ParticipanteCapacitacion
+    participaciones, personal, asistencias, aprobaciones = db.session.query(
+        func.count(P.id),
+        func.count(distinct(P.personal_id)),
+        func.sum(case((P.asistio == True, 1), else_=0)),
+        func.sum(case((P.aprobado == True, 1), else_=0))
+    ).join(Capacitacion, Capacitacion.id == P.capacitacion_id).filter(_scope(stats)).one()
+
+    stats.participaciones = participaciones or 0
+    stats.personal = personal or 0
+    stats.asistencias = int(asistencias or 0)
+    stats.aprobaciones = int(aprobaciones or 0)
+    return stats
+
+
+class CapacitacionStats:
+
+    def __init__(self):
+        self.ttl = 300
+        self._entries = {}  # periodo -> _Stats
+        self._version = None
+        self._lock = threading.RLock()
+
+    def configure(self, ttl=None):
+        if ttl is not None:
+            self.ttl = ttl
+
+    def get(self, periodo):
+        periodo = periodo if periodo in PERIODOS else PERIODO_DEFAULT
+        version = str(shared_store.get(_VERSION_KEY) or 0)
+        now = datetime.utcnow()
+
+        with self._lock:
+            if version != self._version:
+                self._entries, self._version = {}, version
+
+            stats = self._entries.get(periodo)
+            if stats is None or now >= stats.valido_hasta:
+                stats = self._entries[periodo] = compute_stats(periodo, now, self.ttl)
+            elif stats.personal is None:
+                stats.personal = _count_personal(stats)
+            return stats.to_dict()
+
+    def invalidate(self):
+        with self._lock:
+            self._entries = {}
+
+    def apply_committed(self, capacitaciones, participantes, complete=True):
+        """
+        Ajustar las copias con cambios confirmados por este worker y avisar
+        a los demás. Con complete=False se descartan.
+        """
+        version = str(shared_store.incr(_VERSION_KEY))
+        now = datetime.utcnow()
+
+        with self._lock:
+            # Si alguien más escribió en el medio, lo propio no alcanza
+            if not complete or self._version is None or int(self._version) + 1 != int(version):
+                self._entries = {}
+                return
+
+            self._version = version
+            for stats in self._entries.values():
+                for values in capacitaciones:
+                    stats.agregar_capacitacion(values, now)
+                for change in participantes:
+                    stats.ajustar_participante(change)
+                stats.actualizado_en = now
+
+
+capacitacion_stats = CapacitacionStats()
+
+
+def init_capacitacion_stats(app):
+    capacitacion_stats.configure(ttl=app.config.get('CAPACITACION_STATS_TTL'))
+
+
+# --- Sincronización con escrituras --------------------------------------------
+
+_PENDING_KEY = 'capacitacion_stats_pending'
+_BULK_KEY = 'capacitacion_stats_bulk'
+
+_CAPACITACION_FIELDS = ('activo', 'fecha', 'fecha_caducidad', 'tipo_formacion')
+_PARTICIPANTE_FIELDS = ('asistio', 'aprobado')
+_TABLES = {Capacitacion.__tablename__, ParticipanteCapacitacion.__tablename__}
+
+
+def _changed(obj, fields):
+    attrs = inspect(obj).attrs
+    return any(getattr(attrs, name).history.has_changes() for name in fields)
+
+
+def _previous(obj, fields):
+    attrs = inspect(obj).attrs
+    values = {}
+    for name in fields:
+        history = getattr(attrs, name).history
+        values[name] = history.deleted[0] if history.deleted else (history.unchanged or [None])[0]
+    return values
+
+
+def _participante_change(session, obj, before, after):
+    """(activo y fecha de la capacitación, valores anteriores, valores nuevos)"""
+    # Las capacitaciones nuevas todavía no están en el identity map
+    capacitacion = next(
+        (o for o in session.new if isinstance(o, Capacitacion) and o.id == obj.capacitacion_id), None
+    )
+    if capacitacion is None:
+        with session.no_autoflush:
+            capacitacion = session.get(Capacitacion, obj.capacitacion_id)
+    if capacitacion is None:
+        return None
+    return capacitacion.activo, capacitacion.fecha, before, after
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_stats_changes(session, flush_context):
+    capacitaciones, participantes, bulk = [], [], False
+
+    for obj in session.new:
+        if isinstance(obj, Capacitacion):
+            capacitaciones.append({name: getattr(obj, name) for name in _CAPACITACION_FIELDS})
+        elif isinstance(obj, ParticipanteCapacitacion):
+            after = {name: getattr(obj, name) for name in _PARTICIPANTE_FIELDS}
+            participantes.append(_participante_change(session, obj, None, after))
+
+    for obj in session.dirty:
+        if isinstance(obj, Capacitacion) and _changed(obj, _CAPACITACION_FIELDS):
+            bulk = True
+        elif isinstance(obj, ParticipanteCapacitacion):
+            if _changed(obj, ('capacitacion_id', 'personal_id')):
+                bulk = True
+            elif _changed(obj, _PARTICIPANTE_FIELDS):
+                before = _previous(obj, _PARTICIPANTE_FIELDS)
+                after = {name: getattr(obj, name) for name in _PARTICIPANTE_FIELDS}
+                participantes.append(_participante_change(session, obj, before, after))
+
+    for obj in session.deleted:
+        if isinstance(obj, Capacitacion):
+            bulk = True
+        elif isinstance(obj, ParticipanteCapacitacion):
+            before = _previous(obj, _PARTICIPANTE_FIELDS)
+            participantes.append(_participante_change(session, obj, before, None))
+
+    participantes = [change for change in participantes if change is not None]
+    if bulk:
+        session.info[_BULK_KEY] = True
+    if capacitaciones or participantes:
+        pending = session.info.setdefault(_PENDING_KEY, ([], []))
+        pending[0].extend(capacitaciones)
+        pending[1].extend(participantes)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_stats_changes(orm_execute_state):
+    """INSERT/UPDATE/DELETE por sentencia (Core u ORM) sobre las tablas de la estadística"""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if getattr(table, 'name', None) in _TABLES:
+        orm_execute_state.session.info[_BULK_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_stats_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    bulk = session.info.pop(_BULK_KEY, False)
+    if pending is not None or bulk:
+        capacitaciones, participantes = pending or ([], [])
+        capacitacion_stats.apply_committed(capacitaciones, participantes, complete=not bulk)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_stats_changes(session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_BULK_KEY, None)
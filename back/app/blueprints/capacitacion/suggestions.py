@@ -0,0 +1,316 @@
+"""
+Sugerencias de búsqueda de capacitaciones.
+
+Índice en memoria por proceso (app.utils.text_search.SuggestionIndex) con
+los valores de `tipo_formacion`, `area` y `nombre` de las capacitaciones
+activas y los términos más buscados. Puntaje: cantidad de capacitaciones
+con el término + cantidad de veces que se buscó.
+
+- Escrituras sobre Capacitacion: el worker que confirma ajusta sus conteos
+  con los valores anteriores y nuevos e incrementa
+  `suggestions:capacitacion:version`; los demás workers recargan el
+  catálogo (un GROUP BY por campo) al ver la versión nueva.
+- Búsquedas: `record_search` acumula en memoria y cada
+  CAPACITACION_SUGGESTIONS_FLUSH segundos un thread por proceso suma lo
+  acumulado en `busquedas_capacitacion` y vuelve a leer los términos más
+  buscados (de todos los workers).
+"""
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.protocolo import Capacitacion, BusquedaCapacitacion
+from app.utils.shared_store import shared_store
+from app.utils.text_search import SuggestionIndex, search_key
+from app.utils.upsert import upsert_add
+
+logger = logging.getLogger(__name__)
+
+_VERSION_KEY = 'suggestions:capacitacion:version'
+
+# Campos del catálogo; el orden es la prioridad del tipo informado
+KINDS = ('tipo_formacion', 'area', 'nombre')
+
+# Términos buscados que se cargan (los más frecuentes) y mínimo para sugerirlos
+TOP_SEARCHES = 2000
+MIN_SEARCHES = 2
+
+_MAX_TERM = 100
+
+
+class CapacitacionSuggestions:
+
+    def __init__(self):
+        self.flush_interval = 300
+        self._app = None
+        self._index = SuggestionIndex()
+        self._catalog = {}   # clave -> {'texto': str, 'counts': {campo: cantidad}}
+        self._searches = {}  # clave -> (texto, cantidad) leídos de la base
+        self._pending = {}   # clave -> [texto, cantidad] sin escribir
+        self._version = None
+        self._lock = threading.RLock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def init_app(self, app):
+        self._app = app
+        self.flush_interval = app.config.get('CAPACITACION_SUGGESTIONS_FLUSH', 300)
+        atexit.register(self.shutdown)
+
+    # --- Índice ---------------------------------------------------------------
+
+    def _entry(self, key):
+        """(texto, tipo, puntaje) de un término, o None si ya no aplica"""
+        catalog = self._catalog.get(key)
+        texto, busquedas = self._searches.get(key, (None, 0))
+        if catalog is None and busquedas < MIN_SEARCHES:
+            return None
+
+        counts = catalog['counts'] if catalog else {}
+        kind = next((k for k in KINDS if counts.get(k)), 'busqueda')
+        return (catalog or {}).get('texto') or texto, kind, max(counts.values(), default=0) + busquedas
+
+    def _refresh(self, key):
+        entry = self._entry(key)
+        if entry is None:
+            self._index.remove(key)
+        else:
+            self._index.set(key, *entry)
+
+    def _rebuild(self):
+        keys = set(self._catalog) | set(self._searches)
+        self._index.load((key, *entry) for key in keys if (entry := self._entry(key)))
+
+    def _count(self, kind, value, delta):
+        key = search_key(value)
+        if not key:
+            return
+        entry = self._catalog.setdefault(key, {'texto': value, 'counts': {}})
+        counts = entry['counts']
+        counts[kind] = counts.get(kind, 0) + delta
+        if counts[kind] <= 0:
+            del counts[kind]
+        if not counts:
+            del self._catalog[key]
+        self._refresh(key)
+
+    def _load_catalog(self, version):
+        catalog = {}
+        for kind in KINDS:
+            column = getattr(Capacitacion, kind)
+            rows = db.session.query(column, func.count())\
+                .filter(Capacitacion.activo == True, column.isnot(None))\
+                .group_by(column)\
+                .all()
+            for value, cantidad in rows:
+                key = search_key(value)
+                if key:
+                    entry = catalog.setdefault(key, {'texto': value, 'counts': {}})
+                    entry['counts'][kind] = entry['counts'].get(kind, 0) + cantidad
+        self._catalog = catalog
+        self._version = version
+
+    def _load_searches(self):
+        rows = db.session.query(
+            BusquedaCapacitacion.termino, BusquedaCapacitacion.texto, BusquedaCapacitacion.cantidad
+        ).filter(
+            BusquedaCapacitacion.cantidad >= MIN_SEARCHES
+        ).order_by(BusquedaCapacitacion.cantidad.desc()).limit(TOP_SEARCHES).all()
+        self._searches = {row.termino: (row.texto, row.cantidad) for row in rows}
+
+    def ensure_fresh(self):
+        version = str(shared_store.get(_VERSION_KEY) or 0)
+        if self._index.ready and version == self._version:
+            return
+
+        with self._lock:
+            if not self._index.ready:
+                self._load_searches()
+            if not self._index.ready or version != self._version:
+                self._load_catalog(version)
+                self._rebuild()
+        self._ensure_flusher()
+
+    def suggest(self, text='', limit=8, kinds=None):
+        """[{'term', 'tipo', 'count', 'busquedas'}] por puntaje"""
+        self.ensure_fresh()
+        result = []
+        for key, texto, kind, _ in self._index.search(text, limit=limit, kinds=kinds):
+            counts = self._catalog.get(key, {}).get('counts', {})
+            busquedas = self._searches.get(key, (None, 0))[1]
+            result.append({
+                'term': texto,
+                'tipo': kind,
+                'count': counts.get(kind, busquedas if kind == 'busqueda' else 0),
+                'busquedas': busquedas
+            })
+        return result
+
+    def apply_committed(self, changes, complete=True):
+        """
+        Aplicar [(valores anteriores, valores nuevos)] confirmados por este
+        worker y avisar a los demás. Con complete=False (UPDATE masivo)
+        este worker también recarga.
+        """
+        version = str(shared_store.incr(_VERSION_KEY))
+        if not self._index.ready:
+            return
+
+        with self._lock:
+            for before, after in changes:
+                for values, delta in ((before, -1), (after, 1)):
+                    if values is not None:
+                        for kind in KINDS:
+                            self._count(kind, values[kind], delta)
+            # Si nadie más escribió en el medio, no hace falta recargar
+            if complete and self._version is not None and int(self._version) + 1 == int(version):
+                self._version = version
+
+    # --- Frecuencia de búsquedas ---------------------------------------------
+
+    def record_search(self, text):
+        """Contar una búsqueda con resultados (sólo memoria)"""
+        texto = (text or '').strip()[:_MAX_TERM]
+        key = search_key(texto)[:_MAX_TERM]
+        if len(key) < 3:
+            return
+        with self._lock:
+            pending = self._pending.setdefault(key, [texto, 0])
+            pending[0] = texto
+            pending[1] += 1
+        self._ensure_flusher()
+
+    def flush(self):
+        """Sumar las búsquedas acumuladas y releer las más frecuentes. Requiere app context"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if pending:
+            try:
+                self._write_searches(pending)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                logger.exception('Error al guardar la frecuencia de búsquedas')
+                with self._lock:
+                    for key, (texto, cantidad) in pending.items():
+                        self._pending.setdefault(key, [texto, 0])[1] += cantidad
+                return 0
+
+        if self._index.ready:
+            with self._lock:
+                previous = set(self._searches)
+                self._load_searches()
+                for key in previous | set(self._searches):
+                    self._refresh(key)
+            db.session.rollback()
+        return len(pending)
+
+    def _write_searches(self, pending):
+        now = datetime.utcnow()
+        rows = [
+            {'termino': key, 'texto': texto, 'cantidad': cantidad, 'ultima_busqueda': now}
+            for key, (texto, cantidad) in pending.items()
+        ]
+        upsert_add(db.session, BusquedaCapacitacion.__table__, rows,
+                   keys=('termino',), counters=('cantidad',))
+
+    def _ensure_flusher(self):
+        if self._thread is not None or self._app is None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name='capacitacion-suggestions', daemon=True
+                )
+                self._thread.start()
+
+    def _loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self._flush_in_context()
+
+    def _flush_in_context(self):
+        with self._app.app_context():
+            try:
+                self.flush()
+            finally:
+                db.session.remove()
+
+    def shutdown(self):
+        """Escribir lo pendiente al terminar el proceso"""
+        self._stop.set()
+        if self._app is not None and self._pending:
+            self._flush_in_context()
+
+
+capacitacion_suggestions = CapacitacionSuggestions()
+
+
+# --- Sincronización con escrituras --------------------------------------------
+
+_PENDING_KEY = 'capacitacion_suggestions_pending'
+_BULK_KEY = 'capacitacion_suggestions_bulk'
+
+_TRACKED = KINDS + ('activo',)
+
+
+def _values(obj, previous=False):
+    """Valores del catálogo de una capacitación (anteriores al flush con previous=True)"""
+    attrs = inspect(obj).attrs
+    values = {}
+    for name in _TRACKED:
+        history = getattr(attrs, name).history
+        if previous:
+            values[name] = history.deleted[0] if history.deleted else (history.unchanged or [None])[0]
+        else:
+            values[name] = getattr(obj, name)
+    return values if values['activo'] else None
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_capacitacion_changes(session, flush_context):
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, Capacitacion):
+            changes.append((None, _values(obj)))
+
+    for obj in session.dirty:
+        if isinstance(obj, Capacitacion):
+            attrs = inspect(obj).attrs
+            if any(getattr(attrs, name).history.has_changes() for name in _TRACKED):
+                changes.append((_values(obj, previous=True), _values(obj)))
+
+    for obj in session.deleted:
+        if isinstance(obj, Capacitacion):
+            changes.append((_values(obj, previous=True), None))
+
+    changes = [(before, after) for before, after in changes if before != after]
+    if changes:
+        session.info.setdefault(_PENDING_KEY, []).extend(changes)
+
+
+@event.listens_for(Session, 'after_bulk_update')
+@event.listens_for(Session, 'after_bulk_delete')
+def _collect_bulk_capacitacion_changes(context):
+    if context.mapper.class_ is Capacitacion:
+        # Sin valores anteriores: forzar la recarga por versión
+        context.session.info[_BULK_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_capacitacion_changes(session):
+    changes = session.info.pop(_PENDING_KEY, None)
+    bulk = session.info.pop(_BULK_KEY, False)
+    if changes or bulk:
+        capacitacion_suggestions.apply_committed(changes or [], complete=not bulk)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_capacitacion_changes(session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_BULK_KEY, None)
@@ -0,0 +1,248 @@
+"""
+Tendencias de participación (/capacitaciones/tendencias).
+
+`participaciones_diarias` acumula inscripciones, asistencias y aprobaciones
+por día de la capacitación, área, tipo de formación y modalidad (sólo
+capacitaciones activas). Se mantiene en el mismo flush que las escrituras
+de participantes y capacitaciones, con un UPSERT que suma las diferencias,
+así que se confirma o se descarta junto con ellas. Las escrituras por
+sentencia sobre participantes (INSERT/UPDATE masivos) deben sumar su parte
+con `add_participaciones`. Para la carga inicial o tras cambios hechos
+fuera de la aplicación: `flask maintenance backfill-tendencias`.
+
+Las consultas leen sólo las filas agregadas del rango (a lo sumo un año de
+días) y las agrupan en días, semanas o meses según el período.
+"""
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy import case, delete, event, func, inspect, insert, select
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.protocolo import Capacitacion, ParticipanteCapacitacion, ParticipacionDiaria
+from app.utils.upsert import upsert_add
+
+DIMENSIONS = ('area', 'tipo_formacion', 'modalidad')
+COUNTERS = ('inscripciones', 'asistencias', 'aprobaciones')
+
+# periodo -> (cantidad de buckets, tamaño del bucket, ventana de la media móvil)
+PERIODOS = {
+    'mes': (30, 'dia', 7),
+    'trimestre': (13, 'semana', 4),
+    'año': (12, 'mes', 3)
+}
+PERIODO_DEFAULT = 'mes'
+
+_CAPACITACION_FIELDS = ('activo', 'fecha') + DIMENSIONS
+_PARTICIPANTE_FIELDS = ('capacitacion_id', 'asistio', 'aprobado')
+
+
+# --- Mantenimiento ------------------------------------------------------------
+
+def rollup_key(values):
+    """(dia, area, tipo_formacion, modalidad) de una capacitación activa, o None"""
+    if not values['activo'] or values['fecha'] is None:
+        return None
+    return (values['fecha'].date(), *(values[d] or '' for d in DIMENSIONS))
+
+
+def _rows(deltas):
+    return [
+        {'dia': key[0], **dict(zip(DIMENSIONS, key[1:])), **dict(zip(COUNTERS, counts))}
+        for key, counts in deltas.items() if any(counts)
+    ]
+
+
+def _write(executor, deltas):
+    upsert_add(executor, ParticipacionDiaria.__table__, _rows(deltas),
+               keys=('dia',) + DIMENSIONS, counters=COUNTERS)
+
+
+def add_participaciones(executor, capacitacion, inscripciones, asistencias=0, aprobaciones=0):
+    """Sumar participaciones escritas por sentencia (sin pasar por el flush)"""
+    key = rollup_key({name: getattr(capacitacion, name) for name in _CAPACITACION_FIELDS})
+    if key is not None:
+        _write(executor, {key: [inscripciones, asistencias, aprobaciones]})
+
+
+def backfill_tendencias():
+    """Recalcular `participaciones_diarias` desde los participantes. Retorna filas"""
+    P = ParticipanteCapacitacion
+    table = ParticipacionDiaria.__table__
+    dimensions = [func.coalesce(getattr(Capacitacion, d), '') for d in DIMENSIONS]
+    dia = func.date(Capacitacion.fecha)
+
+    query = select(
+        dia,
+        *dimensions,
+        func.count(P.id),
+        func.sum(case((P.asistio == True, 1), else_=0)),
+        func.sum(case((P.aprobado == True, 1), else_=0))
+    ).join(Capacitacion, Capacitacion.id == P.capacitacion_id)\
+     .where(Capacitacion.activo == True, Capacitacion.fecha.isnot(None))\
+     .group_by(dia, *dimensions)
+
+    db.session.execute(delete(table))
+    result = db.session.execute(insert(table).from_select(('dia',) + DIMENSIONS + COUNTERS, query))
+    db.session.commit()
+    return result.rowcount
+
+
+def _changed(obj, fields):
+    attrs = inspect(obj).attrs
+    return any(getattr(attrs, name).history.has_changes() for name in fields)
+
+
+def _values(obj, fields, previous=False):
+    if not previous:
+        return {name: getattr(obj, name) for name in fields}
+    attrs = inspect(obj).attrs
+    values = {}
+    for name in fields:
+        history = getattr(attrs, name).history
+        values[name] = history.deleted[0] if history.deleted else (history.unchanged or [None])[0]
+    return values
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_rollups(session, flush_context):
+    deltas = {}            # clave del rollup -> [inscripciones, asistencias, aprobaciones]
+    por_capacitacion = {}  # capacitacion_id -> diferencias de este flush
+
+    def add(key, counts, sign=1):
+        if key is not None:
+            total = deltas.setdefault(key, [0, 0, 0])
+            for i, value in enumerate(counts):
+                total[i] += sign * value
+
+    def participante(values, sign):
+        total = por_capacitacion.setdefault(values['capacitacion_id'], [0, 0, 0])
+        for i, value in enumerate((1, bool(values['asistio']), bool(values['aprobado']))):
+            total[i] += sign * int(value)
+
+    for obj in session.new:
+        if isinstance(obj, ParticipanteCapacitacion):
+            participante(_values(obj, _PARTICIPANTE_FIELDS), 1)
+
+    moved = {}  # capacitacion_id -> (clave anterior, clave nueva)
+    for obj in session.dirty:
+        if isinstance(obj, ParticipanteCapacitacion) and _changed(obj, _PARTICIPANTE_FIELDS):
+            participante(_values(obj, _PARTICIPANTE_FIELDS, previous=True), -1)
+            participante(_values(obj, _PARTICIPANTE_FIELDS), 1)
+        elif isinstance(obj, Capacitacion) and _changed(obj, _CAPACITACION_FIELDS):
+            old = rollup_key(_values(obj, _CAPACITACION_FIELDS, previous=True))
+            new = rollup_key(_values(obj, _CAPACITACION_FIELDS))
+            if old != new:
+                moved[obj.id] = (old, new)
+
+    for obj in session.deleted:
+        if isinstance(obj, ParticipanteCapacitacion):
+            participante(_values(obj, _PARTICIPANTE_FIELDS, previous=True), -1)
+        elif isinstance(obj, Capacitacion):
+            moved[obj.id] = (rollup_key(_values(obj, _CAPACITACION_FIELDS, previous=True)), None)
+
+    if not por_capacitacion and not moved:
+        return
+
+    with session.no_autoflush:
+        # Capacitaciones que cambiaron de día o dimensión: mover todas sus participaciones
+        if moved:
+            stats = ParticipanteCapacitacion.stats_by_capacitacion(list(moved))
+            for capacitacion_id, (old, new) in moved.items():
+                s = stats.get(capacitacion_id, ParticipanteCapacitacion.EMPTY_STATS)
+                total = (s['total'], s['asistieron'], s['aprobados'])
+                # La clave anterior no tenía las diferencias de este flush
+                flushed = por_capacitacion.pop(capacitacion_id, (0, 0, 0))
+                add(old, [t - f for t, f in zip(total, flushed)], -1)
+                add(new, total)
+
+        # Las capacitaciones nuevas todavía no están en el identity map
+        nuevas = {obj.id: obj for obj in session.new if isinstance(obj, Capacitacion)}
+        for capacitacion_id, counts in por_capacitacion.items():
+            capacitacion = nuevas.get(capacitacion_id) or session.get(Capacitacion, capacitacion_id)
+            if capacitacion is not None:
+                add(rollup_key(_values(capacitacion, _CAPACITACION_FIELDS)), counts)
+
+    _write(session.connection(), deltas)
+
+
+# --- Consulta -----------------------------------------------------------------
+
+def _bucket(day, size):
+    if size == 'semana':
+        return day - timedelta(days=day.weekday())
+    if size == 'mes':
+        return day.replace(day=1)
+    return day
+
+
+def _buckets(count, size, today):
+    """Inicio de los `count` buckets que terminan en el que contiene `today`"""
+    last = _bucket(today, size)
+    if size == 'dia':
+        return [last - timedelta(days=i) for i in range(count - 1, -1, -1)]
+    if size == 'semana':
+        return [last - timedelta(weeks=i) for i in range(count - 1, -1, -1)]
+    months = last.year * 12 + last.month - 1
+    return [date((m // 12), m % 12 + 1, 1) for m in range(months - count + 1, months + 1)]
+
+
+def moving_average(values, window):
+    """Media móvil de cada posición (ventana recortada al comienzo), con sumas acumuladas"""
+    sums = [0, *accumulate(values)]
+    return [
+        round((sums[i + 1] - sums[max(i + 1 - window, 0)]) / min(i + 1, window), 2)
+        for i in range(len(values))
+    ]
+
+
+def _label(start, size):
+    if size == 'mes':
+        return start.strftime('%Y-%m')
+    if size == 'semana':
+        return f'{start.isocalendar()[0]}-S{start.isocalendar()[1]:02d}'
+    return start.isoformat()
+
+
+def tendencias_por_periodo(periodo, area=None, tipo_formacion=None, modalidad=None, today=None):
+    """Serie de buckets del período con totales, tasas y medias móviles"""
+    count, size, window = PERIODOS.get(periodo, PERIODOS[PERIODO_DEFAULT])
+    today = today or datetime.utcnow().date()
+    starts = _buckets(count, size, today)
+
+    PD = ParticipacionDiaria
+    query = db.session.query(
+        PD.dia, func.sum(PD.inscripciones), func.sum(PD.asistencias), func.sum(PD.aprobaciones)
+    ).filter(PD.dia >= starts[0], PD.dia <= today)
+    for name, value in (('area', area), ('tipo_formacion', tipo_formacion), ('modalidad', modalidad)):
+        if value is not None:
+            query = query.filter(getattr(PD, name) == value)
+
+    index = {start: i for i, start in enumerate(starts)}
+    series = {counter: [0] * count for counter in COUNTERS}
+    for dia, *counts in query.group_by(PD.dia).all():
+        i = index[_bucket(dia, size)]
+        for counter, value in zip(COUNTERS, counts):
+            series[counter][i] += int(value or 0)
+
+    medias = {counter: moving_average(values, window) for counter, values in series.items()}
+
+    result = []
+    for i, start in enumerate(starts):
+        inscripciones = series['inscripciones'][i]
+        result.append({
+            'periodo': _label(start, size),
+            'desde': start.isoformat(),
+            'participantes': inscripciones,
+            'asistencias': series['asistencias'][i],
+            'aprobaciones': series['aprobaciones'][i],
+            'tasa_asistencia': round(series['asistencias'][i] / inscripciones * 100) if inscripciones else 0,
+            'tasa_aprobacion': round(series['aprobaciones'][i] / inscripciones * 100) if inscripciones else 0,
+            'media_movil': {
+                'participantes': medias['inscripciones'][i],
+                'asistencias': medias['asistencias'][i],
+                'aprobaciones': medias['aprobaciones'][i]
+            }
+        })
+    return result
@@ -9,6 +9,9 @@ from app.models import Protocolo, AuditLog
 from app.utils.responses import success_response, error_response, paginated_response
 from app.utils.validators import validate_file_upload
 from app.utils.permissions import require_permission
+from app.utils.pagination import get_pagination_args, paginate_query, InvalidCursor
+from app.blueprints.protocol.search import search_protocolos
+from app.blueprints.protocol.extraction import extractor
 
 protocolo_bp = Blueprint('protocolo', __name__)
 
@@ -20,8 +23,7 @@ ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx'}
 def get_protocolos():
     """Obtener lista de protocolos con filtros y paginación"""
     try:
-        page = request.args.get('page', 1, type=int)
-        limit = request.args.get('limit', 20, type=int)
+        pagination = get_pagination_args()
         tipo = request.args.get('tipo')  # resumido o completo
         area = request.args.get('area')
         clasificacion = request.args.get('clasificacion')
@@ -39,23 +41,29 @@ def get_protocolos():
             query = query.filter_by(clasificacion=clasificacion)
         
         if search:
-            query = query.filter(
-                db.or_(
-                    Protocolo.nombre.ilike(f'%{search}%'),
-                    Protocolo.descripcion.ilike(f'%{search}%')
-                )
+            # Texto completo, ordenado por relevancia (items ya serializados)
+            result = search_protocolos(query, search, **pagination)
+            data = result.items
+        else:
+            result = paginate_query(
+                query,
+                [(Protocolo.created_at, 'desc'), (Protocolo.id, 'desc')],
+                **pagination
             )
-        
-        total = query.count()
-        protocolos = query.order_by(Protocolo.created_at.desc()).offset((page - 1) * limit).limit(limit).all()
+            data = [p.to_dict() for p in result.items]
         
         return paginated_response(
-            data=[p.to_dict() for p in protocolos],
-            page=page,
-            limit=limit,
-            total=total
+            data=data,
+            page=result.page,
+            limit=result.limit,
+            total=result.total,
+            next_cursor=result.next_cursor,
+            has_more=result.has_more,
+            total_estimated=result.total_estimated
         )
     
+    except InvalidCursor as e:
+        return error_response('INVALID_CURSOR', str(e), 400)
     except Exception as e:
         return error_response('FETCH_ERROR', str(e), 500)
 
@@ -130,6 +138,10 @@ def create_protocolo():
         db.session.add(protocolo)
         db.session.commit()
         
+        # Extraer el texto del documento en segundo plano
+        if documento_path:
+            extractor.submit(protocolo.id)
+        
         # Registrar auditoría
         user_id = get_jwt_identity()
         AuditLog.log(
@@ -200,6 +212,10 @@ def update_protocolo(protocolo_id):
         
         db.session.commit()
         
+        # Extraer el texto del nuevo documento en segundo plano
+        if file:
+            extractor.submit(protocolo.id)
+        
         # Registrar auditoría
         user_id = get_jwt_identity()
         AuditLog.log(
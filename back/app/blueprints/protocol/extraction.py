@@ -0,0 +1,287 @@
+"""
+Extracción en segundo plano del texto de los documentos de protocolos.
+
+Al crear o actualizar un protocolo con archivo, la ruta sólo encola el id
+después del commit; un pool de threads (DOCUMENT_EXTRACTION_WORKERS) lee el
+archivo, calcula su sha256 y, si el contenido cambió, extrae el texto por
+página y lo guarda en `ProtocoloDocumento`. Ese texto alimenta la búsqueda
+de protocolos (ver search.py).
+
+Formatos: PDF (paquete `pypdf`) y DOCX (stdlib). Los .doc binarios quedan
+como `sin_soporte`. Una tarea del scheduler reencola los documentos
+pendientes (reinicios, cargas previas a esta función), los `error` con
+backoff exponencial (DOCUMENT_EXTRACTION_RETRY_DELAY, hasta
+DOCUMENT_EXTRACTION_MAX_RETRIES intentos) y los `sin_soporte` cuyo formato
+ya tiene extractor (p. ej. después de instalar pypdf).
+`flask maintenance extract-documents --force` reprocesa todos.
+"""
+import hashlib
+import importlib.util
+import logging
+import os
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from xml.etree import ElementTree
+
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models.protocolo import Protocolo, ProtocoloDocumento
+
+logger = logging.getLogger(__name__)
+
+PAGE_SEPARATOR = '\n\n'
+
+
+class ExtractionUnsupported(Exception):
+    """Formato sin extractor disponible"""
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# --- Extractores (retornan una lista de textos, uno por página) --------------
+
+def extract_pdf(path):
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise ExtractionUnsupported('Extracción de PDF no disponible (falta el paquete pypdf)') from e
+
+    return [page.extract_text() or '' for page in PdfReader(path).pages]
+
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+def _is_page_break(node):
+    if node.tag == _W + 'lastRenderedPageBreak':
+        return True
+    return node.tag == _W + 'br' and node.get(_W + 'type') == 'page'
+
+
+def extract_docx(path):
+    """Texto de un .docx; las páginas salen de los saltos guardados por Word"""
+    with zipfile.ZipFile(path) as archive:
+        root = ElementTree.fromstring(archive.read('word/document.xml'))
+
+    pages, lines, line = [], [], []
+    for paragraph in root.iter(_W + 'p'):
+        for node in paragraph.iter():
+            if node.tag == _W + 't' and node.text:
+                line.append(node.text)
+            elif node.tag == _W + 'tab':
+                line.append('\t')
+            elif _is_page_break(node):
+                lines.append(''.join(line))
+                pages.append('\n'.join(lines))
+                lines, line = [], []
+        lines.append(''.join(line))
+        line = []
+
+    pages.append('\n'.join(lines))
+    return pages
+
+
+EXTRACTORS = {
+    'pdf': extract_pdf,
+    'docx': extract_docx
+}
+
+# Paquete opcional que necesita cada extractor
+EXTRACTOR_PACKAGES = {
+    'pdf': 'pypdf'
+}
+
+
+def available_extensions():
+    """Extensiones con extractor utilizable en este entorno"""
+    return [
+        extension for extension in EXTRACTORS
+        if extension not in EXTRACTOR_PACKAGES or importlib.util.find_spec(EXTRACTOR_PACKAGES[extension])
+    ]
+
+
+def extract_text(path):
+    """(texto, offsets de inicio de cada página)"""
+    extension = path.rsplit('.', 1)[-1].lower()
+    extractor = EXTRACTORS.get(extension)
+    if extractor is None:
+        raise ExtractionUnsupported(f'Formato .{extension} sin extractor de texto')
+
+    texto, offsets = '', []
+    for page in extractor(path):
+        offsets.append(len(texto))
+        texto += page.strip() + PAGE_SEPARATOR
+    return texto, offsets
+
+
+# --- Procesamiento ------------------------------------------------------------
+
+def process_document(protocolo_id, max_chars=500000, force=False):
+    """
+    Extraer (si hace falta, o siempre con `force`) el texto del documento de
+    un protocolo. Retorna el estado final. No mantiene una transacción
+    abierta mientras lee el archivo.
+    """
+    path = db.session.query(Protocolo.documento_path).filter_by(id=protocolo_id).scalar()
+    current = db.session.query(ProtocoloDocumento.content_hash, ProtocoloDocumento.estado,
+                               ProtocoloDocumento.intentos)\
+                        .filter_by(protocolo_id=protocolo_id).first()
+    db.session.rollback()
+
+    if not path or not os.path.exists(path):
+        documento = ProtocoloDocumento.query.get(protocolo_id)
+        if documento is not None:
+            db.session.delete(documento)
+            db.session.commit()
+        return None
+
+    content_hash = file_hash(path)
+    # Sólo se reutiliza un texto ya extraído: `error` y `sin_soporte` se reintentan
+    unchanged = not force and current is not None and current.content_hash == content_hash \
+        and current.estado == 'listo'
+
+    values = {'documento_path': path, 'content_hash': content_hash}
+    if not unchanged:
+        try:
+            texto, offsets = extract_text(path)
+            values.update(
+                estado='listo',
+                texto=texto[:max_chars],
+                paginas=[o for o in offsets if o < max_chars],
+                error=None,
+                intentos=0
+            )
+        except ExtractionUnsupported as e:
+            values.update(estado='sin_soporte', texto=None, paginas=None, error=str(e), intentos=0)
+        except Exception as e:
+            logger.exception('Error al extraer texto del protocolo %s', protocolo_id)
+            same_file = current is not None and current.estado == 'error' and current.content_hash == content_hash
+            values.update(estado='error', texto=None, paginas=None, error=str(e)[:500],
+                          intentos=(current.intentos or 0) + 1 if same_file else 1)
+        values['extracted_at'] = datetime.utcnow()
+
+    # El archivo pudo cambiar mientras se extraía: lo resuelve el siguiente trabajo
+    if db.session.query(Protocolo.documento_path).filter_by(id=protocolo_id).scalar() != path:
+        db.session.rollback()
+        return 'pendiente'
+
+    documento = ProtocoloDocumento.query.get(protocolo_id)
+    if documento is None:
+        documento = ProtocoloDocumento(protocolo_id=protocolo_id)
+        db.session.add(documento)
+    for key, value in values.items():
+        setattr(documento, key, value)
+    db.session.commit()
+
+    return documento.estado
+
+
+def pending_documents(limit=100, retry_delay=600, max_retries=5, force=False, now=None):
+    """
+    Protocolos con archivo cuyo texto falta, corresponde a otro archivo, falló
+    (con backoff: `retry_delay` * 2^(intentos - 1), hasta `max_retries`) o
+    quedó sin soporte y ahora tiene extractor. Con `force`, todos
+    """
+    D = ProtocoloDocumento
+    query = db.session.query(Protocolo.id)\
+        .outerjoin(D, D.protocolo_id == Protocolo.id)\
+        .filter(Protocolo.activo == True, Protocolo.documento_path.isnot(None))
+    if force:
+        return [row.id for row in query.order_by(Protocolo.id).limit(limit).all()]
+
+    soportados = [func.lower(Protocolo.documento_path).like(f'%.{ext}') for ext in available_extensions()]
+    rows = query.filter(db.or_(
+        D.protocolo_id.is_(None),
+        D.estado == 'pendiente',
+        D.documento_path != Protocolo.documento_path,
+        db.and_(D.estado == 'sin_soporte', db.or_(*soportados))
+    )).limit(limit).all()
+    ids = [row.id for row in rows]
+
+    # Pocos errores en la práctica: el backoff se evalúa en Python (portable)
+    now = now or datetime.utcnow()
+    errores = query.with_entities(Protocolo.id, D.intentos, D.extracted_at)\
+        .filter(D.estado == 'error', D.documento_path == Protocolo.documento_path,
+                D.intentos < max_retries)\
+        .all()
+    for row in errores:
+        if len(ids) >= limit:
+            break
+        delay = timedelta(seconds=retry_delay * 2 ** max((row.intentos or 1) - 1, 0))
+        if row.extracted_at is None or row.extracted_at + delay <= now:
+            ids.append(row.id)
+    return ids
+
+
+class DocumentExtractor:
+    """Pool de extracción: encola ids y los procesa fuera del request"""
+
+    def __init__(self):
+        self.max_chars = 500000
+        self.retry_delay = 600
+        self.max_retries = 5
+        self._app = None
+        self._workers = 2
+        self._executor = None
+        self._inflight = set()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self._app = app
+        self._workers = app.config.get('DOCUMENT_EXTRACTION_WORKERS', 2)
+        self.max_chars = app.config.get('DOCUMENT_EXTRACTION_MAX_CHARS', 500000)
+        self.retry_delay = app.config.get('DOCUMENT_EXTRACTION_RETRY_DELAY', 600)
+        self.max_retries = app.config.get('DOCUMENT_EXTRACTION_MAX_RETRIES', 5)
+
+    def submit(self, protocolo_id):
+        """Encolar sin bloquear; un id ya encolado no se duplica"""
+        if self._app is None:
+            return False
+
+        with self._lock:
+            if protocolo_id in self._inflight:
+                return False
+            self._inflight.add(protocolo_id)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._workers, thread_name_prefix='doc-extract'
+                )
+        self._executor.submit(self._run, protocolo_id)
+        return True
+
+    def _run(self, protocolo_id):
+        estado = None
+        try:
+            with self._app.app_context():
+                try:
+                    estado = process_document(protocolo_id, self.max_chars)
+                finally:
+                    db.session.remove()
+        except Exception:
+            logger.exception('Falló la extracción del protocolo %s', protocolo_id)
+        finally:
+            with self._lock:
+                self._inflight.discard(protocolo_id)
+
+        # Se subió otro archivo durante la extracción: procesar el nuevo
+        if estado == 'pendiente':
+            self.submit(protocolo_id)
+
+    def sweep(self, limit=100):
+        """Reencolar documentos pendientes y reintentos vencidos (tarea del scheduler)"""
+        queued = 0
+        for protocolo_id in pending_documents(limit, self.retry_delay, self.max_retries):
+            queued += self.submit(protocolo_id)
+        return queued
+
+
+extractor = DocumentExtractor()
@@ -0,0 +1,301 @@
+"""
+Búsqueda de texto completo de protocolos.
+
+PostgreSQL: columna `search_vector` (tsvector, configuración 'spanish') con
+índice GIN. El nombre pesa A, la descripción B y el texto extraído del
+documento adjunto C (ver extraction.py). Se recalcula en la misma
+transacción cuando se crea un protocolo, cambian los campos indexados o se
+guarda el texto de su documento. Resultados ordenados por ts_rank_cd, con
+fragmentos de ts_headline (escapados como HTML igual que en memoria: sólo
+las marcas <mark> quedan sin escapar).
+
+Otros motores (SQLite en desarrollo): índice invertido en memoria
+(app.utils.text_search), construido en el primer uso y actualizado al
+confirmar cada transacción.
+"""
+import threading
+
+from bisect import bisect_right
+from html import escape
+
+from sqlalchemy import event, func, inspect, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.protocolo import Protocolo, ProtocoloDocumento
+from app.utils.pagination import Page, count_total
+from app.utils.text_search import InvertedIndex, first_hit, highlight, tokenize
+
+TS_CONFIG = 'spanish'
+
+# ts_headline marca con caracteres de uso privado; el fragmento se escapa y
+# recién después se cambian por <mark>
+_MARK_START, _MARK_STOP = '\ue000', '\ue001'
+HEADLINE_OPTIONS = (f'StartSel={_MARK_START}, StopSel={_MARK_STOP}, '
+                    'MaxWords=35, MinWords=15, MaxFragments=2')
+
+# Campos propios del protocolo que se indexan
+INDEXED_FIELDS = ('nombre', 'descripcion')
+
+# Peso de cada campo en el índice en memoria ('documento': texto extraído)
+INDEX_WEIGHTS = {'nombre': 2.0, 'descripcion': 1.0, 'documento': 0.5}
+
+# Un tsvector no puede superar 1 MB: se indexa el comienzo del documento
+MAX_DOCUMENT_CHARS = 300000
+
+
+def is_postgres(bind=None):
+    bind = bind or db.session.get_bind()
+    return bind.dialect.name == 'postgresql'
+
+
+# --- PostgreSQL ---------------------------------------------------------------
+
+def search_vector_expr():
+    """Expresión SQL del tsvector de un protocolo a partir de sus columnas"""
+    t = Protocolo.__table__
+    d = ProtocoloDocumento.__table__
+    documento = select(func.substr(d.c.texto, 1, MAX_DOCUMENT_CHARS))\
+        .where(d.c.protocolo_id == t.c.id)\
+        .scalar_subquery()
+
+    def weighted(column, weight):
+        return func.setweight(func.to_tsvector(TS_CONFIG, func.coalesce(column, '')), weight)
+
+    return weighted(t.c.nombre, 'A')\
+        .op('||')(weighted(t.c.descripcion, 'B'))\
+        .op('||')(weighted(documento, 'C'))
+
+
+def refresh_search_vectors(connection, ids=None):
+    """Recalcular `search_vector` (de `ids` o de todos). No toca updated_at"""
+    t = Protocolo.__table__
+    stmt = update(t).values(search_vector=search_vector_expr(), updated_at=t.c.updated_at)
+    if ids is not None:
+        stmt = stmt.where(t.c.id.in_(ids))
+    return connection.execute(stmt).rowcount
+
+
+def _search_postgres(query, text, page, limit, total_mode):
+    tsquery = func.websearch_to_tsquery(TS_CONFIG, text)
+    rank = func.ts_rank_cd(Protocolo.search_vector, tsquery)
+    source = func.coalesce(Protocolo.descripcion, Protocolo.nombre)
+    snippet = func.ts_headline(
+        TS_CONFIG,
+        func.translate(source, _MARK_START + _MARK_STOP, ''),
+        tsquery,
+        HEADLINE_OPTIONS
+    )
+
+    # La clave normalizada cubre subcadenas y acentos que el diccionario no unifica
+    matches = Protocolo.search_vector.op('@@')(tsquery)
+    key_filter = Protocolo.search_filter(text)
+    query = query.filter(matches if key_filter is None else or_(matches, key_filter))
+    total, estimated = count_total(query, total_mode)
+
+    rows = query.add_columns(rank.label('rank'), snippet.label('snippet'))\
+                .order_by(rank.desc(), Protocolo.id)\
+                .offset((page - 1) * limit)\
+                .limit(limit + 1)\
+                .all()
+
+    items = [_result(p, rank_value, _safe_headline(snippet_value)) for p, rank_value, snippet_value in rows]
+    _add_document_matches(items[:limit], text)
+    return _page(items, page, limit, total, estimated)
+
+
+def _safe_headline(headline):
+    """Fragmento de ts_headline como HTML seguro, con las marcas de `highlight`"""
+    if not headline:
+        return headline
+    return escape(headline).replace(_MARK_START, '<mark>').replace(_MARK_STOP, '</mark>')
+
+
+# --- Índice en memoria ----------------------------------------------------------
+
+_index = InvertedIndex(INDEX_WEIGHTS)
+_index_lock = threading.Lock()
+
+
+def _fields(protocolo):
+    """Campos propios del protocolo (el texto del documento se conserva aparte)"""
+    return {field: getattr(protocolo, field) for field in INDEXED_FIELDS}
+
+
+def get_memory_index():
+    """Índice en memoria (se construye con una sola consulta la primera vez)"""
+    if not _index.ready:
+        with _index_lock:
+            if not _index.ready:
+                rows = db.session.query(
+                    Protocolo.id, Protocolo.nombre, Protocolo.descripcion, ProtocoloDocumento.texto
+                ).outerjoin(ProtocoloDocumento, ProtocoloDocumento.protocolo_id == Protocolo.id).all()
+                _index.load(
+                    (row.id, {'nombre': row.nombre, 'descripcion': row.descripcion, 'documento': row.texto})
+                    for row in rows
+                )
+    return _index
+
+
+def _search_memory(query, text, page, limit, total_mode):
+    index = get_memory_index()
+    scores = dict(index.search(text))
+    if not scores:
+        return _page([], page, limit, 0 if total_mode != 'none' else None, False)
+
+    # Aplicar el resto de los filtros (activo, tipo, área...) en la base
+    ids = [pid for (pid,) in query.with_entities(Protocolo.id).filter(Protocolo.id.in_(list(scores)))]
+    ids.sort(key=lambda pid: (-scores[pid], pid))
+
+    start = (page - 1) * limit
+    page_ids = ids[start:start + limit + 1]
+    protocolos = {p.id: p for p in Protocolo.query.filter(Protocolo.id.in_(page_ids))}
+
+    items = [
+        _result(
+            protocolos[pid],
+            scores[pid],
+            index.snippet(pid, text, 'descripcion') or index.snippet(pid, text, 'nombre')
+        )
+        for pid in page_ids if pid in protocolos
+    ]
+    _add_document_matches(items[:limit], text)
+    return _page(items, page, limit, len(ids) if total_mode != 'none' else None, False)
+
+
+# --- API ----------------------------------------------------------------------
+
+def _result(protocolo, rank, snippet):
+    data = protocolo.to_dict()
+    data['rank'] = round(float(rank or 0), 4)
+    data['snippet'] = snippet
+    return data
+
+
+def _add_document_matches(items, text):
+    """
+    Para los resultados cuyo documento contiene la búsqueda, agregar la
+    página y un fragmento resaltado ('documento_match')
+    """
+    terms = set(tokenize(text))
+    ids = [item['id'] for item in items]
+    if not terms or not ids:
+        return
+
+    documentos = db.session.query(
+        ProtocoloDocumento.protocolo_id, ProtocoloDocumento.texto, ProtocoloDocumento.paginas
+    ).filter(
+        ProtocoloDocumento.protocolo_id.in_(ids),
+        ProtocoloDocumento.estado == 'listo'
+    ).all()
+
+    matches = {}
+    for protocolo_id, texto, paginas in documentos:
+        offset = first_hit(texto, terms)
+        if offset is None:
+            continue
+        start = max(texto.rfind(' ', 0, max(offset - 200, 0)), 0)
+        matches[protocolo_id] = {
+            'pagina': bisect_right(paginas or [0], offset) or 1,
+            'snippet': highlight(texto[start:offset + 400], terms)
+        }
+
+    for item in items:
+        if item['id'] in matches:
+            item['documento_match'] = matches[item['id']]
+
+
+def _page(items, page, limit, total, estimated):
+    return Page(items=items[:limit], limit=limit, page=page, total=total,
+                total_estimated=estimated, has_more=len(items) > limit)
+
+
+def search_protocolos(query, text, page=1, limit=20, cursor=None, total_mode='estimate'):
+    """
+    Buscar `text` dentro de `query` (Query de Protocolo ya filtrada).
+    Retorna una Page de dicts ordenados por relevancia, con 'rank' y
+    'snippet'. Los resultados por relevancia se paginan por offset:
+    `cursor` se ignora.
+    """
+    if is_postgres():
+        return _search_postgres(query, text, page, limit, total_mode)
+    return _search_memory(query, text, page, limit, total_mode)
+
+
+def reindex_protocolos():
+    """Recalcular el índice completo (carga inicial o tras cambios masivos)"""
+    if is_postgres():
+        count = refresh_search_vectors(db.session.connection())
+        db.session.commit()
+        return count
+
+    _index.ready = False
+    return len(get_memory_index())
+
+
+# --- Mantenimiento incremental ------------------------------------------------
+
+_PENDING_KEY = 'protocolo_search_pending'
+
+
+def _indexed_fields_changed(obj):
+    attrs = inspect(obj).attrs
+    return any(getattr(attrs, field).history.has_changes() for field in INDEXED_FIELDS)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_protocolo_changes(session, flush_context):
+    changed = [
+        obj for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, Protocolo) and (obj in session.new or _indexed_fields_changed(obj))
+    ]
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Protocolo)]
+    documentos = {
+        obj.protocolo_id: (None if obj in session.deleted else obj.texto)
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(obj, ProtocoloDocumento)
+        and (obj not in session.dirty or inspect(obj).attrs.texto.history.has_changes())
+    }
+    if not changed and not deleted and not documentos:
+        return
+
+    connection = session.connection()
+    if is_postgres(connection):
+        # Misma transacción: el tsvector queda consistente con la fila
+        ids = {obj.id for obj in changed} | set(documentos)
+        if ids:
+            refresh_search_vectors(connection, list(ids))
+        return
+
+    # En memoria: se aplica recién al confirmar
+    pending = session.info.setdefault(_PENDING_KEY, {})
+
+    def fields_for(protocolo_id):
+        if pending.get(protocolo_id) is None:
+            pending[protocolo_id] = {}
+        return pending[protocolo_id]
+
+    for obj in changed:
+        fields_for(obj.id).update(_fields(obj))
+    for protocolo_id, texto in documentos.items():
+        fields_for(protocolo_id)['documento'] = texto
+    for protocolo_id in deleted:
+        pending[protocolo_id] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_protocolo_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending or not _index.ready:
+        return
+
+    for protocolo_id, fields in pending.items():
+        if fields is None:
+            _index.remove(protocolo_id)
+        else:
+            _index.add(protocolo_id, fields, merge=True)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_protocolo_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,48 @@
+from flask import request
+from flask_jwt_extended import jwt_required
+
+from app.blueprints.search import search_bp
+from app.blueprints.search.servicies import global_search, BACKENDS
+from app.blueprints.capacitacion.suggestions import capacitacion_suggestions
+from app.utils.responses import success_response, error_response
+
+MAX_LIMIT = 50
+SUGGESTIONS_LIMIT = 8
+
+
+@search_bp.route('', methods=['GET'])
+@jwt_required()
+def search():
+    """
+    Búsqueda global: capacitaciones, personal, protocolos y dependencias.
+    Incluye `sugerencias` de búsqueda (las populares si `q` está vacío), así
+    el buscador global no necesita otra llamada.
+    """
+    query = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', 20, type=int) or 20, MAX_LIMIT))
+
+    tipos = None
+    if request.args.get('tipos'):
+        tipos = [t.strip() for t in request.args['tipos'].split(',') if t.strip()]
+        invalidos = [t for t in tipos if t not in BACKENDS]
+        if invalidos:
+            return error_response(
+                'INVALID_TYPE',
+                f"Tipos inválidos: {', '.join(invalidos)}. Válidos: {', '.join(BACKENDS)}",
+                400
+            )
+
+    sugerencias = capacitacion_suggestions.suggest(query, limit=SUGGESTIONS_LIMIT)
+    if len(query) < 2:
+        return success_response({'query': query, 'resultados': [], 'facetas': {},
+                                 'parciales': [], 'tiempo_ms': 0, 'sugerencias': sugerencias})
+
+    try:
+        result = global_search.search(query, tipos=tipos, limit=limit)
+    except Exception as e:
+        return error_response('SEARCH_ERROR', str(e), 500)
+
+    if any(item['tipo'] == 'capacitacion' for item in result['resultados']):
+        capacitacion_suggestions.record_search(query)
+    
+    return success_response({'query': query, **result, 'sugerencias': sugerencias})
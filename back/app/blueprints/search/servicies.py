@@ -0,0 +1,234 @@
+"""
+Búsqueda global: capacitaciones, personal, protocolos y dependencias.
+
+Cada entidad se consulta en un thread propio (con su app context y su
+sesión) y la request espera como máximo GLOBAL_SEARCH_DEADLINE_MS. Las
+entidades que no respondieron a tiempo se informan en `parciales` y no
+demoran la respuesta; en PostgreSQL su consulta además se corta con
+statement_timeout para liberar el thread.
+
+Los candidatos de todas las entidades se puntúan con la misma escala
+(`relevance`) y se devuelven en una sola lista, con el total de
+coincidencias por tipo (facetas).
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from sqlalchemy import func, text as sql_text
+
+from app.extensions import db
+from app.models.personal import Personal, Dependencia
+from app.models.protocolo import Protocolo, Capacitacion
+from app.blueprints.protocol.search import is_postgres, search_protocolos
+from app.utils.pagination import count_total
+from app.utils.text_search import search_key
+
+logger = logging.getLogger(__name__)
+
+# Candidatos por entidad (se puntúan y recortan después de combinar)
+CANDIDATES_FACTOR = 3
+
+
+def relevance(words, phrase, titles, extra=''):
+    """
+    Puntaje de 0 a 1 de un resultado, igual para todas las entidades.
+    `titles` son las formas del nombre principal; `extra`, el resto de los
+    campos buscables. Todo ya pasado por `search_key`.
+    """
+    best = 0.2
+    for title in titles:
+        if not title:
+            continue
+        if title == phrase:
+            return 1.0
+        if title.startswith(phrase):
+            best = max(best, 0.9)
+        elif all(any(t.startswith(w) for t in title.split()) for w in words):
+            best = max(best, 0.8)
+        elif all(w in title for w in words):
+            best = max(best, 0.6)
+        elif all(w in f'{title} {extra}' for w in words):
+            best = max(best, 0.4)
+    return best
+
+
+def _terms(text):
+    """(palabras, frase) normalizadas de la búsqueda"""
+    phrase = search_key(text)
+    return phrase.split(), phrase
+
+
+def _candidates(query, model, text, limit):
+    """Coincidencias por clave normalizada; las claves más cortas primero"""
+    query = query.filter(model.search_filter(text))
+    total, _ = count_total(query, 'estimate')
+    rows = query.order_by(func.length(model.search_key), model.id).limit(limit).all()
+    return rows, total
+
+
+# --- Backends: (texto, límite) -> (items, total) -------------------------------
+
+def search_capacitaciones(text, limit):
+    words, phrase = _terms(text)
+    rows, total = _candidates(Capacitacion.query.filter(Capacitacion.activo == True),
+                              Capacitacion, text, limit)
+    items = [{
+        'tipo': 'capacitacion',
+        'id': c.id,
+        'titulo': c.nombre,
+        'subtitulo': ' · '.join(filter(None, (c.tipo_formacion, c.area, c.modalidad))),
+        'fecha': c.fecha.isoformat() if c.fecha else None,
+        'score': relevance(words, phrase, [search_key(c.nombre)], c.search_key)
+    } for c in rows]
+    return items, total
+
+
+def search_personal(text, limit):
+    words, phrase = _terms(text)
+    rows, total = _candidates(Personal.query.filter(Personal.activo == True), Personal, text, limit)
+    items = []
+    for p in rows:
+        apellido, nombre = search_key(p.apellido), search_key(p.nombre)
+        items.append({
+            'tipo': 'personal',
+            'id': p.id,
+            'titulo': f'{p.nombre} {p.apellido}',
+            'subtitulo': ' · '.join(filter(None, (p.legajo, p.rango, p.dependencia))),
+            'foto_path': p.foto_path,
+            'score': relevance(
+                words, phrase,
+                [f'{apellido} {nombre}', f'{nombre} {apellido}', search_key(p.legajo)],
+                p.search_key
+            )
+        })
+    return items, total
+
+
+def search_dependencias(text, limit):
+    words, phrase = _terms(text)
+    rows, total = _candidates(Dependencia.query, Dependencia, text, limit)
+    items = [{
+        'tipo': 'dependencia',
+        'id': d.id,
+        'titulo': d.nombre,
+        'subtitulo': ' · '.join(filter(None, (d.tipo, d.direccion))),
+        'score': relevance(words, phrase, [search_key(d.nombre)], d.search_key)
+    } for d in rows]
+    return items, total
+
+
+def search_protocolos_global(text, limit):
+    """Texto completo de protocolos (incluye el documento adjunto)"""
+    words, phrase = _terms(text)
+    page = search_protocolos(Protocolo.query.filter_by(activo=True), text,
+                             page=1, limit=limit, total_mode='estimate')
+    items = []
+    for p in page.items:
+        score = relevance(words, phrase, [search_key(p['nombre'])], search_key(p['descripcion']))
+        if score <= 0.2:
+            # Sólo coincide el texto completo (por ejemplo, el documento)
+            score = 0.2 + 0.2 * min(p['rank'], 1.0)
+        item = {
+            'tipo': 'protocolo',
+            'id': p['id'],
+            'titulo': p['nombre'],
+            'subtitulo': ' · '.join(filter(None, (p.get('area'), p.get('clasificacion')))),
+            'snippet': p['snippet'],
+            'score': score
+        }
+        if 'documento_match' in p:
+            item['documento_match'] = p['documento_match']
+        items.append(item)
+    return items, page.total
+
+
+BACKENDS = {
+    'capacitaciones': search_capacitaciones,
+    'personal': search_personal,
+    'protocolos': search_protocolos_global,
+    'dependencias': search_dependencias
+}
+
+
+class GlobalSearch:
+    """Ejecuta los backends en paralelo con un plazo por request"""
+
+    def __init__(self):
+        self.deadline_ms = 800
+        self._app = None
+        self._workers = 8
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self._app = app
+        self.deadline_ms = app.config.get('GLOBAL_SEARCH_DEADLINE_MS', 800)
+        self._workers = app.config.get('GLOBAL_SEARCH_WORKERS', 8)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._workers, thread_name_prefix='global-search'
+                )
+            return self._executor
+
+    def _run(self, backend, text, limit):
+        with self._app.app_context():
+            try:
+                if is_postgres():
+                    db.session.execute(sql_text(f'SET LOCAL statement_timeout = {int(self.deadline_ms)}'))
+                return backend(text, limit)
+            finally:
+                db.session.remove()
+
+    def search(self, text, tipos=None, limit=20):
+        """
+        Lista combinada por relevancia. Retorna dict con 'resultados',
+        'facetas' ({tipo: total}, total estimado) y 'parciales' (tipos que
+        no respondieron a tiempo o fallaron).
+        """
+        tipos = [t for t in (tipos or BACKENDS) if t in BACKENDS]
+        if not search_key(text) or not tipos:
+            return {'resultados': [], 'facetas': {}, 'parciales': [], 'tiempo_ms': 0}
+
+        start = time.monotonic()
+        executor = self._get_executor()
+        candidates = limit * CANDIDATES_FACTOR
+        futures = {
+            executor.submit(self._run, BACKENDS[tipo], text, candidates): tipo
+            for tipo in tipos
+        }
+        done, not_done = wait(futures, timeout=self.deadline_ms / 1000)
+
+        resultados, facetas, parciales = [], {}, []
+        for future in not_done:
+            future.cancel()
+            parciales.append(futures[future])
+
+        for future in done:
+            tipo = futures[future]
+            try:
+                items, total = future.result()
+            except Exception:
+                logger.exception('Falló la búsqueda global en %s', tipo)
+                parciales.append(tipo)
+                continue
+            resultados.extend(items)
+            facetas[tipo] = total
+
+        resultados.sort(key=lambda item: (-item['score'], item['titulo'] or ''))
+        for item in resultados:
+            item['score'] = round(item['score'], 3)
+
+        return {
+            'resultados': resultados[:limit],
+            'facetas': facetas,
+            'parciales': sorted(parciales),
+            'tiempo_ms': round((time.monotonic() - start) * 1000)
+        }
+
+
+global_search = GlobalSearch()
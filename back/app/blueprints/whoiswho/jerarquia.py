@@ -0,0 +1,149 @@
+"""
+Mantenimiento de la tabla de clausura de la cadena de mando.
+
+`personal_jerarquia` se mantiene en la misma transacción que los cambios de
+`Personal.superior_directo_id` (altas, cambios de superior y bajas) mediante
+eventos de sesión. Los UPDATE masivos sobre Personal no pasan por acá: en ese
+caso, o para la carga inicial, usar `flask maintenance rebuild-jerarquia`.
+
+Los cambios de superior se validan antes del flush con `validar_superior`
+(un superior no puede ser subordinado de la persona); el listener sólo
+mantiene la tabla.
+"""
+import logging
+
+from sqlalchemy import String, delete, event, insert, inspect, literal, select, true
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+# Corte de seguridad para datos con ciclos en superior_directo_id
+MAX_DEPTH = 64
+
+_COLUMNS = ['ancestor_id', 'descendant_id', 'depth']
+
+
+class JerarquiaInvalida(ValueError):
+    """Cambio de superior que formaría un ciclo en la cadena de mando"""
+
+
+def _table():
+    from app.models.personal import PersonalJerarquia
+    return PersonalJerarquia.__table__
+
+
+def _insert_node(conn, node_id, parent_id):
+    """Alta: fila propia + una fila por cada superior del nuevo jefe"""
+    t = _table()
+    conn.execute(insert(t).values(ancestor_id=node_id, descendant_id=node_id, depth=0))
+    if parent_id is not None:
+        conn.execute(insert(t).from_select(_COLUMNS, select(
+            t.c.ancestor_id, literal(node_id, String), t.c.depth + 1
+        ).where(t.c.descendant_id == parent_id)))
+
+
+def _es_subordinado(conn, ancestor_id, descendant_id):
+    """¿`descendant_id` es `ancestor_id` o está bajo su mando?"""
+    t = _table()
+    return conn.execute(select(t.c.depth).where(
+        t.c.ancestor_id == ancestor_id, t.c.descendant_id == descendant_id
+    )).first() is not None
+
+
+def validar_superior(personal_id, superior_id):
+    """Verificar, antes del flush, que `superior_id` puede ser superior de `personal_id`"""
+    if superior_id is not None and _es_subordinado(db.session, personal_id, superior_id):
+        raise JerarquiaInvalida('El nuevo superior es la misma persona o uno de sus subordinados')
+
+
+def _move_subtree(conn, node_id, parent_id):
+    """Cambio de superior: desenganchar el subárbol y colgarlo del nuevo jefe"""
+    t = _table()
+    subtree = t.alias('subtree')
+    members = select(subtree.c.descendant_id).where(subtree.c.ancestor_id == node_id)
+
+    if parent_id is not None and _es_subordinado(conn, node_id, parent_id):
+        # No debería pasar si se validó con validar_superior: se deja el
+        # subárbol sin superior en la tabla en lugar de cerrar un ciclo
+        logger.warning('Ciclo en la cadena de mando: %s bajo %s; ejecutar rebuild-jerarquia',
+                       node_id, parent_id)
+        parent_id = None
+
+    conn.execute(delete(t).where(
+        t.c.descendant_id.in_(members),
+        t.c.ancestor_id.not_in(members)
+    ))
+
+    if parent_id is not None:
+        sup = t.alias('sup')
+        sub = t.alias('sub')
+        # Producto cruzado: cada superior del nuevo jefe con cada miembro del subárbol
+        rows = select(sup.c.ancestor_id, sub.c.descendant_id, sup.c.depth + sub.c.depth + 1)\
+            .select_from(sup.join(sub, true()))\
+            .where(sup.c.descendant_id == parent_id, sub.c.ancestor_id == node_id)
+        conn.execute(insert(t).from_select(_COLUMNS, rows))
+
+
+def _parents_first(nodes):
+    """Ordenar altas de modo que un jefe nuevo se procese antes que sus subordinados"""
+    pending = {n.id: n for n in nodes}
+    ordered = []
+    while pending:
+        ready = [n for n in pending.values() if n.superior_directo_id not in pending]
+        if not ready:  # Ciclo entre altas: se procesan tal cual
+            ready = list(pending.values())
+        for node in ready:
+            ordered.append(node)
+            pending.pop(node.id)
+    return ordered
+
+
+def _superior_changed(obj):
+    attrs = inspect(obj).attrs
+    return attrs.superior_directo_id.history.has_changes() or attrs.superior.history.has_changes()
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_jerarquia(session, flush_context):
+    from app.models.personal import Personal
+
+    nuevos = [o for o in session.new if isinstance(o, Personal)]
+    movidos = [o for o in session.dirty if isinstance(o, Personal) and _superior_changed(o)]
+    if not nuevos and not movidos:
+        return
+
+    # Las bajas no necesitan nada: las filas de la persona borrada caen por
+    # ON DELETE CASCADE y sus subordinados tienen que cambiar de superior
+    conn = session.connection()
+    for node in _parents_first(nuevos):
+        _insert_node(conn, node.id, node.superior_directo_id)
+    for node in movidos:
+        _move_subtree(conn, node.id, node.superior_directo_id)
+
+
+def rebuild_jerarquia():
+    """Recalcular toda la tabla desde superior_directo_id (CTE recursiva)"""
+    from app.models.personal import Personal
+
+    t = _table()
+    personal = Personal.__table__
+    hijo = personal.alias('hijo')
+
+    chain = select(
+        personal.c.id.label('ancestor_id'),
+        personal.c.id.label('descendant_id'),
+        literal(0).label('depth')
+    ).cte('chain', recursive=True)
+    chain = chain.union_all(
+        select(chain.c.ancestor_id, hijo.c.id, chain.c.depth + 1).where(
+            hijo.c.superior_directo_id == chain.c.descendant_id,
+            chain.c.depth < MAX_DEPTH
+        )
+    )
+
+    db.session.execute(delete(t))
+    result = db.session.execute(insert(t).from_select(_COLUMNS, select(chain)))
+    db.session.commit()
+    return result.rowcount
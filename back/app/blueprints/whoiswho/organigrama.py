@@ -0,0 +1,170 @@
+"""
+Organigrama materializado en memoria.
+
+El árbol se lee con una sola consulta (nodos + personal) y se arma en
+memoria a partir de `parent_id`, sin tocar las relaciones lazy `children`.
+La copia queda cacheada por versión: cualquier escritura sobre Organigrama o
+Personal incrementa `organigrama:version` en el almacenamiento compartido y
+todos los workers la descartan en el próximo request.
+
+El árbol completo se guarda ya serializado; los subárboles pedidos con
+`root=`/`depth=` se serializan desde el índice en memoria y se cachean
+mientras la versión no cambie.
+"""
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload
+
+from app.utils.cache import TTLCache
+from app.utils.responses import RawJSON, dumps
+from app.utils.shared_store import shared_store
+
+_VERSION_KEY = 'organigrama:version'
+
+
+class OrganigramaSnapshot:
+    """Nodos del organigrama indexados por id y por padre"""
+
+    def __init__(self, version, nodes, children):
+        self.version = version
+        self.nodes = nodes          # id -> dict del nodo (sin children)
+        self.children = children    # parent_id (None = raíz) -> [ids] por orden
+        self.built_at = time.time()
+        self.full_tree = RawJSON(dumps({'tree': self.tree()}))
+
+    def tree(self, root=None, depth=None):
+        """Subárbol desde `root` (o desde las raíces) hasta `depth` niveles"""
+        root_ids = [root] if root is not None else self.children.get(None, [])
+        return [self._node(node_id, depth) for node_id in root_ids]
+
+    def _node(self, node_id, depth):
+        node = dict(self.nodes[node_id])
+        child_ids = self.children.get(node_id, [])
+        node['children_count'] = len(child_ids)
+
+        if depth is None or depth > 0:
+            next_depth = None if depth is None else depth - 1
+            node['children'] = [self._node(c, next_depth) for c in child_ids]
+        else:
+            node['children'] = []
+        return node
+
+
+def build_snapshot(version):
+    """Leer todo el organigrama en una consulta y armar el índice"""
+    from app.models.personal import Organigrama
+
+    rows = Organigrama.query.options(joinedload(Organigrama.personal))\
+                            .order_by(Organigrama.orden, Organigrama.id)\
+                            .all()
+
+    nodes = {row.id: row.to_dict() for row in rows}
+    children = {}
+    for row in rows:
+        parent_id = row.parent_id if row.parent_id in nodes else None
+        if row.parent_id is not None and parent_id is None:
+            continue  # Nodo huérfano: su padre ya no existe
+        children.setdefault(parent_id, []).append(row.id)
+
+    return OrganigramaSnapshot(version, nodes, children)
+
+
+class OrganigramaCache:
+
+    def __init__(self):
+        self.ttl = 600
+        self._snapshot = None
+        self._subtrees = TTLCache(maxsize=256, ttl=600)
+        self._lock = threading.Lock()
+
+    def configure(self, ttl=None):
+        if ttl is not None:
+            self.ttl = ttl
+            self._subtrees.configure(ttl=ttl)
+
+    def _fresh(self, snapshot, version):
+        return (snapshot is not None and snapshot.version == version
+                and time.time() - snapshot.built_at < self.ttl)
+
+    def snapshot(self):
+        version = int(shared_store.get(_VERSION_KEY) or 0)
+        snapshot = self._snapshot
+        if self._fresh(snapshot, version):
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if not self._fresh(snapshot, version):
+                snapshot = build_snapshot(version)
+                self._snapshot = snapshot
+                self._subtrees.clear()
+        return snapshot
+
+    def get(self, root=None, depth=None):
+        """
+        Árbol serializado (RawJSON con {'tree': [...]}).
+        Retorna None si `root` no existe.
+        """
+        snapshot = self.snapshot()
+        if root is None and depth is None:
+            return snapshot.full_tree
+
+        if root is not None and root not in snapshot.nodes:
+            return None
+
+        key = (snapshot.version, snapshot.built_at, root, depth)
+        payload = self._subtrees.get(key)
+        if payload is None:
+            payload = RawJSON(dumps({'tree': snapshot.tree(root, depth)}))
+            self._subtrees.set(key, payload)
+        return payload
+
+    def invalidate(self):
+        """Nueva versión para todos los workers"""
+        shared_store.incr(_VERSION_KEY)
+        self._snapshot = None
+
+
+organigrama_cache = OrganigramaCache()
+
+
+def init_organigrama_cache(app):
+    organigrama_cache.configure(ttl=app.config.get('ORGANIGRAMA_CACHE_TTL'))
+
+
+# --- Invalidación por escrituras ----------------------------------------------
+
+_INVALIDATE_KEY = 'organigrama_invalidate'
+
+
+def _tracked(cls):
+    from app.models.personal import Personal, Organigrama
+    return issubclass(cls, (Personal, Organigrama))
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_organigrama_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if _tracked(type(obj)):
+            session.info[_INVALIDATE_KEY] = True
+            return
+
+
+@event.listens_for(Session, 'after_bulk_update')
+@event.listens_for(Session, 'after_bulk_delete')
+def _collect_bulk_organigrama_changes(context):
+    if _tracked(context.mapper.class_):
+        context.session.info[_INVALIDATE_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_organigrama_invalidation(session):
+    if session.info.pop(_INVALIDATE_KEY, False):
+        organigrama_cache.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_organigrama_invalidation(session):
+    session.info.pop(_INVALIDATE_KEY, None)
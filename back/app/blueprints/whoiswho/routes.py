@@ -1,6 +1,12 @@
 from flask import request
 from app.blueprints.whoiswho import whoiswho_bp
-from app.utils.responses import success_response, paginated_response
+from app.blueprints.whoiswho.servicies import WhoIsWhoService
+from app.blueprints.whoiswho.typeahead import personal_typeahead
+from app.blueprints.whoiswho.jerarquia import JerarquiaInvalida
+from app.models.personal import Personal
+from app.utils.responses import success_response, error_response, paginated_response
+from app.utils.pagination import get_pagination_args, InvalidCursor
+from app.utils.permissions import require_permission
 from flask_jwt_extended import jwt_required
 
 
@@ -8,73 +14,38 @@ from flask_jwt_extended import jwt_required
 @jwt_required()
 def get_personal():
     """Lista todo el personal con filtros"""
-    # Datos de ejemplo
-    personal = [
-        {
-            'id': '1',
-            'legajo': '10001',
-            'nombre': 'Juan',
-            'apellido': 'Pérez',
-            'rango': 'Comisario',
-            'cargo': 'Jefe de Investigaciones',
-            'area': 'Investigaciones',
-            'dependencia': 'Dirección de Investigaciones',
-            'telefono_directo': '011-4555-5679',
-            'email_institucional': 'jperez@test.com',
-            'activo': True
-        },
-        {
-            'id': '2',
-            'legajo': '10002',
-            'nombre': 'María',
-            'apellido': 'González',
-            'rango': 'Inspector',
-            'cargo': 'Inspector de Operaciones',
-            'area': 'Operaciones',
-            'dependencia': 'Comisaría 1',
-            'telefono_directo': '011-4555-1235',
-            'email_institucional': 'mgonzalez@test.com',
-            'activo': True
-        },
-        {
-            'id': '3',
-            'legajo': '10003',
-            'nombre': 'Carlos',
-            'apellido': 'Rodríguez',
-            'rango': 'Oficial',
-            'cargo': 'Oficial de Patrullaje',
-            'area': 'Patrullaje',
-            'dependencia': 'Comisaría 1',
-            'telefono_directo': '011-4555-1236',
-            'email_institucional': 'crodriguez@test.com',
-            'activo': True
-        },
-        {
-            'id': '4',
-            'legajo': '10004',
-            'nombre': 'Ana',
-            'apellido': 'Martínez',
-            'rango': 'Subcomisario',
-            'cargo': 'Coordinadora de Seguridad',
-            'area': 'Seguridad',
-            'dependencia': 'Superintendencia',
-            'telefono_directo': '011-4555-9013',
-            'email_institucional': 'amartinez@test.com',
-            'activo': True
-        }
-    ]
-    
-    page = request.args.get('page', 1, type=int)
-    limit = request.args.get('limit', 20, type=int)
+    try:
+        pagination = get_pagination_args()
+        result = WhoIsWhoService.search_personal(
+            search=request.args.get('search', ''),
+            area=request.args.get('area', ''),
+            rango=request.args.get('rango', ''),
+            dependencia=request.args.get('dependencia', ''),
+            **pagination
+        )
+    except InvalidCursor as e:
+        return error_response('INVALID_CURSOR', str(e), 400)
     
+    page = result['pagination']
     return paginated_response(
-        data=personal,
-        page=page,
-        limit=limit,
-        total=len(personal)
+        data=result['personal'],
+        page=page.page,
+        limit=page.limit,
+        total=page.total,
+        next_cursor=page.next_cursor,
+        has_more=page.has_more,
+        total_estimated=page.total_estimated
     )
 
 
+@whoiswho_bp.route('/personal/typeahead', methods=['GET'])
+@jwt_required()
+def typeahead_personal():
+    """Sugerencias de personal mientras se escribe (legajo, apellido, nombre)"""
+    limit = max(1, min(request.args.get('limit', 10, type=int) or 10, 50))
+    return success_response(personal_typeahead.search(request.args.get('q', ''), limit=limit))
+
+
 @whoiswho_bp.route('/personal/<personal_id>', methods=['GET'])
 @jwt_required()
 def get_personal_detail(personal_id):
@@ -110,11 +81,100 @@ def get_personal_detail(personal_id):
     return success_response({'personal': personal})
 
 
+@whoiswho_bp.route('/personal/<personal_id>/cadena-mando', methods=['GET'])
+@jwt_required()
+def get_cadena_mando(personal_id):
+    """Cadena de mando completa hacia arriba"""
+    if not Personal.query.get(personal_id):
+        return error_response('NOT_FOUND', 'Personal no encontrado', 404)
+    
+    return success_response({'cadena': WhoIsWhoService.get_cadena_mando(personal_id)})
+
+
+@whoiswho_bp.route('/personal/<personal_id>/superior', methods=['PUT'])
+@jwt_required()
+@require_permission('whoiswho.editar')
+def update_superior(personal_id):
+    """Cambiar el superior directo de una persona"""
+    personal = Personal.query.get(personal_id)
+    if not personal:
+        return error_response('NOT_FOUND', 'Personal no encontrado', 404)
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or 'superior_id' not in data:
+        return error_response('VALIDATION_ERROR', 'superior_id es requerido', 400)
+    
+    superior_id = data['superior_id']
+    if superior_id is not None and not Personal.query.get(superior_id):
+        return error_response('NOT_FOUND', 'Superior no encontrado', 404)
+    
+    try:
+        WhoIsWhoService.cambiar_superior(personal, superior_id)
+    except JerarquiaInvalida as e:
+        return error_response('VALIDATION_ERROR', str(e), 400)
+    
+    return success_response(personal.to_dict(), 'Superior actualizado')
+
+
+@whoiswho_bp.route('/personal/<personal_id>/subordinados', methods=['GET'])
+@jwt_required()
+def get_subordinados(personal_id):
+    """Personal a cargo a cualquier profundidad (depth limita los niveles)"""
+    if not Personal.query.get(personal_id):
+        return error_response('NOT_FOUND', 'Personal no encontrado', 404)
+    
+    try:
+        pagination = get_pagination_args()
+        result = WhoIsWhoService.search_subordinados(
+            personal_id,
+            max_depth=request.args.get('depth', type=int),
+            **pagination
+        )
+    except InvalidCursor as e:
+        return error_response('INVALID_CURSOR', str(e), 400)
+    
+    page = result['pagination']
+    return paginated_response(
+        data=result['personal'],
+        page=page.page,
+        limit=page.limit,
+        total=page.total,
+        next_cursor=page.next_cursor,
+        has_more=page.has_more,
+        total_estimated=page.total_estimated
+    )
+
+
+@whoiswho_bp.route('/personal/<personal_id>/dotacion', methods=['GET'])
+@jwt_required()
+def get_dotacion(personal_id):
+    """Dotación bajo una persona, por subárbol"""
+    if not Personal.query.get(personal_id):
+        return error_response('NOT_FOUND', 'Personal no encontrado', 404)
+    
+    return success_response(WhoIsWhoService.get_dotacion(personal_id))
+
+
 @whoiswho_bp.route('/organigrama', methods=['GET'])
 @jwt_required()
 def get_organigrama():
-    """Estructura jerárquica completa"""
-    return success_response({'tree': []})
+    """
+    Estructura jerárquica. `root` limita al subárbol de ese nodo y `depth`
+    a esa cantidad de niveles (la UI expande el resto bajo demanda)
+    """
+    root = request.args.get('root') or None
+    depth = request.args.get('depth')
+    
+    if depth is not None:
+        if not depth.isdigit():
+            return error_response('VALIDATION_ERROR', 'depth debe ser un entero >= 0', 400)
+        depth = int(depth)
+    
+    tree = WhoIsWhoService.get_organigrama(root=root, depth=depth)
+    if tree is None:
+        return error_response('NOT_FOUND', 'Nodo del organigrama no encontrado', 404)
+    
+    return success_response(tree)
 
 
 @whoiswho_bp.route('/dependencias', methods=['GET'])
@@ -1,6 +1,10 @@
-from sqlalchemy import or_
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
 from app.extensions import db
-from app.models.personal import Personal, Dependencia, Organigrama
+from app.models.personal import Personal, PersonalJerarquia, Dependencia
+from app.utils.pagination import paginate_query
+from app.blueprints.whoiswho.organigrama import organigrama_cache
+from app.blueprints.whoiswho.jerarquia import validar_superior
 
 
 # Tabla intermedia para favoritos
@@ -14,21 +18,15 @@ class WhoIsWhoService:
     """Servicios para WhoIsWho"""
     
     @staticmethod
-    def search_personal(search='', area='', rango='', dependencia='', page=1, limit=20):
-        """Busca personal con filtros"""
+    def search_personal(search='', area='', rango='', dependencia='', page=1, limit=20,
+                        cursor=None, total_mode='estimate'):
+        """Busca personal con filtros (paginación por offset o por cursor)"""
         query = Personal.query.filter_by(activo=True)
         
-        # Filtro de búsqueda por nombre, apellido, legajo
-        if search:
-            search_term = f'%{search}%'
-            query = query.filter(
-                or_(
-                    Personal.nombre.ilike(search_term),
-                    Personal.apellido.ilike(search_term),
-                    Personal.legajo.ilike(search_term),
-                    Personal.email_institucional.ilike(search_term)
-                )
-            )
+        # Filtro de búsqueda por nombre, apellido, legajo (sin acentos ni mayúsculas)
+        search_filter = Personal.search_filter(search)
+        if search_filter is not None:
+            query = query.filter(search_filter)
         
         # Filtro por área
         if area:
@@ -42,18 +40,20 @@ class WhoIsWhoService:
         if dependencia:
             query = query.filter(Personal.dependencia.ilike(f'%{dependencia}%'))
         
-        # Contar total
-        total = query.count()
-        
-        # Paginar
-        personal_list = query.order_by(Personal.apellido, Personal.nombre)\
-                            .offset((page - 1) * limit)\
-                            .limit(limit)\
-                            .all()
+        # Paginar (total estimado salvo que se pida exacto)
+        result = paginate_query(
+            query,
+            [(Personal.apellido, 'asc'), (Personal.nombre, 'asc'), (Personal.id, 'asc')],
+            page=page,
+            limit=limit,
+            cursor=cursor,
+            total_mode=total_mode
+        )
         
         return {
-            'personal': [p.to_dict() for p in personal_list],
-            'total': total
+            'personal': [p.to_dict() for p in result.items],
+            'total': result.total,
+            'pagination': result
         }
     
     @staticmethod
@@ -91,20 +91,99 @@ class WhoIsWhoService:
         return {'personal': data}
     
     @staticmethod
-    def get_organigrama():
-        """Obtiene la estructura jerárquica completa"""
-        # Obtener nodos raíz (sin padre)
-        root_nodes = Organigrama.query.filter_by(parent_id=None)\
-                                       .order_by(Organigrama.orden)\
-                                       .all()
-        
-        def build_tree(node):
-            """Construye árbol recursivamente"""
-            return node.to_dict(include_children=True)
+    def get_cadena_mando(personal_id):
+        """Superiores de una persona hasta el tope, del más cercano al más lejano"""
+        rows = db.session.query(Personal, PersonalJerarquia.depth)\
+            .join(PersonalJerarquia, PersonalJerarquia.ancestor_id == Personal.id)\
+            .filter(PersonalJerarquia.descendant_id == personal_id,
+                    PersonalJerarquia.depth > 0)\
+            .order_by(PersonalJerarquia.depth)\
+            .all()
+        
+        return [{**p.to_dict(), 'distancia': depth} for p, depth in rows]
+    
+    @staticmethod
+    def cambiar_superior(personal, superior_id):
+        """Cambiar el superior directo (JerarquiaInvalida si formaría un ciclo)"""
+        validar_superior(personal.id, superior_id)
+        personal.superior_directo_id = superior_id
+        db.session.commit()
+        return personal
+    
+    @staticmethod
+    def search_subordinados(personal_id, max_depth=None, page=1, limit=20,
+                            cursor=None, total_mode='estimate'):
+        """Personal a cargo a cualquier profundidad (o hasta max_depth niveles)"""
+        query = Personal.query\
+            .join(PersonalJerarquia, PersonalJerarquia.descendant_id == Personal.id)\
+            .filter(PersonalJerarquia.ancestor_id == personal_id,
+                    PersonalJerarquia.depth > 0,
+                    Personal.activo == True)
+        
+        if max_depth is not None:
+            query = query.filter(PersonalJerarquia.depth <= max_depth)
+        
+        result = paginate_query(
+            query,
+            [(Personal.apellido, 'asc'), (Personal.nombre, 'asc'), (Personal.id, 'asc')],
+            page=page,
+            limit=limit,
+            cursor=cursor,
+            total_mode=total_mode
+        )
         
-        tree = [build_tree(node) for node in root_nodes]
+        return {
+            'personal': [p.to_dict() for p in result.items],
+            'pagination': result
+        }
+    
+    @staticmethod
+    def get_dotacion(personal_id):
+        """
+        Dotación activa bajo una persona, desglosada por subordinado directo
+        (cada subárbol incluye al subordinado)
+        """
+        directo = aliased(PersonalJerarquia)
+        rama = aliased(PersonalJerarquia)
+        jefe = aliased(Personal)
+        
+        rows = db.session.query(
+            jefe.id, jefe.nombre, jefe.apellido, jefe.rango, jefe.cargo,
+            func.count(Personal.id)
+        ).select_from(directo)\
+            .join(jefe, jefe.id == directo.descendant_id)\
+            .join(rama, rama.ancestor_id == directo.descendant_id)\
+            .join(Personal, Personal.id == rama.descendant_id)\
+            .filter(directo.ancestor_id == personal_id,
+                    directo.depth == 1,
+                    Personal.activo == True)\
+            .group_by(jefe.id, jefe.nombre, jefe.apellido, jefe.rango, jefe.cargo)\
+            .order_by(jefe.apellido, jefe.nombre)\
+            .all()
+        
+        subordinados = [
+            {
+                'id': row[0],
+                'nombre_completo': f'{row[1]} {row[2]}',
+                'rango': row[3],
+                'cargo': row[4],
+                'dotacion': row[5]
+            }
+            for row in rows
+        ]
         
-        return tree
+        return {
+            'total': sum(s['dotacion'] for s in subordinados),
+            'subordinados': subordinados
+        }
+    
+    @staticmethod
+    def get_organigrama(root=None, depth=None):
+        """
+        Estructura jerárquica (completa o un subárbol hasta `depth` niveles),
+        ya serializada desde el organigrama materializado
+        """
+        return organigrama_cache.get(root=root, depth=depth)
     
     @staticmethod
     def search_dependencias(tipo='', search=''):
@@ -116,14 +195,9 @@ class WhoIsWhoService:
             query = query.filter(Dependencia.tipo.ilike(f'%{tipo}%'))
         
         # Filtro de búsqueda
-        if search:
-            search_term = f'%{search}%'
-            query = query.filter(
-                or_(
-                    Dependencia.nombre.ilike(search_term),
-                    Dependencia.direccion.ilike(search_term)
-                )
-            )
+        search_filter = Dependencia.search_filter(search)
+        if search_filter is not None:
+            query = query.filter(search_filter)
         
         dependencias = query.order_by(Dependencia.nombre).all()
         
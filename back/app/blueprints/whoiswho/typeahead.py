@@ -0,0 +1,225 @@
+"""
+Typeahead del directorio de personal.
+
+Índice de prefijos en memoria (app.utils.text_search.PrefixIndex) con el
+personal activo. Relevancia por nivel:
+
+1. legajo exacto
+2. apellido + nombre ("perez ju")
+3. nombre + apellido ("juan pe")
+4. prefijo de legajo
+5. resto de los apellidos, usuario del email institucional y área
+
+Sincronización: el worker que confirma cambios sobre Personal los aplica en
+su índice e incrementa `typeahead:personal:version` en el almacenamiento
+compartido; los demás workers ven la versión nueva y releen sólo las filas
+con `updated_at` posterior a su última lectura. Cada
+PERSONAL_TYPEAHEAD_RELOAD segundos se recarga el índice completo.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.utils.text_search import PrefixIndex, search_key
+from app.utils.shared_store import shared_store
+
+_VERSION_KEY = 'typeahead:personal:version'
+
+TIERS = [
+    ('legajo', True),
+    ('apellido', False),
+    ('nombre', False),
+    ('legajo_prefijo', False),
+    ('otros', False)
+]
+
+# Margen para relojes desparejos entre workers al releer por updated_at
+_SYNC_MARGIN = timedelta(seconds=60)
+
+_COLUMNS = ('id', 'legajo', 'nombre', 'apellido', 'rango', 'cargo', 'area',
+            'dependencia', 'email_institucional', 'foto_path', 'activo', 'updated_at')
+
+
+def _entry(row):
+    """(claves por nivel, payload) de una fila de Personal"""
+    legajo = search_key(row.legajo)
+    apellido = search_key(row.apellido)
+    nombre = search_key(row.nombre)
+    email_user = search_key((row.email_institucional or '').split('@')[0])
+
+    keys = {
+        'legajo': [legajo],
+        'apellido': [f'{apellido} {nombre}'.strip()],
+        'nombre': [f'{nombre} {apellido}'.strip()],
+        'legajo_prefijo': [legajo],
+        'otros': apellido.split()[1:] + [k for k in (email_user, search_key(row.area)) if k]
+    }
+    payload = {
+        'id': row.id,
+        'legajo': row.legajo,
+        'nombre_completo': f'{row.nombre} {row.apellido}',
+        'rango': row.rango,
+        'cargo': row.cargo,
+        'area': row.area,
+        'dependencia': row.dependencia,
+        'foto_path': row.foto_path
+    }
+    return keys, payload
+
+
+class PersonalTypeahead:
+
+    def __init__(self):
+        self.reload_interval = 3600
+        self._index = PrefixIndex(TIERS)
+        self._version = None
+        self._watermark = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def configure(self, reload_interval=None):
+        if reload_interval is not None:
+            self.reload_interval = reload_interval
+
+    def _query(self):
+        from app.models.personal import Personal
+        return db.session.query(*(getattr(Personal, c) for c in _COLUMNS))
+
+    def _apply(self, rows):
+        for row in rows:
+            if row.activo:
+                keys, payload = _entry(row)
+                self._index.add(row.id, keys, payload)
+            else:
+                self._index.remove(row.id)
+            if row.updated_at and (self._watermark is None or row.updated_at > self._watermark):
+                self._watermark = row.updated_at
+
+    def _full_load(self, version):
+        from app.models.personal import Personal
+
+        rows = self._query().filter(Personal.activo == True).all()
+        self._index.load((row.id, *_entry(row)) for row in rows)
+        self._watermark = max((r.updated_at for r in rows if r.updated_at), default=None)
+        self._version = version
+        self._loaded_at = time.time()
+
+    def _delta_load(self, version):
+        from app.models.personal import Personal
+
+        query = self._query()
+        if self._watermark is not None:
+            query = query.filter(Personal.updated_at >= self._watermark - _SYNC_MARGIN)
+        self._apply(query.all())
+        self._version = version
+
+    def ensure_fresh(self):
+        version = str(shared_store.get(_VERSION_KEY) or 0)
+        expired = time.time() - self._loaded_at >= self.reload_interval
+        if self._index.ready and version == self._version and not expired:
+            return
+
+        with self._lock:
+            if not self._index.ready or time.time() - self._loaded_at >= self.reload_interval:
+                self._full_load(version)
+            elif version != self._version:
+                self._delta_load(version)
+
+    def search(self, text, limit=10):
+        """Entradas compactas del personal que coincide, por relevancia"""
+        self.ensure_fresh()
+        return [payload for _, payload in self._index.search(text, limit=limit)]
+
+    def search_ids(self, text, limit=10):
+        self.ensure_fresh()
+        return [doc_id for doc_id, _ in self._index.search(text, limit=limit)]
+
+    def apply_committed(self, rows, complete=True):
+        """
+        Aplicar cambios confirmados por este worker y avisar a los demás.
+        Con complete=False (UPDATE masivo) este worker también relee.
+        """
+        version = str(shared_store.incr(_VERSION_KEY))
+        if not self._index.ready:
+            return
+
+        with self._lock:
+            self._apply(rows)
+            # Si nadie más escribió en el medio, no hace falta releer
+            if complete and self._version is not None and int(self._version) + 1 == int(version):
+                self._version = version
+
+
+personal_typeahead = PersonalTypeahead()
+
+
+def init_personal_typeahead(app):
+    personal_typeahead.configure(reload_interval=app.config.get('PERSONAL_TYPEAHEAD_RELOAD'))
+
+
+# --- Sincronización con escrituras --------------------------------------------
+
+_PENDING_KEY = 'personal_typeahead_pending'
+_BULK_KEY = 'personal_typeahead_bulk'
+
+_INDEXED = ('legajo', 'nombre', 'apellido', 'rango', 'cargo', 'area',
+            'dependencia', 'email_institucional', 'foto_path', 'activo')
+
+
+class _Snapshot:
+    """Valores de una fila de Personal al momento del flush"""
+
+    def __init__(self, obj):
+        for column in _COLUMNS:
+            setattr(self, column, getattr(obj, column))
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_personal_changes(session, flush_context):
+    from app.models.personal import Personal
+
+    pending = None
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Personal):
+            continue
+        if obj in session.dirty:
+            attrs = inspect(obj).attrs
+            if not any(getattr(attrs, c).history.has_changes() for c in _INDEXED):
+                continue
+        if pending is None:
+            pending = session.info.setdefault(_PENDING_KEY, {})
+        pending[obj.id] = _Snapshot(obj)
+
+    for obj in session.deleted:
+        if isinstance(obj, Personal):
+            snapshot = _Snapshot(obj)
+            snapshot.activo = False
+            session.info.setdefault(_PENDING_KEY, {})[obj.id] = snapshot
+
+
+@event.listens_for(Session, 'after_bulk_update')
+@event.listens_for(Session, 'after_bulk_delete')
+def _collect_bulk_personal_changes(context):
+    from app.models.personal import Personal
+
+    if context.mapper.class_ is Personal:
+        # Sin filas concretas: forzar la relectura por versión
+        context.session.info[_BULK_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_personal_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    bulk = session.info.pop(_BULK_KEY, False)
+    if pending is not None or bulk:
+        personal_typeahead.apply_committed(list((pending or {}).values()), complete=not bulk)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_personal_changes(session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_BULK_KEY, None)
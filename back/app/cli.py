@@ -0,0 +1,99 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from app.utils.maintenance import purge_auth_tables, rebuild_all_search_keys
+from app.blueprints.whoiswho.jerarquia import rebuild_jerarquia
+from app.blueprints.protocol.search import reindex_protocolos
+from app.blueprints.protocol.extraction import extractor, pending_documents, process_document
+from app.blueprints.capacitacion.tendencias import backfill_tendencias
+from app.blueprints.capacitacion.alertas import evaluate_alertas
+from app.blueprints.capacitacion.cumplimiento import backfill_cumplimiento
+from app.blueprints.capacitacion.inscripcion import dedupe_participantes
+
+maintenance_cli = AppGroup('maintenance', help='Tareas de mantenimiento')
+
+
+@maintenance_cli.command('purge-auth')
+@click.option('--batch-size', type=int, default=None, help='Filas por lote (default: MAINTENANCE_BATCH_SIZE)')
+def purge_auth_command(batch_size):
+    """Borrar sesiones y refresh tokens expirados o revocados"""
+    def progress(table, total):
+        click.echo(f'  {table}: {total} filas borradas')
+
+    batch_size = batch_size or current_app.config['MAINTENANCE_BATCH_SIZE']
+    result = purge_auth_tables(batch_size=batch_size, progress=progress)
+    click.echo(f'Purga finalizada: {result}')
+
+
+@maintenance_cli.command('rebuild-search-keys')
+@click.option('--batch-size', default=1000, show_default=True, help='Filas por lote')
+def rebuild_search_keys_command(batch_size):
+    """Recalcular las claves de búsqueda normalizadas (sin acentos)"""
+    def progress(table, total):
+        click.echo(f'  {table}: {total} filas')
+
+    result = rebuild_all_search_keys(batch_size=batch_size, progress=progress)
+    click.echo(f'Claves de búsqueda recalculadas: {result}')
+
+
+@maintenance_cli.command('rebuild-jerarquia')
+def rebuild_jerarquia_command():
+    """Recalcular la tabla de clausura de la cadena de mando"""
+    rows = rebuild_jerarquia()
+    click.echo(f'Jerarquía reconstruida: {rows} filas')
+
+
+@maintenance_cli.command('reindex-protocolos')
+def reindex_protocolos_command():
+    """Recalcular el índice de texto completo de protocolos"""
+    count = reindex_protocolos()
+    click.echo(f'Protocolos indexados: {count}')
+
+
+@maintenance_cli.command('extract-documents')
+@click.option('--limit', default=1000, show_default=True, help='Documentos a procesar')
+@click.option('--force', is_flag=True, help='Reprocesar todos, incluso los ya extraídos, sin soporte o con error')
+def extract_documents_command(limit, force):
+    """Extraer el texto de los documentos de protocolos pendientes"""
+    estados = {}
+    for protocolo_id in pending_documents(limit, extractor.retry_delay, extractor.max_retries, force=force):
+        estado = process_document(protocolo_id, extractor.max_chars, force=force)
+        estados[estado] = estados.get(estado, 0) + 1
+    click.echo(f'Extracción finalizada: {estados}')
+
+
+@maintenance_cli.command('backfill-tendencias')
+def backfill_tendencias_command():
+    """Recalcular los agregados diarios de participación"""
+    rows = backfill_tendencias()
+    click.echo(f'Tendencias recalculadas: {rows} filas')
+
+
+@maintenance_cli.command('evaluate-alerts')
+def evaluate_alerts_command():
+    """Evaluar las reglas de alertas de capacitaciones"""
+    resumen = evaluate_alertas()
+    click.echo(f'Alertas generadas: {len(resumen.alertas)} ({resumen.duracion_ms} ms)')
+
+
+@maintenance_cli.command('backfill-cumplimiento')
+def backfill_cumplimiento_command():
+    """Recalcular la matriz de cumplimiento de capacitaciones obligatorias"""
+    rows = backfill_cumplimiento()
+    click.echo(f'Matriz de cumplimiento recalculada: {rows} filas')
+
+
+@maintenance_cli.command('dedupe-participantes')
+def dedupe_participantes_command():
+    """Borrar inscripciones repetidas y crear el índice único (capacitación, personal)"""
+    deleted = dedupe_participantes()
+    click.echo(f'Inscripciones repetidas borradas: {deleted}')
+    if deleted:
+        click.echo(f'Tendencias recalculadas: {backfill_tendencias()} filas')
+        click.echo(f'Matriz de cumplimiento recalculada: {backfill_cumplimiento()} filas')
+
+
+def register_cli_commands(app):
+    """Registrar comandos de CLI"""
+    app.cli.add_command(maintenance_cli)
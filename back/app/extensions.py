@@ -3,7 +3,9 @@ from flask_jwt_extended import JWTManager
 from flask_marshmallow import Marshmallow
 from flask_cors import CORS
 from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+
+# Registra el backend sqlite:// de rate limiting y las claves por identidad
+from app.utils.rate_limit import rate_limit_key
 
 # Inicializar extensiones
 db = SQLAlchemy()
@@ -11,6 +13,6 @@ jwt = JWTManager()
 ma = Marshmallow()
 cors = CORS()
 limiter = Limiter(
-    key_func=get_remote_address,
+    key_func=rate_limit_key,
     default_limits=["200 per day", "50 per hour"]
-)
\ No newline at end of file
+)
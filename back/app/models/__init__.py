@@ -1,9 +1,12 @@
 from app.models.user import User, RefreshToken, Sesion
 from app.models.role import Role, Permission
 from app.models.audit_log import AuditLog
-from app.models.personal import Personal, Dependencia, Organigrama
+from app.models.personal import Personal, PersonalJerarquia, Dependencia, Organigrama
 from app.models.carinfo import ConsultaVehicular, ActaCarInfo
-from app.models.protocolo import Protocolo, Capacitacion, ParticipanteCapacitacion
+from app.models.protocolo import (
+    Protocolo, ProtocoloDocumento, Capacitacion, ParticipanteCapacitacion,
+    BusquedaCapacitacion, ParticipacionDiaria, ResumenAlertas, CumplimientoCapacitacion
+)
 
 __all__ = [
     'User',
@@ -13,11 +16,17 @@ __all__ = [
     'Permission',
     'AuditLog',
     'Personal',
+    'PersonalJerarquia',
     'Dependencia',
     'Organigrama',
     'ConsultaVehicular',
     'ActaCarInfo',
     'Protocolo',
+    'ProtocoloDocumento',
     'Capacitacion',
-    'ParticipanteCapacitacion'
+    'ParticipanteCapacitacion',
+    'BusquedaCapacitacion',
+    'ParticipacionDiaria',
+    'ResumenAlertas',
+    'CumplimientoCapacitacion'
 ]
\ No newline at end of file
@@ -0,0 +1,49 @@
+from sqlalchemy import DDL, and_, event
+
+from app.extensions import db
+from app.utils.text_search import search_key
+
+
+class SearchKeyMixin:
+    """
+    Columna `search_key`: los campos de `__search_fields__` sin acentos, en
+    minúsculas y con espacios colapsados. Se recalcula en cada insert/update
+    y las búsquedas la consultan con LIKE (en PostgreSQL, con índice de
+    trigramas: ver `search_key_index`).
+    """
+    __search_fields__ = ()
+
+    search_key = db.Column(db.Text)
+
+    def compute_search_key(self):
+        return ' '.join(filter(None, (search_key(getattr(self, f)) for f in self.__search_fields__)))
+
+    @classmethod
+    def search_filter(cls, text):
+        """Todas las palabras de `text` tienen que aparecer en la clave"""
+        words = search_key(text).split()
+        if not words:
+            return None
+        return and_(*[cls.search_key.contains(word, autoescape=True) for word in words])
+
+
+def search_key_index(table_name):
+    """Índice GIN de trigramas sobre search_key (btree simple fuera de PostgreSQL)"""
+    return db.Index(
+        f'ix_{table_name}_search_key_trgm', 'search_key',
+        postgresql_using='gin',
+        postgresql_ops={'search_key': 'gin_trgm_ops'}
+    )
+
+
+@event.listens_for(SearchKeyMixin, 'before_insert', propagate=True)
+@event.listens_for(SearchKeyMixin, 'before_update', propagate=True)
+def _refresh_search_key(mapper, connection, target):
+    target.search_key = target.compute_search_key()
+
+
+# Los índices de trigramas necesitan la extensión pg_trgm
+event.listen(
+    db.Model.metadata, 'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
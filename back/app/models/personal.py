@@ -1,10 +1,13 @@
 import uuid
 from datetime import datetime
 from app.extensions import db
+from app.models.mixins import SearchKeyMixin, search_key_index
 
 
-class Personal(db.Model):
+class Personal(SearchKeyMixin, db.Model):
     __tablename__ = 'personal'
+    __table_args__ = (search_key_index('personal'),)
+    __search_fields__ = ('apellido', 'nombre', 'legajo', 'email_institucional')
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     legajo = db.Column(db.String(50), unique=True, nullable=False, index=True)
@@ -55,8 +58,30 @@ class Personal(db.Model):
         return f'<Personal {self.legajo} - {self.nombre} {self.apellido}>'
 
 
-class Dependencia(db.Model):
+class PersonalJerarquia(db.Model):
+    """
+    Tabla de clausura de la cadena de mando (derivada de superior_directo_id).
+    Una fila por cada par superior/subordinado a cualquier distancia, más la
+    fila (id, id, 0) de cada persona.
+    """
+    __tablename__ = 'personal_jerarquia'
+    __table_args__ = (
+        # Cadena de mando hacia arriba: WHERE descendant_id = ? ORDER BY depth
+        db.Index('ix_personal_jerarquia_descendant', 'descendant_id', 'depth'),
+    )
+    
+    ancestor_id = db.Column(db.String(36), db.ForeignKey('personal.id', ondelete='CASCADE'), primary_key=True)
+    descendant_id = db.Column(db.String(36), db.ForeignKey('personal.id', ondelete='CASCADE'), primary_key=True)
+    depth = db.Column(db.Integer, nullable=False)
+    
+    def __repr__(self):
+        return f'<PersonalJerarquia {self.ancestor_id} -> {self.descendant_id} ({self.depth})>'
+
+
+class Dependencia(SearchKeyMixin, db.Model):
     __tablename__ = 'dependencias'
+    __table_args__ = (search_key_index('dependencias'),)
+    __search_fields__ = ('nombre', 'direccion')
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     nombre = db.Column(db.String(150), nullable=False, index=True)
@@ -1,10 +1,20 @@
 import uuid
+from bisect import bisect_right
 from datetime import datetime
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, joinedload
 from app.extensions import db
+from app.models.mixins import SearchKeyMixin, search_key_index
 
 
-class Protocolo(db.Model):
+class Protocolo(SearchKeyMixin, db.Model):
     __tablename__ = 'protocolos'
+    __table_args__ = (
+        # Búsqueda de texto completo (ver app/blueprints/protocol/search.py)
+        db.Index('ix_protocolos_search_vector', 'search_vector', postgresql_using='gin'),
+        search_key_index('protocolos'),
+    )
+    __search_fields__ = ('nombre', 'descripcion')
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     nombre = db.Column(db.String(200), nullable=False, index=True)
@@ -21,6 +31,8 @@ class Protocolo(db.Model):
     activo = db.Column(db.Boolean, default=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # tsvector mantenido por la aplicación; no se carga con el objeto
+    search_vector = deferred(db.Column(db.Text().with_variant(TSVECTOR(), 'postgresql')))
     
     def to_dict(self):
         return {
@@ -45,8 +57,34 @@ class Protocolo(db.Model):
         return f'<Protocolo {self.nombre}>'
 
 
-class Capacitacion(db.Model):
+class ProtocoloDocumento(db.Model):
+    """Texto extraído del documento adjunto de un protocolo (en segundo plano)"""
+    __tablename__ = 'protocolo_documentos'
+    
+    ESTADOS_FINALES = ('listo', 'sin_soporte', 'error')
+    
+    protocolo_id = db.Column(db.String(36), db.ForeignKey('protocolos.id', ondelete='CASCADE'), primary_key=True)
+    documento_path = db.Column(db.String(255))
+    content_hash = db.Column(db.String(64), index=True)  # sha256 del archivo
+    estado = db.Column(db.String(20), nullable=False, default='pendiente')  # pendiente, listo, sin_soporte, error
+    texto = db.Column(db.Text)
+    paginas = db.Column(db.JSON)  # Offset de inicio de cada página dentro de `texto`
+    error = db.Column(db.Text)
+    intentos = db.Column(db.Integer, nullable=False, default=0)  # Errores seguidos (reintento con backoff)
+    extracted_at = db.Column(db.DateTime)
+    
+    def pagina_de(self, offset):
+        """Número de página (desde 1) que contiene el carácter `offset` del texto"""
+        return bisect_right(self.paginas or [0], offset) or 1
+    
+    def __repr__(self):
+        return f'<ProtocoloDocumento {self.protocolo_id} ({self.estado})>'
+
+
+class Capacitacion(SearchKeyMixin, db.Model):
     __tablename__ = 'capacitaciones'
+    __table_args__ = (search_key_index('capacitaciones'),)
+    __search_fields__ = ('nombre', 'detalle', 'area', 'tipo_formacion')
     
     # Campos existentes
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -85,7 +123,23 @@ class Capacitacion(db.Model):
     # Relación con participantes
     participantes = db.relationship('ParticipanteCapacitacion', backref='capacitacion', lazy='dynamic', cascade='all, delete-orphan')
     
-    def to_dict(self, include_participantes=False):
+    @staticmethod
+    def serialize_many(capacitaciones, include_participantes=False):
+        """
+        Serializar una lista de capacitaciones con los agregados de
+        participantes de toda la página en una sola consulta
+        """
+        stats = ParticipanteCapacitacion.stats_by_capacitacion([c.id for c in capacitaciones])
+        return [
+            c.to_dict(include_participantes=include_participantes, stats=stats.get(c.id))
+            for c in capacitaciones
+        ]
+    
+    def to_dict(self, include_participantes=False, stats=None):
+        if stats is None:
+            stats = ParticipanteCapacitacion.stats_by_capacitacion([self.id]).get(self.id)
+        stats = stats or ParticipanteCapacitacion.EMPTY_STATS
+        
         data = {
             'id': self.id,
             'nombre': self.nombre,
@@ -115,16 +169,19 @@ class Capacitacion(db.Model):
             'observaciones': self.observaciones,
             'puestos_objetivo': self.puestos_objetivo,
             'activo': self.activo,
-            'total_participantes': self.participantes.count(),
+            'total_participantes': stats['total'],
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
         
         if include_participantes:
-            data['participantes'] = [p.to_dict() for p in self.participantes]
+            participantes = ParticipanteCapacitacion.with_personal().filter(
+                ParticipanteCapacitacion.capacitacion_id == self.id
+            ).order_by(ParticipanteCapacitacion.created_at, ParticipanteCapacitacion.id)
+            data['participantes'] = [p.to_dict() for p in participantes]
             # Agregar estadísticas de participantes
-            data['participantes_asistieron'] = self.participantes.filter_by(asistio=True).count()
-            data['participantes_aprobados'] = self.participantes.filter_by(aprobado=True).count()
+            data['participantes_asistieron'] = stats['asistieron']
+            data['participantes_aprobados'] = stats['aprobados']
         
         return data
     
@@ -133,6 +190,10 @@ class Capacitacion(db.Model):
 
 class ParticipanteCapacitacion(db.Model):
     __tablename__ = 'participantes_capacitacion'
+    __table_args__ = (
+        # Una inscripción por persona; la inscripción masiva usa ON CONFLICT sobre este índice
+        db.Index('uq_participantes_capacitacion_personal', 'capacitacion_id', 'personal_id', unique=True),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     capacitacion_id = db.Column(db.String(36), db.ForeignKey('capacitaciones.id'), nullable=False)
@@ -147,6 +208,37 @@ class ParticipanteCapacitacion(db.Model):
     # Relación con Personal
     personal = db.relationship('Personal', backref='capacitaciones_realizadas')
     
+    EMPTY_STATS = {'total': 0, 'asistieron': 0, 'aprobados': 0}
+    
+    @staticmethod
+    def with_personal():
+        """Query de participantes con el personal cargado en el mismo SELECT"""
+        return ParticipanteCapacitacion.query.options(joinedload(ParticipanteCapacitacion.personal))
+    
+    @staticmethod
+    def stats_by_capacitacion(capacitacion_ids):
+        """Total, asistentes y aprobados por capacitación (un único GROUP BY)"""
+        if not capacitacion_ids:
+            return {}
+        
+        rows = db.session.query(
+            ParticipanteCapacitacion.capacitacion_id,
+            db.func.count(ParticipanteCapacitacion.id),
+            db.func.sum(db.case((ParticipanteCapacitacion.asistio == True, 1), else_=0)),
+            db.func.sum(db.case((ParticipanteCapacitacion.aprobado == True, 1), else_=0))
+        ).filter(
+            ParticipanteCapacitacion.capacitacion_id.in_(capacitacion_ids)
+        ).group_by(ParticipanteCapacitacion.capacitacion_id).all()
+        
+        return {
+            capacitacion_id: {
+                'total': total,
+                'asistieron': int(asistieron or 0),
+                'aprobados': int(aprobados or 0)
+            }
+            for capacitacion_id, total, asistieron, aprobados in rows
+        }
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -162,4 +254,81 @@ class ParticipanteCapacitacion(db.Model):
         }
     
     def __repr__(self):
-        return f'<ParticipanteCapacitacion {self.personal_id} - {self.capacitacion_id}>'
\ No newline at end of file
+        return f'<ParticipanteCapacitacion {self.personal_id} - {self.capacitacion_id}>'
+
+
+class BusquedaCapacitacion(db.Model):
+    """Frecuencia de términos buscados en capacitaciones (alimenta las sugerencias)"""
+    __tablename__ = 'busquedas_capacitacion'
+    
+    termino = db.Column(db.String(100), primary_key=True)  # search_key del texto buscado
+    texto = db.Column(db.String(100), nullable=False)  # Última forma en que se escribió
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    ultima_busqueda = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<BusquedaCapacitacion {self.termino} ({self.cantidad})>'
+
+
+class ParticipacionDiaria(db.Model):
+    """
+    Participaciones por día de capacitación, área, tipo de formación y
+    modalidad (sólo capacitaciones activas). Mantenida en la misma
+    transacción que las escrituras; ver app/blueprints/capacitacion/tendencias.py
+    """
+    __tablename__ = 'participaciones_diarias'
+    
+    # '' representa un valor sin cargar (la clave primaria no admite NULL)
+    dia = db.Column(db.Date, primary_key=True)
+    area = db.Column(db.String(100), primary_key=True, default='')
+    tipo_formacion = db.Column(db.String(50), primary_key=True, default='')
+    modalidad = db.Column(db.String(50), primary_key=True, default='')
+    inscripciones = db.Column(db.Integer, nullable=False, default=0)
+    asistencias = db.Column(db.Integer, nullable=False, default=0)
+    aprobaciones = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ParticipacionDiaria {self.dia} {self.area}/{self.tipo_formacion}/{self.modalidad}>'
+
+
+class ResumenAlertas(db.Model):
+    """Última evaluación de las reglas de alertas de un módulo"""
+    __tablename__ = 'resumen_alertas'
+    
+    modulo = db.Column(db.String(50), primary_key=True)
+    alertas = db.Column(db.JSON, nullable=False, default=list)
+    generado_en = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    duracion_ms = db.Column(db.Integer)
+    
+    def __repr__(self):
+        return f'<ResumenAlertas {self.modulo} {self.generado_en}>'
+
+
+class CumplimientoCapacitacion(db.Model):
+    """
+    Situación de cada persona activa frente a cada capacitación obligatoria
+    que le corresponde (por nivel jerárquico y puestos objetivo). Área,
+    dependencia, rango y legajo se copian de Personal para filtrar sin
+    joins. Ver app/blueprints/capacitacion/cumplimiento.py
+    """
+    __tablename__ = 'cumplimiento_capacitaciones'
+    __table_args__ = (
+        # Reportes por área, dependencia o rango, ordenados por legajo
+        db.Index('ix_cumplimiento_area', 'area', 'legajo'),
+        db.Index('ix_cumplimiento_dependencia', 'dependencia', 'legajo'),
+        db.Index('ix_cumplimiento_rango', 'rango', 'legajo'),
+        db.Index('ix_cumplimiento_capacitacion', 'capacitacion_id'),
+    )
+    
+    personal_id = db.Column(db.String(36), db.ForeignKey('personal.id', ondelete='CASCADE'), primary_key=True)
+    capacitacion_id = db.Column(db.String(36), db.ForeignKey('capacitaciones.id', ondelete='CASCADE'), primary_key=True)
+    legajo = db.Column(db.String(50), nullable=False)
+    area = db.Column(db.String(100), nullable=False, default='')
+    dependencia = db.Column(db.String(100), nullable=False, default='')
+    rango = db.Column(db.String(50), nullable=False, default='')
+    inscripto = db.Column(db.Boolean, nullable=False, default=False)
+    aprobado = db.Column(db.Boolean, nullable=False, default=False)
+    vence_en = db.Column(db.DateTime)  # fecha_caducidad de la capacitación
+    
+    def __repr__(self):
+        return f'<CumplimientoCapacitacion {self.personal_id} - {self.capacitacion_id}>'
@@ -32,16 +32,27 @@ class User(db.Model):
     role = db.relationship('Role', backref='users')
     personal = db.relationship('Personal', backref='user', foreign_keys=[personal_id])
     
+    def set_password(self, password):
+        """Hashear y guardar la contraseña con el hasher configurado"""
+        from app.utils.passwords import passwords
+        self.password_hash = passwords.hash(password)
+        self.password_changed_at = datetime.utcnow()
+    
+    def check_password(self, password):
+        """
+        Verificar la contraseña. Si es válida y el hash quedó desactualizado
+        (algoritmo o costo distinto), se re-hashea; el llamador hace commit.
+        """
+        from app.utils.passwords import passwords
+        valid, new_hash = passwords.verify_and_update(password, self.password_hash)
+        if new_hash:
+            self.password_hash = new_hash
+        return valid
+    
     def has_permission(self, permission_name):
         """Verificar si el usuario tiene un permiso específico"""
-        if not self.role:
-            return False
-        
-        # Si el usuario es admin, tiene todos los permisos
-        if self.role.name in ['admin', 'superadmin']:
-            return True
-        
-        return any(p.name == permission_name for p in self.role.permissions)
+        from app.utils.permission_matrix import get_permission_matrix
+        return get_permission_matrix().allows(self.role_id, permission_name)
     
     def has_role(self, role_name):
         """Verificar si el usuario tiene un rol específico"""
@@ -55,14 +66,9 @@ class User(db.Model):
     
     def get_permissions_list(self):
         """Obtener lista de nombres de permisos del usuario"""
-        if not self.role:
-            return []
-        
-        # Si es admin, retornar indicador de todos los permisos
-        if self.role.name in ['admin', 'superadmin']:
-            return ['*']  # Asterisco indica todos los permisos
-        
-        return [p.name for p in self.role.permissions]
+        from app.utils.permission_matrix import get_permission_matrix
+        # Asterisco indica todos los permisos (admin)
+        return get_permission_matrix().permissions_for(self.role_id)
     
     def to_dict(self, include_permissions=False):
         data = {
@@ -100,29 +106,63 @@ class User(db.Model):
 
 class RefreshToken(db.Model):
     __tablename__ = 'refresh_tokens'
+    __table_args__ = (
+        # Revocación masiva por usuario (cambio de contraseña, logout global)
+        db.Index('ix_refresh_tokens_user_revoked', 'user_id', 'revoked'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
-    token = db.Column(db.String(500), unique=True, nullable=False)
-    expires_at = db.Column(db.DateTime, nullable=False)
+    # Se guarda el JTI del refresh token (tamaño fijo), nunca el JWT completo
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    revoked = db.Column(db.Boolean, default=False)
+    revoked = db.Column(db.Boolean, default=False, nullable=False)
     
     user = db.relationship('User', backref='refresh_tokens')
     
+    @staticmethod
+    def find_active(jti, user_id):
+        """Buscar un refresh token vigente (no revocado) por JTI"""
+        return RefreshToken.query.filter_by(
+            jti=jti,
+            user_id=user_id,
+            revoked=False
+        ).first()
+    
+    @staticmethod
+    def revoke(jti, user_id):
+        """Revocar un refresh token en una sola sentencia"""
+        return RefreshToken.query.filter_by(
+            jti=jti,
+            user_id=user_id
+        ).update({'revoked': True}, synchronize_session=False)
+    
+    @staticmethod
+    def revoke_all(user_id):
+        """Revocar todos los refresh tokens del usuario en una sola sentencia"""
+        return RefreshToken.query.filter_by(
+            user_id=user_id,
+            revoked=False
+        ).update({'revoked': True}, synchronize_session=False)
+    
     def __repr__(self):
         return f'<RefreshToken {self.id}>'
 
 
 class Sesion(db.Model):
     __tablename__ = 'sesiones'
+    __table_args__ = (
+        # Listado de sesiones activas del usuario
+        db.Index('ix_sesiones_user_expires', 'user_id', 'expires_at'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     ip_address = db.Column(db.String(45))
     user_agent = db.Column(db.String(255))
     token_jti = db.Column(db.String(255))
-    expires_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_activity = db.Column(db.DateTime, default=datetime.utcnow)
     
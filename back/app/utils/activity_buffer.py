@@ -0,0 +1,159 @@
+"""
+Buffer write-behind para actividad de sesiones y datos de login.
+
+`Sesion.last_activity`, `User.last_login` y el espejo en base de
+`User.failed_login_attempts` se acumulan en memoria (sólo el último valor
+por fila) y se escriben cada ACTIVITY_FLUSH_INTERVAL segundos con UPDATEs
+en lote. Así una ráfaga de requests o de intentos fallidos no se traduce en
+un commit con lock de fila sobre `users` por request. Los UPDATE son de Core
+(sin control de filas afectadas): una sesión o un usuario borrado mientras
+estaba en el buffer no actualiza nada y se descarta.
+
+Las decisiones de bloqueo no dependen de este buffer: los intentos fallidos
+se cuentan en el almacenamiento compartido (ver `register_failed_login`).
+"""
+import atexit
+import logging
+import threading
+
+from sqlalchemy import bindparam, update
+
+from app.extensions import db
+from app.utils.shared_store import shared_store
+
+logger = logging.getLogger(__name__)
+
+
+def _update_by_id(model, columns):
+    """UPDATE por id para executemany; no falla si la fila ya no existe"""
+    table = model.__table__
+    return update(table).where(table.c.id == bindparam('_id'))\
+        .values({column: bindparam(column) for column in columns})
+
+
+class ActivityBuffer:
+
+    def __init__(self):
+        self.flush_interval = 30
+        self._app = None
+        self._sessions = {}  # sesion_id -> last_activity
+        self._users = {}     # user_id -> {columna: valor}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def init_app(self, app):
+        self._app = app
+        self.flush_interval = app.config.get('ACTIVITY_FLUSH_INTERVAL', 30)
+        atexit.register(self.shutdown)
+
+    # --- Registro (sólo memoria) -------------------------------------------
+
+    def touch_session(self, sesion_id, when):
+        with self._lock:
+            self._sessions[sesion_id] = when
+        self._ensure_flusher()
+
+    def record_login(self, user_id, when):
+        self._record_user(user_id, last_login=when, failed_login_attempts=0)
+
+    def record_failed_attempts(self, user_id, attempts):
+        self._record_user(user_id, failed_login_attempts=attempts)
+
+    def _record_user(self, user_id, **values):
+        with self._lock:
+            self._users.setdefault(user_id, {}).update(values)
+        self._ensure_flusher()
+
+    # --- Escritura en lote ---------------------------------------------------
+
+    def flush(self):
+        """Escribir lo acumulado con UPDATEs en lote. Requiere app context"""
+        from app.models.user import User, Sesion
+
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+            users, self._users = self._users, {}
+
+        if not sessions and not users:
+            return 0
+
+        try:
+            if sessions:
+                db.session.execute(_update_by_id(Sesion, ('last_activity',)), [
+                    {'_id': sesion_id, 'last_activity': when}
+                    for sesion_id, when in sessions.items()
+                ])
+
+            # Agrupar por conjunto de columnas: un executemany por grupo
+            groups = {}
+            for user_id, values in users.items():
+                groups.setdefault(tuple(sorted(values)), []).append({'_id': user_id, **values})
+            for columns, rows in groups.items():
+                db.session.execute(_update_by_id(User, columns), rows)
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.exception('Error al escribir el buffer de actividad')
+            # Reencolar sin pisar valores más nuevos
+            with self._lock:
+                for sesion_id, when in sessions.items():
+                    self._sessions.setdefault(sesion_id, when)
+                for user_id, values in users.items():
+                    merged = dict(values)
+                    merged.update(self._users.get(user_id, {}))
+                    self._users[user_id] = merged
+            return 0
+
+        return len(sessions) + len(users)
+
+    def _ensure_flusher(self):
+        if self._thread is not None or self._app is None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name='activity-buffer', daemon=True
+                )
+                self._thread.start()
+
+    def _loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self._flush_in_context()
+
+    def _flush_in_context(self):
+        with self._app.app_context():
+            try:
+                self.flush()
+            finally:
+                db.session.remove()
+
+    def shutdown(self):
+        """Escribir lo pendiente al terminar el proceso"""
+        self._stop.set()
+        if self._app is not None and (self._sessions or self._users):
+            self._flush_in_context()
+
+
+activity = ActivityBuffer()
+
+
+# --- Intentos fallidos compartidos entre workers -------------------------------
+
+def _failed_key(user_id):
+    return f'login:fail:{user_id}'
+
+
+def register_failed_login(user_id, window_seconds):
+    """
+    Contar un intento fallido en el almacenamiento compartido.
+    Retorna la cantidad de intentos dentro de la ventana.
+    """
+    attempts = shared_store.incr(_failed_key(user_id), ttl=window_seconds)
+    activity.record_failed_attempts(user_id, attempts)
+    return attempts
+
+
+def reset_failed_logins(user_id):
+    shared_store.delete(_failed_key(user_id))
@@ -1,26 +1,38 @@
 from functools import wraps
 from flask import request
 from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
-from app.models.user import User
+from app.utils.identity import resolve_identity, load_current_user
 from app.utils.responses import error_response
 
 
+def _authenticate():
+    """
+    Verifica el JWT y resuelve la identidad (una sola vez por request).
+    Retorna (identity, error_response)
+    """
+    verify_jwt_in_request()
+    identity = resolve_identity(get_jwt_identity())
+
+    if not identity or not identity.activo:
+        return None, error_response('USER_INACTIVE', 'Usuario inactivo', 403)
+
+    request.current_identity = identity
+    request.current_user = load_current_user(identity)
+    return identity, None
+
+
 def jwt_required_with_user(fn):
     """
     Decorador que verifica JWT y carga el usuario en la request
     """
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        verify_jwt_in_request()
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user or not user.activo:
-            return error_response('USER_INACTIVE', 'Usuario inactivo', 403)
-        
-        request.current_user = user
+        identity, error = _authenticate()
+        if error:
+            return error
+
         return fn(*args, **kwargs)
-    
+
     return wrapper
 
 
@@ -31,23 +43,19 @@ def permission_required(permission):
     def decorator(fn):
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            verify_jwt_in_request()
-            user_id = get_jwt_identity()
-            user = User.query.get(user_id)
-            
-            if not user or not user.activo:
-                return error_response('USER_INACTIVE', 'Usuario inactivo', 403)
-            
-            if not user.has_permission(permission):
+            identity, error = _authenticate()
+            if error:
+                return error
+
+            if not identity.has_permission(permission):
                 return error_response(
                     'INSUFFICIENT_PERMISSIONS',
                     f'Permiso requerido: {permission}',
                     403
                 )
-            
-            request.current_user = user
+
             return fn(*args, **kwargs)
-        
+
         return wrapper
     return decorator
 
@@ -59,22 +67,18 @@ def role_required(role_name):
     def decorator(fn):
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            verify_jwt_in_request()
-            user_id = get_jwt_identity()
-            user = User.query.get(user_id)
-            
-            if not user or not user.activo:
-                return error_response('USER_INACTIVE', 'Usuario inactivo', 403)
-            
-            if not user.has_role(role_name):
+            identity, error = _authenticate()
+            if error:
+                return error
+
+            if not identity.has_role(role_name):
                 return error_response(
                     'INSUFFICIENT_PERMISSIONS',
                     f'Rol requerido: {role_name}',
                     403
                 )
-            
-            request.current_user = user
+
             return fn(*args, **kwargs)
-        
+
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,194 @@
+"""
+Resolución de identidad para los decoradores de autenticación.
+
+Carga usuario y rol en una sola consulta, los memoriza en `g`
+durante la request y los guarda en una caché TTL/LRU del proceso para las
+requests siguientes. Cuando cambian `User.activo`, `User.role_id` o los
+roles, el commit incrementa `identity:version` en el almacenamiento
+compartido: cada worker compara esa versión con la de la entrada cacheada
+antes de usarla, así una baja o un cambio de rol rige en todos los procesos
+en la request siguiente. Los permisos se resuelven contra la matriz
+compilada (ver `app.utils.permission_matrix`).
+"""
+from dataclasses import dataclass
+
+from flask import g, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from werkzeug.local import LocalProxy
+
+from app.extensions import db
+from app.utils.cache import TTLCache
+from app.utils.permission_matrix import ADMIN_ROLES, get_permission_matrix
+from app.utils.shared_store import shared_store
+
+_cache = TTLCache(maxsize=10000, ttl=60)  # user_id -> (versión, Identity)
+
+_VERSION_KEY = 'identity:version'
+
+_INVALIDATE_KEY = 'identity_invalidate'
+_CLEAR_ALL = '*'
+
+
+@dataclass(frozen=True)
+class Identity:
+    """Snapshot inmutable del usuario autenticado (no es un objeto ORM)"""
+    user_id: str
+    activo: bool
+    role_id: str = None
+    role_name: str = None
+
+    def is_admin(self):
+        return self.role_name in ADMIN_ROLES
+
+    def has_role(self, role_name):
+        return self.role_name == role_name
+
+    def has_permission(self, permission_name):
+        return get_permission_matrix().allows(self.role_id, permission_name)
+
+    def check_permissions(self, permission_names):
+        return get_permission_matrix().check_many(self.role_id, permission_names)
+
+    @property
+    def permissions(self):
+        return get_permission_matrix().permissions_for(self.role_id)
+
+
+def init_identity_cache(app):
+    """Configurar la caché de identidades desde la config de la app"""
+    _cache.configure(
+        maxsize=app.config.get('IDENTITY_CACHE_MAXSIZE'),
+        ttl=app.config.get('IDENTITY_CACHE_TTL')
+    )
+
+
+def _load_identity(user_id):
+    """Cargar usuario y rol en un único round-trip"""
+    from app.models.user import User
+    from app.models.role import Role
+
+    row = db.session.query(User.activo, Role.id, Role.name)\
+                    .outerjoin(Role, User.role_id == Role.id)\
+                    .filter(User.id == user_id)\
+                    .first()
+
+    if row is None:
+        return None
+
+    activo, role_id, role_name = row
+    return Identity(
+        user_id=user_id,
+        activo=bool(activo),
+        role_id=role_id,
+        role_name=role_name
+    )
+
+
+def resolve_identity(user_id):
+    """
+    Obtener la identidad de un usuario.
+    Orden: memoizada en la request -> caché del proceso (si la versión
+    compartida no cambió) -> base de datos.
+    """
+    if not user_id:
+        return None
+
+    request_cache = g.setdefault('_identities', {}) if has_app_context() else {}
+    if user_id in request_cache:
+        return request_cache[user_id]
+
+    # La versión se lee antes de cargar: un cambio posterior invalida la entrada
+    version = int(shared_store.get(_VERSION_KEY) or 0)
+    cached = _cache.get(user_id)
+    if cached is not None and cached[0] == version:
+        identity = cached[1]
+    else:
+        identity = _load_identity(user_id)
+        if identity is not None:
+            _cache.set(user_id, (version, identity))
+
+    request_cache[user_id] = identity
+    return identity
+
+
+def load_current_user(identity):
+    """
+    Proxy perezoso al objeto User: sólo consulta la base si la vista
+    realmente lo utiliza.
+    """
+    from app.models.user import User
+    return LocalProxy(lambda: db.session.get(User, identity.user_id))
+
+
+def invalidate_identity(user_id=None):
+    """Invalidar la identidad de un usuario (o todas si no se indica)"""
+    if user_id is None:
+        _cache.clear()
+    else:
+        _cache.pop(user_id)
+
+    if has_app_context():
+        identities = g.get('_identities')
+        if identities is not None:
+            if user_id is None:
+                identities.clear()
+            else:
+                identities.pop(user_id, None)
+
+
+# --- Invalidación automática -------------------------------------------------
+
+def _mark(session, key):
+    session.info.setdefault(_INVALIDATE_KEY, set()).add(key)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_identity_changes(session, flush_context):
+    from app.models.user import User
+    from app.models.role import Role
+
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if state.attrs.activo.history.has_changes() or state.attrs.role_id.history.has_changes():
+                _mark(session, obj.id)
+        elif isinstance(obj, Role):
+            if inspect(obj).attrs.name.history.has_changes():
+                _mark(session, _CLEAR_ALL)
+
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            _mark(session, obj.id)
+        elif isinstance(obj, Role):
+            _mark(session, _CLEAR_ALL)
+
+
+@event.listens_for(Session, 'after_bulk_update')
+@event.listens_for(Session, 'after_bulk_delete')
+def _collect_bulk_identity_changes(context):
+    from app.models.user import User
+    from app.models.role import Role
+
+    if context.mapper.class_ in (User, Role):
+        _mark(context.session, _CLEAR_ALL)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_identity_invalidation(session):
+    keys = session.info.pop(_INVALIDATE_KEY, None)
+    if not keys:
+        return
+
+    # Avisar a los demás workers; este además limpia su caché ya mismo
+    shared_store.incr(_VERSION_KEY)
+    if _CLEAR_ALL in keys:
+        invalidate_identity()
+    else:
+        for user_id in keys:
+            invalidate_identity(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_identity_invalidation(session):
+    session.info.pop(_INVALIDATE_KEY, None)
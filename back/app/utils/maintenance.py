@@ -0,0 +1,105 @@
+"""
+Tareas de mantenimiento de la base de datos.
+
+Se borran filas en lotes acotados (un commit por lote) para no mantener
+locks largos ni generar transacciones gigantes sobre tablas grandes.
+"""
+from datetime import datetime
+
+from sqlalchemy import bindparam, delete, or_, select, update
+
+from app.extensions import db
+
+
+def purge_in_batches(model, condition, batch_size=1000, progress=None):
+    """
+    Borrar filas de `model` que cumplen `condition` en lotes de `batch_size`.
+    `progress(tabla, borradas_total)` se invoca después de cada lote.
+    Retorna la cantidad total de filas borradas.
+    """
+    total = 0
+    table = model.__tablename__
+
+    while True:
+        ids = select(model.id).where(condition).limit(batch_size).scalar_subquery()
+        result = db.session.execute(
+            delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        deleted = result.rowcount or 0
+        total += deleted
+        if progress and deleted:
+            progress(table, total)
+
+        if deleted < batch_size:
+            return total
+
+
+def purge_expired_sessions(batch_size=1000, progress=None, now=None):
+    """Borrar sesiones expiradas (el logout las marca como expiradas)"""
+    from app.models.user import Sesion
+
+    now = now or datetime.utcnow()
+    return purge_in_batches(Sesion, Sesion.expires_at < now, batch_size, progress)
+
+
+def purge_refresh_tokens(batch_size=1000, progress=None, now=None):
+    """Borrar refresh tokens expirados o revocados"""
+    from app.models.user import RefreshToken
+
+    now = now or datetime.utcnow()
+    condition = or_(RefreshToken.expires_at < now, RefreshToken.revoked == True)
+    return purge_in_batches(RefreshToken, condition, batch_size, progress)
+
+
+def purge_auth_tables(batch_size=1000, progress=None):
+    """Purga completa de tablas de autenticación. Retorna {tabla: borradas}"""
+    now = datetime.utcnow()
+    return {
+        'sesiones': purge_expired_sessions(batch_size, progress, now),
+        'refresh_tokens': purge_refresh_tokens(batch_size, progress, now)
+    }
+
+
+def rebuild_search_keys(model, batch_size=1000, progress=None):
+    """
+    Recalcular `search_key` de todas las filas de `model` (SearchKeyMixin),
+    por lotes ordenados por id. No toca updated_at.
+    Retorna la cantidad de filas actualizadas.
+    """
+    table = model.__table__
+    values = {'search_key': bindparam('_search_key')}
+    if 'updated_at' in table.c:
+        values['updated_at'] = table.c.updated_at
+    stmt = update(table).where(table.c.id == bindparam('_id')).values(**values)
+
+    total, last_id = 0, None
+    while True:
+        query = model.query.order_by(model.id)
+        if last_id is not None:
+            query = query.filter(model.id > last_id)
+        rows = query.limit(batch_size).all()
+        if not rows:
+            return total
+
+        params = [{'_id': row.id, '_search_key': row.compute_search_key()} for row in rows]
+        last_id = rows[-1].id
+        db.session.expunge_all()
+        db.session.execute(stmt, params)
+        db.session.commit()
+
+        total += len(params)
+        if progress:
+            progress(table.name, total)
+
+
+def rebuild_all_search_keys(batch_size=1000, progress=None):
+    """Carga inicial de las claves de búsqueda. Retorna {tabla: filas}"""
+    from app.models.personal import Personal, Dependencia
+    from app.models.protocolo import Protocolo, Capacitacion
+
+    return {
+        model.__tablename__: rebuild_search_keys(model, batch_size, progress)
+        for model in (Personal, Dependencia, Protocolo, Capacitacion)
+    }
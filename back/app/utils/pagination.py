@@ -0,0 +1,184 @@
+"""
+Paginación por offset o por cursor (keyset).
+
+- Offset: ?page=N&limit=M (compatibilidad con el frontend actual).
+- Cursor: ?cursor=<opaco>&limit=M. El cursor codifica los valores de las
+  columnas de orden de la última fila, y la página siguiente se obtiene con
+  un WHERE sobre esas columnas en lugar de un OFFSET, así el costo no crece
+  con la profundidad. `?cursor=` vacío pide la primera página.
+
+`limit` se acota a PAGINATION_MAX_LIMIT. El total es estimado por defecto
+(plan del optimizador en PostgreSQL); `?total=exact` pide un COUNT exacto y
+`?total=none` lo omite.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+
+from flask import current_app, request
+from sqlalchemy import and_, or_
+
+from app.extensions import db
+
+TOTAL_MODES = ('estimate', 'exact', 'none')
+
+
+class InvalidCursor(ValueError):
+    """Cursor malformado o de otro endpoint"""
+
+
+@dataclass
+class Page:
+    items: list
+    limit: int
+    page: int = None
+    total: int = None
+    total_estimated: bool = False
+    next_cursor: str = None
+    has_more: bool = False
+
+
+def get_pagination_args(default_limit=20):
+    """Leer page/limit/cursor/total de la query string, con limit acotado"""
+    max_limit = current_app.config.get('PAGINATION_MAX_LIMIT', 100)
+    limit = request.args.get('limit', default_limit, type=int) or default_limit
+    total_mode = request.args.get('total', 'estimate')
+
+    return {
+        'page': max(request.args.get('page', 1, type=int) or 1, 1),
+        'limit': max(1, min(limit, max_limit)),
+        'cursor': request.args.get('cursor'),
+        'total_mode': total_mode if total_mode in TOTAL_MODES else 'estimate'
+    }
+
+
+# --- Cursores -----------------------------------------------------------------
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _column_type(column):
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return None
+
+
+def _decode_value(value, column):
+    """Valor del cursor para `column`; InvalidCursor si no puede compararse con ella"""
+    if isinstance(value, dict):
+        if set(value) != {'dt'} or not isinstance(value['dt'], str):
+            raise InvalidCursor('Cursor inválido')
+        value = datetime.fromisoformat(value['dt'])
+    elif isinstance(value, list):
+        raise InvalidCursor('Cursor inválido')
+
+    expected = _column_type(column)
+    if value is None or expected is None:
+        return value
+    if expected in (int, float, Decimal):
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+    else:
+        valid = isinstance(value, expected)
+    if not valid:
+        raise InvalidCursor('Cursor inválido')
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, keyset):
+    """Valores de un cursor de `keyset`, validados contra el tipo de cada columna"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(keyset):
+            raise InvalidCursor('Cursor inválido')
+        return [_decode_value(v, column) for v, (column, _) in zip(values, keyset)]
+    except InvalidCursor:
+        raise
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor('Cursor inválido') from e
+
+
+def _keyset_filter(keyset, values):
+    """(c1 > v1) OR (c1 = v1 AND c2 > v2) OR ... respetando asc/desc por columna"""
+    clauses = []
+    for i, (column, direction) in enumerate(keyset):
+        equal = [keyset[j][0] == values[j] for j in range(i)]
+        step = column < values[i] if direction == 'desc' else column > values[i]
+        clauses.append(and_(*equal, step))
+    return or_(*clauses)
+
+
+def _order_by(keyset):
+    return [c.desc() if d == 'desc' else c.asc() for c, d in keyset]
+
+
+# --- Totales ------------------------------------------------------------------
+
+def estimate_count(query):
+    """
+    Total estimado. En PostgreSQL se toma de las filas estimadas por el plan
+    (EXPLAIN, sin ejecutar la consulta); en otros motores se cuenta.
+    """
+    bind = db.session.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return query.order_by(None).count()
+
+    compiled = query.order_by(None).statement.compile(dialect=bind.dialect)
+    plan = db.session.connection().exec_driver_sql(
+        'EXPLAIN (FORMAT JSON) ' + str(compiled), compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_total(query, total_mode):
+    """Total según el modo pedido: (total, es_estimado)"""
+    if total_mode == 'exact':
+        return query.order_by(None).count(), False
+    if total_mode == 'estimate':
+        return estimate_count(query), True
+    return None, False
+
+
+# --- Paginación ---------------------------------------------------------------
+
+def paginate_query(query, keyset, page=1, limit=20, cursor=None, total_mode='estimate'):
+    """
+    Paginar `query` ordenada por `keyset` ([(columna, 'asc'|'desc'), ...]; la
+    última columna debe ser única, normalmente el id).
+    Con `cursor` (aunque sea '') se usa keyset; si no, offset por `page`.
+    """
+    total, estimated = count_total(query, total_mode)
+
+    if cursor is not None:
+        if cursor:
+            query = query.filter(_keyset_filter(keyset, decode_cursor(cursor, keyset)))
+
+        rows = query.order_by(*_order_by(keyset)).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = encode_cursor([getattr(last, c.key) for c, _ in keyset])
+
+        return Page(items=rows, limit=limit, total=total, total_estimated=estimated,
+                    next_cursor=next_cursor, has_more=has_more)
+
+    rows = query.order_by(*_order_by(keyset)).offset((page - 1) * limit).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return Page(items=rows, limit=limit, page=page, total=total,
+                total_estimated=estimated, has_more=has_more)
@@ -0,0 +1,168 @@
+"""
+Hashing de contraseñas.
+
+El algoritmo y el costo se configuran con PASSWORD_HASH_ALGORITHM y
+PASSWORD_HASH_COST. La verificación reconoce cualquier formato soportado
+(bcrypt o werkzeug pbkdf2/scrypt), así los hashes existentes siguen siendo
+válidos y se re-hashean con la configuración vigente en el próximo login.
+
+Las operaciones costosas se ejecutan en un pool acotado de threads: si el
+pool está saturado se lanza PasswordHasherBusy en lugar de encolar sin
+límite y dejar a todos los workers WSGI esperando.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    """El pool de verificación está saturado"""
+
+
+class BcryptHasher:
+    """bcrypt con costo configurable (log2 de rondas)"""
+    name = 'bcrypt'
+    default_cost = 12
+
+    def __init__(self, cost=None):
+        self.cost = cost or self.default_cost
+
+    def hash(self, password):
+        salt = bcrypt.gensalt(rounds=self.cost)
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+    @staticmethod
+    def identify(hashed):
+        return hashed.startswith(('$2a$', '$2b$', '$2y$'))
+
+    @staticmethod
+    def verify(password, hashed):
+        try:
+            return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+        except ValueError:
+            return False
+
+    def needs_rehash(self, hashed):
+        if not self.identify(hashed):
+            return True
+        try:
+            return int(hashed.split('$')[2]) != self.cost
+        except (IndexError, ValueError):
+            return True
+
+
+class WerkzeugHasher:
+    """Hashes de werkzeug: pbkdf2 (costo = iteraciones) o scrypt (costo = N)"""
+    default_costs = {'pbkdf2': 600000, 'scrypt': 2 ** 15}
+
+    def __init__(self, name='pbkdf2', cost=None):
+        if name not in self.default_costs:
+            raise ValueError(f'Algoritmo de hash no soportado: {name}')
+        self.name = name
+        self.cost = cost or self.default_costs[name]
+
+    @property
+    def method(self):
+        if self.name == 'pbkdf2':
+            return f'pbkdf2:sha256:{self.cost}'
+        return f'scrypt:{self.cost}:8:1'
+
+    def hash(self, password):
+        return generate_password_hash(password, method=self.method)
+
+    @staticmethod
+    def identify(hashed):
+        return hashed.startswith(('pbkdf2:', 'scrypt:'))
+
+    @staticmethod
+    def verify(password, hashed):
+        try:
+            return check_password_hash(hashed, password)
+        except ValueError:
+            return False
+
+    def needs_rehash(self, hashed):
+        return not hashed.startswith(self.method + '$')
+
+
+def build_hasher(algorithm='bcrypt', cost=None):
+    """Construir el hasher para un algoritmo y costo"""
+    if algorithm == 'bcrypt':
+        return BcryptHasher(cost)
+    return WerkzeugHasher(algorithm, cost)
+
+
+class PasswordManager:
+    """Hasher configurado + pool acotado para las operaciones costosas"""
+
+    def __init__(self):
+        self.hasher = BcryptHasher()
+        self.queue_timeout = 2
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._workers = 4
+
+    def init_app(self, app):
+        self.hasher = build_hasher(
+            app.config.get('PASSWORD_HASH_ALGORITHM', 'bcrypt'),
+            app.config.get('PASSWORD_HASH_COST')
+        )
+        self.queue_timeout = app.config.get('PASSWORD_HASH_QUEUE_TIMEOUT', 2)
+        self._workers = app.config.get('PASSWORD_HASH_WORKERS', 4)
+
+    def _pool(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._slots = threading.BoundedSemaphore(self._workers * 2)
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._workers,
+                        thread_name_prefix='password-hasher'
+                    )
+        return self._executor
+
+    def _run(self, fn, *args):
+        executor = self._pool()
+        # Como máximo un trabajo en curso y otro en espera por worker
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise PasswordHasherBusy('Demasiadas verificaciones de contraseña en curso')
+        try:
+            return executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _verify(password, hashed):
+        if not hashed:
+            return False
+        if BcryptHasher.identify(hashed):
+            return BcryptHasher.verify(password, hashed)
+        if WerkzeugHasher.identify(hashed):
+            return WerkzeugHasher.verify(password, hashed)
+        return False
+
+    def hash(self, password):
+        return self._run(self.hasher.hash, password)
+
+    def verify(self, password, hashed):
+        return self._run(self._verify, password, hashed)
+
+    def needs_rehash(self, hashed):
+        return self.hasher.needs_rehash(hashed)
+
+    def verify_and_update(self, password, hashed):
+        """
+        Verificar y, si corresponde, re-hashear con la configuración vigente.
+        Retorna (valido, nuevo_hash_o_None)
+        """
+        if not self.verify(password, hashed):
+            return False, None
+        if self.needs_rehash(hashed):
+            return True, self.hash(password)
+        return True, None
+
+
+passwords = PasswordManager()
@@ -0,0 +1,218 @@
+"""
+Matriz de permisos compilada.
+
+Las tablas `roles`, `permissions` y `role_permissions` se compilan en una
+estructura inmutable (una máscara de bits por rol) para que las
+verificaciones sean O(1) y no toquen la base de datos. Cuando esas tablas
+cambian, el commit incrementa `permission_matrix:version` en el
+almacenamiento compartido y cada worker recompila al ver una versión
+distinta de la de su matriz; `PERMISSION_MATRIX_TTL` queda como red de
+seguridad.
+"""
+import threading
+import time
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.utils.shared_store import shared_store
+
+ADMIN_ROLES = ('admin', 'superadmin')
+
+_VERSION_KEY = 'permission_matrix:version'
+
+# Permisos base por rol. Sólo se aplican a permisos que todavía no fueron
+# cargados en la tabla `permissions`; una vez definidos allí, manda la base.
+DEFAULT_ROLE_PERMISSIONS = {
+    'capacitaciones.ver': ['supervisor', 'operador', 'consulta'],
+    'capacitaciones.crear': ['supervisor'],
+    'capacitaciones.editar': ['supervisor'],
+    'capacitaciones.eliminar': [],
+    'capacitaciones.gestionar_participantes': ['supervisor', 'operador'],
+    'capacitaciones.asignar': ['supervisor'],
+    'capacitaciones.exportar': ['supervisor'],
+}
+
+
+class PermissionMatrix:
+    """Snapshot inmutable rol -> permisos"""
+
+    __slots__ = ('version', 'compiled_at', '_index', '_names', '_role_masks', '_admin_roles')
+
+    def __init__(self, version, permission_names, role_grants, admin_roles):
+        self.version = version
+        self.compiled_at = time.time()
+        self._names = tuple(sorted(permission_names))
+        self._index = {name: 1 << i for i, name in enumerate(self._names)}
+        self._admin_roles = frozenset(admin_roles)
+        self._role_masks = {
+            role_id: self._mask(grants) for role_id, grants in role_grants.items()
+        }
+
+    def _mask(self, names):
+        mask = 0
+        for name in names:
+            mask |= self._index.get(name, 0)
+        return mask
+
+    def is_admin(self, role_id):
+        return role_id in self._admin_roles
+
+    def allows(self, role_id, permission_name):
+        """Verificar un permiso para un rol (O(1), sin acceso a la base)"""
+        if role_id is None:
+            return False
+        if role_id in self._admin_roles:
+            return True
+        bit = self._index.get(permission_name)
+        return bool(bit and self._role_masks.get(role_id, 0) & bit)
+
+    def check_many(self, role_id, permission_names):
+        """Verificar varios permisos de una vez: {permiso: bool}"""
+        if role_id in self._admin_roles:
+            return {name: True for name in permission_names}
+        mask = self._role_masks.get(role_id, 0)
+        return {
+            name: bool(mask & self._index.get(name, 0)) for name in permission_names
+        }
+
+    def permissions_for(self, role_id):
+        """Lista de permisos del rol ('*' para administradores)"""
+        if role_id is None:
+            return []
+        if role_id in self._admin_roles:
+            return ['*']
+        mask = self._role_masks.get(role_id, 0)
+        return [name for name in self._names if mask & self._index[name]]
+
+
+class _MatrixHolder:
+    """Mantiene la matriz vigente y la recompila cuando queda obsoleta"""
+
+    def __init__(self):
+        self._matrix = None
+        self._stale = True
+        self._lock = threading.Lock()
+        self.ttl = 300
+
+    def configure(self, ttl=None):
+        if ttl is not None:
+            self.ttl = ttl
+
+    def mark_stale(self):
+        self._stale = True
+
+    def _fresh(self, matrix, version):
+        return (matrix is not None and not self._stale and matrix.version == version
+                and time.time() - matrix.compiled_at < self.ttl)
+
+    def get(self):
+        # La versión se lee antes de compilar: un cambio posterior fuerza otra compilación
+        version = int(shared_store.get(_VERSION_KEY) or 0)
+        matrix = self._matrix
+        if self._fresh(matrix, version):
+            return matrix
+
+        with self._lock:
+            matrix = self._matrix
+            if not self._fresh(matrix, version):
+                self._stale = False
+                try:
+                    self._matrix = compile_matrix(version)
+                except Exception:
+                    # Si la base no responde, seguir con la última matriz válida
+                    self._stale = True
+                    if matrix is None:
+                        raise
+            return self._matrix
+
+
+_holder = _MatrixHolder()
+
+
+def compile_matrix(version=0):
+    """Compilar roles/permisos/role_permissions en una PermissionMatrix"""
+    from app.models.role import Role, Permission, role_permissions
+
+    roles = db.session.query(Role.id, Role.name).all()
+    permission_rows = db.session.query(Permission.id, Permission.name).all()
+    grants = db.session.query(role_permissions.c.role_id, role_permissions.c.permission_id).all()
+
+    permission_names = {pid: name for pid, name in permission_rows}
+    role_grants = {role_id: set() for role_id, _ in roles}
+    for role_id, permission_id in grants:
+        name = permission_names.get(permission_id)
+        if name and role_id in role_grants:
+            role_grants[role_id].add(name)
+
+    # Permisos base para los que la base todavía no tiene definición
+    roles_by_name = {name: role_id for role_id, name in roles}
+    defined = set(permission_names.values())
+    for name, role_names in DEFAULT_ROLE_PERMISSIONS.items():
+        if name in defined:
+            continue
+        for role_name in role_names:
+            if role_name in roles_by_name:
+                role_grants[roles_by_name[role_name]].add(name)
+
+    all_names = defined | set(DEFAULT_ROLE_PERMISSIONS)
+    admin_roles = [role_id for role_id, name in roles if name in ADMIN_ROLES]
+
+    return PermissionMatrix(version, all_names, role_grants, admin_roles)
+
+
+def get_permission_matrix():
+    """Matriz vigente (se compila la primera vez que se usa)"""
+    return _holder.get()
+
+
+def init_permission_matrix(app):
+    """Configurar la recarga periódica de la matriz"""
+    _holder.configure(ttl=app.config.get('PERMISSION_MATRIX_TTL'))
+
+
+def reload_permission_matrix():
+    """Forzar la recompilación en el próximo acceso, en todos los workers"""
+    shared_store.incr(_VERSION_KEY)
+    _holder.mark_stale()
+
+
+# --- Recarga en caliente ------------------------------------------------------
+
+_RELOAD_KEY = 'permission_matrix_reload'
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_matrix_changes(session, flush_context):
+    from app.models.role import Role, Permission
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Permission):
+            session.info[_RELOAD_KEY] = True
+        elif isinstance(obj, Role):
+            if obj in session.dirty:
+                attrs = inspect(obj).attrs
+                if not (attrs.permissions.history.has_changes() or attrs.name.history.has_changes()):
+                    continue
+            session.info[_RELOAD_KEY] = True
+
+
+@event.listens_for(Session, 'after_bulk_update')
+@event.listens_for(Session, 'after_bulk_delete')
+def _collect_bulk_matrix_changes(context):
+    from app.models.role import Role, Permission
+
+    if context.mapper.class_ in (Role, Permission):
+        context.session.info[_RELOAD_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_matrix_reload(session):
+    if session.info.pop(_RELOAD_KEY, False):
+        reload_permission_matrix()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_matrix_reload(session):
+    session.info.pop(_RELOAD_KEY, None)
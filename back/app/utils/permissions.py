@@ -2,6 +2,7 @@
 from functools import wraps
 from flask_jwt_extended import get_jwt_identity
 from app.utils.responses import error_response
+from app.utils.identity import resolve_identity
 
 def require_permission(permission):
     """
@@ -15,33 +16,14 @@ def require_permission(permission):
             if not user_id:
                 return error_response('UNAUTHORIZED', 'Token requerido', 401)
             
-            # Obtener usuario de la base de datos
-            from app.models.user import User
-            user = User.query.get(user_id)
+            # Identidad resuelta una vez por request (caché compartida)
+            identity = resolve_identity(user_id)
             
-            if not user or not user.activo:
+            if not identity or not identity.activo:
                 return error_response('USER_INACTIVE', 'Usuario inactivo', 403)
             
-            # Verificar si es admin (tiene todos los permisos)
-            if user.role and user.role.name == 'admin':
-                return fn(*args, **kwargs)
-            
-            # Aquí puedes agregar lógica específica para otros permisos
-            # Por ahora, solo permitir admin para capacitaciones
-            allowed_roles_by_permission = {
-                'capacitaciones.ver': ['admin', 'supervisor', 'operador', 'consulta'],
-                'capacitaciones.crear': ['admin', 'supervisor'],
-                'capacitaciones.editar': ['admin', 'supervisor'],
-                'capacitaciones.eliminar': ['admin'],
-                'capacitaciones.gestionar_participantes': ['admin', 'supervisor', 'operador'],
-                'capacitaciones.asignar': ['admin', 'supervisor'],
-                'capacitaciones.exportar': ['admin', 'supervisor']
-            }
-            
-            user_role = user.role.name if user.role else None
-            allowed_roles = allowed_roles_by_permission.get(permission, [])
-            
-            if user_role not in allowed_roles:
+            # Matriz de permisos compilada (admin incluido), sin acceso a la base
+            if not identity.has_permission(permission):
                 return error_response('FORBIDDEN', 'No tienes permisos para esta acción', 403)
             
             return fn(*args, **kwargs)
@@ -0,0 +1,132 @@
+"""
+Rate limiting: claves por identidad y almacenamiento compartido.
+
+- Rutas autenticadas: la clave es el usuario del JWT, no la IP (toda una
+  comisaría sale por el mismo NAT).
+- /login: la clave es el legajo; la IP tiene además un límite más alto.
+- Almacenamiento `sqlite:///ruta/archivo.db`: contadores en un archivo
+  compartido por todos los workers de un mismo host, para despliegues sin
+  Redis. Con `redis://` se sigue usando el backend Redis de `limits`.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from flask import request
+from flask_limiter.util import get_remote_address
+from limits.storage import Storage
+
+
+def rate_limit_key():
+    """Clave por identidad: usuario del JWT si es válido, si no la IP"""
+    from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+    try:
+        verify_jwt_in_request(optional=True)
+        user_id = get_jwt_identity()
+    except Exception:
+        # Token inválido o expirado: lo rechazará la vista; acá se cuenta por IP
+        user_id = None
+
+    if user_id:
+        return f'user:{user_id}'
+    return f'ip:{get_remote_address()}'
+
+
+def login_rate_limit_key():
+    """Clave para /login: el legajo que se intenta autenticar"""
+    data = request.get_json(silent=True) or {}
+    legajo = str(data.get('legajo', '')).strip()
+    if legajo:
+        return f'legajo:{legajo}'
+    return f'ip:{get_remote_address()}'
+
+
+class SQLiteStorage(Storage):
+    """
+    Almacenamiento de `limits` en un archivo SQLite (ventana fija).
+    Seguro entre procesos del mismo host: cada incremento es una transacción
+    `BEGIN IMMEDIATE` sobre el archivo.
+    """
+    STORAGE_SCHEME = ['sqlite']
+
+    _CLEANUP_EVERY = 1000
+
+    def __init__(self, uri, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = uri[len('sqlite:///'):] or 'ratelimit.db'
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._ops = 0
+        with self._conn() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS counters ('
+                'key TEXT PRIMARY KEY, value INTEGER NOT NULL, expiry REAL NOT NULL)'
+            )
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        conn = self._conn()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT value, expiry FROM counters WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                value, expires_at = amount, now + expiry
+            else:
+                value = row[0] + amount
+                expires_at = now + expiry if elastic_expiry else row[1]
+            conn.execute(
+                'INSERT OR REPLACE INTO counters (key, value, expiry) VALUES (?, ?, ?)',
+                (key, value, expires_at)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        self._ops += 1
+        if self._ops % self._CLEANUP_EVERY == 0:
+            conn.execute('DELETE FROM counters WHERE expiry <= ?', (now,))
+        return value
+
+    def get(self, key):
+        row = self._conn().execute(
+            'SELECT value FROM counters WHERE key = ? AND expiry > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self._conn().execute(
+            'SELECT expiry FROM counters WHERE key = ?', (key,)
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self):
+        try:
+            self._conn().execute('SELECT 1')
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        cursor = self._conn().execute('DELETE FROM counters')
+        return cursor.rowcount
+
+    def clear(self, key):
+        self._conn().execute('DELETE FROM counters WHERE key = ?', (key,))
@@ -1,70 +1,158 @@
+import dataclasses
+import json
 import uuid
-from datetime import datetime
-from flask import jsonify
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import current_app, g, has_request_context, request
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # Dependencia opcional: se usa json de la stdlib
+    orjson = None
+
+
+# Fragmentos estáticos del envelope, serializados una sola vez
+_SUCCESS_OPEN = b'{"success":true,"metadata":'
+_ERROR_OPEN = b'{"success":false,"metadata":'
+_DATA = b',"data":'
+_MESSAGE = b',"message":'
+_PAGINATION = b',"pagination":'
+_ERROR = b',"error":'
+_CLOSE = b'}'
+
+
+class RawJSON:
+    """JSON ya serializado (bytes) que se inserta tal cual en el envelope"""
+    __slots__ = ('payload',)
+
+    def __init__(self, payload):
+        self.payload = payload
+
+
+def _default(obj):
+    """Tipos que no son JSON nativo (mismo resultado que el DefaultJSONProvider de Flask)"""
+    if isinstance(obj, date):
+        return http_date(obj)
+    if isinstance(obj, (Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f'Objeto de tipo {type(obj).__name__} no serializable a JSON')
+
+
+# orjson codifica fechas por su cuenta (ISO 8601): se las deriva a _default
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson is not None else 0
+
+
+def dumps(obj):
+    """Serializar a bytes JSON con el backend configurado (orjson si está disponible)"""
+    if isinstance(obj, RawJSON):
+        return obj.payload
+    if orjson is not None and current_app.config.get('JSON_BACKEND', 'auto') != 'std':
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def get_request_id():
+    """X-Request-ID entrante, o uno generado una única vez por request"""
+    if not has_request_context():
+        return str(uuid.uuid4())
+
+    request_id = g.get('request_id')
+    if request_id is None:
+        request_id = request.headers.get('X-Request-ID', '')[:64] or uuid.uuid4().hex
+        g.request_id = request_id
+    return request_id
+
+
+def _metadata():
+    """Fragmento 'metadata' serializado una sola vez por request"""
+    if has_request_context():
+        cached = g.get('_response_metadata')
+        if cached is not None:
+            return cached
+
+    fragment = dumps({
+        'timestamp': datetime.utcnow().isoformat(),
+        'request_id': get_request_id()
+    })
+    if has_request_context():
+        g._response_metadata = fragment
+    return fragment
+
+
+def _build(parts, status):
+    return current_app.response_class(b''.join(parts), status=status, mimetype='application/json')
 
 
 def success_response(data=None, message=None, status=200):
     """
     Formato estandarizado para respuestas exitosas
     """
-    response = {
-        'success': True,
-        'metadata': {
-            'timestamp': datetime.utcnow().isoformat(),
-            'request_id': str(uuid.uuid4())
-        }
-    }
-    
+    parts = [_SUCCESS_OPEN, _metadata()]
+
     if data is not None:
-        response['data'] = data
-    
+        parts += [_DATA, dumps(data)]
+
     if message:
-        response['message'] = message
-    
-    return jsonify(response), status
+        parts += [_MESSAGE, dumps(message)]
 
+    parts.append(_CLOSE)
+    return _build(parts, status), status
 
-def paginated_response(data, page, limit, total, status=200):
+
+def paginated_response(data, page, limit, total, status=200, next_cursor=None,
+                       has_more=None, total_estimated=False):
     """
-    Formato estandarizado para respuestas paginadas
+    Formato estandarizado para respuestas paginadas.
+    Con page=None se responde en modo cursor (next_cursor / has_more).
     """
-    total_pages = (total + limit - 1) // limit  # Redondeo hacia arriba
-    
-    response = {
-        'success': True,
-        'data': data,
-        'pagination': {
+    if page is None:
+        pagination = {
+            'limit': limit,
+            'next_cursor': next_cursor,
+            'has_more': bool(has_more)
+        }
+        if total is not None:
+            pagination['total'] = total
+    else:
+        pagination = {
             'page': page,
             'limit': limit,
             'total': total,
-            'pages': total_pages
-        },
-        'metadata': {
-            'timestamp': datetime.utcnow().isoformat(),
-            'request_id': str(uuid.uuid4())
+            'pages': (total + limit - 1) // limit if total is not None else None  # Redondeo hacia arriba
         }
-    }
-    
-    return jsonify(response), status
+        if has_more is not None:
+            pagination['has_more'] = has_more
+
+    if total_estimated:
+        pagination['total_estimated'] = True
+
+    parts = [
+        _SUCCESS_OPEN, _metadata(),
+        _DATA, dumps(data),
+        _PAGINATION, dumps(pagination),
+        _CLOSE
+    ]
+
+    return _build(parts, status), status
 
 
 def error_response(code, message, status=400, details=None):
     """
     Formato estandarizado para respuestas de error
     """
-    response = {
-        'success': False,
-        'error': {
-            'code': code,
-            'message': message
-        },
-        'metadata': {
-            'timestamp': datetime.utcnow().isoformat(),
-            'request_id': str(uuid.uuid4())
-        }
+    error = {
+        'code': code,
+        'message': message
     }
-    
+
     if details:
-        response['error']['details'] = details
-    
-    return jsonify(response), status
\ No newline at end of file
+        error['details'] = details
+
+    parts = [_ERROR_OPEN, _metadata(), _ERROR, dumps(error), _CLOSE]
+    return _build(parts, status), status
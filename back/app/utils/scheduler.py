@@ -0,0 +1,72 @@
+"""
+Scheduler en proceso para tareas de mantenimiento.
+
+Cada tarea corre en un thread daemon dentro de un app context. Antes de
+ejecutarse toma un lock en el almacenamiento compartido, así con varios
+workers sólo uno la ejecuta por intervalo. Se activa con
+SCHEDULER_ENABLED=true; las mismas tareas están disponibles como comandos
+`flask maintenance ...` para cron.
+"""
+import logging
+import threading
+
+from app.utils.shared_store import shared_store
+
+logger = logging.getLogger(__name__)
+
+
+class Scheduler:
+
+    def __init__(self):
+        self._tasks = {}
+        self._app = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    def register(self, name, fn, interval):
+        """Registrar una tarea: fn() se ejecuta cada `interval` segundos"""
+        self._tasks[name] = (fn, interval)
+
+    def init_app(self, app):
+        self._app = app
+        if app.config.get('SCHEDULER_ENABLED') and not app.testing:
+            self.start()
+
+    def start(self):
+        if self._threads:
+            return
+        for name, (fn, interval) in self._tasks.items():
+            thread = threading.Thread(
+                target=self._loop,
+                args=(name, fn, interval),
+                name=f'scheduler-{name}',
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+
+    def run_task(self, name):
+        """Ejecutar una tarea ahora si ningún otro worker la tiene tomada"""
+        fn, interval = self._tasks[name]
+        if not shared_store.add(f'scheduler:lock:{name}', '1', ttl=max(int(interval) - 1, 1)):
+            return False
+
+        with self._app.app_context():
+            try:
+                fn()
+            except Exception:
+                logger.exception('Error en tarea programada %s', name)
+            finally:
+                from app.extensions import db
+                db.session.remove()
+        return True
+
+    def _loop(self, name, fn, interval):
+        while not self._stop.wait(interval):
+            self.run_task(name)
+
+
+scheduler = Scheduler()
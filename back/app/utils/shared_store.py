@@ -0,0 +1,144 @@
+"""
+Almacenamiento compartido entre workers.
+
+Con SHARED_STORE_URL=redis://... se usa Redis (requiere el paquete `redis`).
+Con memory:// (default) se usa un reemplazo local en memoria, válido para
+desarrollo o despliegues de un solo proceso. Ambos exponen la misma API
+reducida (estilo Redis) que usan el blocklist de tokens, los contadores
+de login y otros módulos.
+"""
+import threading
+import time
+
+
+class LocalStore:
+    """Reemplazo local de Redis: dict en memoria con expiración por clave"""
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.RLock()
+
+    def _alive(self, key):
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def get(self, key):
+        with self._lock:
+            return self._data.get(key) if self._alive(key) else None
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = value
+            if ttl:
+                self._expires[key] = time.time() + ttl
+            else:
+                self._expires.pop(key, None)
+
+    def add(self, key, value, ttl=None):
+        """Guardar sólo si la clave no existe (lock simple). Retorna True si se guardó"""
+        with self._lock:
+            if self._alive(key):
+                return False
+            self.set(key, value, ttl)
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+                self._expires.pop(key, None)
+
+    def incr(self, key, amount=1, ttl=None):
+        """Incrementar un contador; el TTL se fija al crearlo"""
+        with self._lock:
+            created = not self._alive(key)
+            value = int(self._data.get(key, 0)) + amount
+            self._data[key] = value
+            if created and ttl:
+                self._expires[key] = time.time() + ttl
+            return value
+
+    def hset(self, name, field, value):
+        with self._lock:
+            if not self._alive(name):
+                self._data[name] = {}
+            self._data[name][field] = value
+
+    def hgetall(self, name):
+        with self._lock:
+            return dict(self._data[name]) if self._alive(name) else {}
+
+    def hdel(self, name, *fields):
+        with self._lock:
+            if self._alive(name):
+                for field in fields:
+                    self._data[name].pop(field, None)
+
+
+class RedisStore:
+    """Backend Redis (dependencia opcional)"""
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('SHARED_STORE_URL apunta a Redis pero el paquete "redis" no está instalado') from e
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, value, ttl=None):
+        self._client.set(key, value, ex=int(ttl) if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        return bool(self._client.set(key, value, ex=int(ttl) if ttl else None, nx=True))
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*keys)
+
+    def incr(self, key, amount=1, ttl=None):
+        pipe = self._client.pipeline()
+        if ttl:
+            # Crear el contador con TTL sólo si no existe
+            pipe.set(key, 0, ex=int(ttl), nx=True)
+        pipe.incrby(key, amount)
+        return pipe.execute()[-1]
+
+    def hset(self, name, field, value):
+        self._client.hset(name, field, value)
+
+    def hgetall(self, name):
+        return self._client.hgetall(name)
+
+    def hdel(self, name, *fields):
+        if fields:
+            self._client.hdel(name, *fields)
+
+
+def create_store(url):
+    """Crear el backend según la URL configurada"""
+    if url and url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisStore(url)
+    return LocalStore()
+
+
+class SharedStore:
+    """Punto de acceso único al backend configurado"""
+
+    def __init__(self):
+        self.backend = LocalStore()
+
+    def init_app(self, app):
+        self.backend = create_store(app.config.get('SHARED_STORE_URL', 'memory://'))
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+shared_store = SharedStore()
@@ -0,0 +1,357 @@
+"""
+Búsqueda de texto en proceso.
+
+- InvertedIndex: índice invertido con normalización (minúsculas, sin
+  acentos), stopwords y un stemming liviano para español. Es el respaldo de
+  las búsquedas de texto completo cuando la base no es PostgreSQL (SQLite en
+  desarrollo): misma semántica básica que `websearch_to_tsquery` (todas las
+  palabras deben aparecer) y ranking por frecuencia ponderada por campo.
+- PrefixIndex: claves ordenadas por niveles para typeahead (búsqueda por
+  prefijo en O(log n + resultados)).
+- SuggestionIndex: términos con puntaje para sugerencias de búsqueda (por
+  prefijo de cualquiera de sus palabras, los de mayor puntaje primero).
+"""
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from html import escape
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+STOPWORDS = frozenset(
+    'a al algo algun alguna algunas alguno algunos ante antes como con contra cual '
+    'cuando de del desde donde durante e el ella ellas ellos en entre era es esa '
+    'esas ese eso esos esta estas este esto estos fue ha hay la las le les lo los '
+    'mas me mi mis muy ni no nos o os otra otro para pero poco por porque que quien '
+    'se ser si sin sobre son su sus tambien te tiene todo todos tu un una uno unos '
+    'y ya'.split()
+)
+
+# Sufijos más comunes, del más largo al más corto
+_SUFFIXES = (
+    'amientos', 'imientos', 'amiento', 'imiento', 'aciones', 'uciones', 'idades',
+    'mente', 'acion', 'ucion', 'ancia', 'encia', 'ables', 'ibles', 'istas',
+    'idad', 'able', 'ible', 'ista', 'osos', 'osas', 'ivos', 'ivas',
+    'oso', 'osa', 'ivo', 'iva', 'es', 'os', 'as', 's', 'o', 'a', 'e'
+)
+
+_MIN_STEM = 3
+
+
+def normalize(text):
+    """Minúsculas y sin acentos (la ñ se conserva)"""
+    text = (text or '').lower().replace('ñ', '\0')
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return text.replace('\0', 'ñ')
+
+
+def search_key(text):
+    """Clave de búsqueda: sin acentos, en minúsculas y con espacios colapsados"""
+    return ' '.join(_WORD.findall(normalize(text)))
+
+
+def stem(word):
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= _MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    """Términos indexables de un texto (normalizados y con stemming)"""
+    return [stem(w) for w in _WORD.findall(normalize(text)) if w not in STOPWORDS]
+
+
+def first_hit(text, terms):
+    """Offset del primer término de `terms` dentro de `text`, o None"""
+    for match in _WORD.finditer(text or ''):
+        if stem(normalize(match.group())) in terms:
+            return match.start()
+    return None
+
+
+def highlight(text, terms, words=30, start='<mark>', stop='</mark>'):
+    """
+    Fragmento de `text` de hasta `words` palabras alrededor del primer
+    término encontrado, con los términos resaltados (HTML escapado)
+    """
+    if not text:
+        return ''
+
+    tokens = list(_WORD.finditer(text))
+    hits = [i for i, m in enumerate(tokens) if stem(normalize(m.group())) in terms]
+    if not tokens:
+        return escape(text[:200])
+
+    first = max(hits[0] - words // 3, 0) if hits else 0
+    window = tokens[first:first + words]
+    hit_set = set(hits)
+
+    parts = []
+    cursor = window[0].start()
+    for offset, match in enumerate(window, start=first):
+        parts.append(escape(text[cursor:match.start()]))
+        word = escape(match.group())
+        parts.append(f'{start}{word}{stop}' if offset in hit_set else word)
+        cursor = match.end()
+
+    prefix = '… ' if first > 0 else ''
+    suffix = ' …' if first + words < len(tokens) else ''
+    return prefix + ''.join(parts) + suffix
+
+
+class InvertedIndex:
+    """
+    Índice invertido thread-safe: término -> {doc_id: peso}.
+    `weights` indica el peso de cada campo ({'nombre': 2.0, ...}).
+    """
+
+    def __init__(self, weights):
+        self.weights = weights
+        self.ready = False
+        self._postings = {}
+        self._docs = {}   # doc_id -> {campo: texto}
+        self._terms = {}  # doc_id -> set de términos (para poder borrar)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def load(self, documents):
+        """Reemplazar el contenido completo: iterable de (doc_id, {campo: texto})"""
+        with self._lock:
+            self._postings, self._docs, self._terms = {}, {}, {}
+            for doc_id, fields in documents:
+                self._add(doc_id, fields)
+            self.ready = True
+
+    def add(self, doc_id, fields, merge=False):
+        """Indexar un documento; con merge=True se conservan los campos no indicados"""
+        with self._lock:
+            if merge:
+                fields = {**self._docs.get(doc_id, {}), **fields}
+            self._remove(doc_id)
+            self._add(doc_id, fields)
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _add(self, doc_id, fields):
+        scores = {}
+        for field, weight in self.weights.items():
+            for term in tokenize(fields.get(field)):
+                scores[term] = scores.get(term, 0.0) + weight
+
+        for term, score in scores.items():
+            self._postings.setdefault(term, {})[doc_id] = score
+        self._docs[doc_id] = fields
+        self._terms[doc_id] = set(scores)
+
+    def _remove(self, doc_id):
+        for term in self._terms.pop(doc_id, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._docs.pop(doc_id, None)
+
+    def search(self, text):
+        """[(doc_id, score)] de los documentos que contienen todos los términos"""
+        terms = set(tokenize(text))
+        if not terms:
+            return []
+
+        with self._lock:
+            postings = [self._postings.get(term, {}) for term in terms]
+            if not all(postings):
+                return []
+
+            total = len(self._docs) or 1
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+            scored = []
+            for doc_id in candidates:
+                score = sum(
+                    (1 + math.log(p[doc_id])) * math.log(1 + total / len(p))
+                    for p in postings
+                )
+                scored.append((doc_id, score))
+
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored
+
+    def snippet(self, doc_id, text, field, words=30):
+        with self._lock:
+            content = self._docs.get(doc_id, {}).get(field)
+        return highlight(content, set(tokenize(text)), words=words)
+
+
+class PrefixIndex:
+    """
+    Índice de prefijos por niveles para typeahead.
+
+    `tiers` es una lista de (nombre, exacto). Cada documento aporta claves
+    (ya pasadas por `search_key`) en uno o más niveles. Una búsqueda recorre
+    los niveles en orden, que define la relevancia, y dentro de cada nivel las
+    claves en orden alfabético hasta juntar `limit` resultados. En un nivel
+    exacto la clave tiene que coincidir completa.
+    """
+
+    def __init__(self, tiers):
+        self.tiers = tiers
+        self.ready = False
+        self._keys = {name: [] for name, _ in tiers}  # nivel -> [(clave, doc_id)] ordenada
+        self._docs = {}  # doc_id -> (payload, {nivel: [claves]})
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def load(self, documents):
+        """Reemplazar el contenido: iterable de (doc_id, {nivel: [claves]}, payload)"""
+        keys = {name: [] for name, _ in self.tiers}
+        docs = {}
+        for doc_id, tier_keys, payload in documents:
+            docs[doc_id] = (payload, tier_keys)
+            for name, values in tier_keys.items():
+                keys[name].extend((key, doc_id) for key in values if key)
+        for values in keys.values():
+            values.sort()
+
+        with self._lock:
+            self._keys, self._docs = keys, docs
+            self.ready = True
+
+    def add(self, doc_id, tier_keys, payload):
+        with self._lock:
+            self._remove(doc_id)
+            self._docs[doc_id] = (payload, tier_keys)
+            for name, values in tier_keys.items():
+                for key in values:
+                    if key:
+                        insort(self._keys[name], (key, doc_id))
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        entry = self._docs.pop(doc_id, None)
+        if entry is None:
+            return
+        for name, values in entry[1].items():
+            keys = self._keys[name]
+            for key in values:
+                i = bisect_left(keys, (key, doc_id))
+                if i < len(keys) and keys[i] == (key, doc_id):
+                    del keys[i]
+
+    def get(self, doc_id):
+        entry = self._docs.get(doc_id)
+        return entry[0] if entry else None
+
+    def search(self, text, limit=10):
+        """[(doc_id, payload)] en orden de relevancia"""
+        prefix = search_key(text)
+        if not prefix:
+            return []
+
+        results, seen = [], set()
+        with self._lock:
+            for name, exact in self.tiers:
+                keys = self._keys[name]
+                i = bisect_left(keys, (prefix,))
+                while i < len(keys) and len(results) < limit:
+                    key, doc_id = keys[i]
+                    if not key.startswith(prefix) or (exact and key != prefix):
+                        break
+                    if doc_id not in seen:
+                        seen.add(doc_id)
+                        results.append((doc_id, self._docs[doc_id][0]))
+                    i += 1
+                if len(results) >= limit:
+                    break
+        return results
+
+
+class SuggestionIndex:
+    """
+    Términos sugeribles: clave (`search_key`) -> (texto, tipo, puntaje).
+    Cada término se encuentra por el prefijo de cualquiera de sus palabras
+    ("infor" sugiere "Seguridad Informática"); el arreglo ordenado de
+    sufijos de palabras se resuelve con bisect y se toman los `limit` de
+    mayor puntaje.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._terms = {}  # clave -> (texto, tipo, puntaje)
+        self._keys = []   # [(sufijo desde una palabra, clave)] ordenada
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._terms)
+
+    @staticmethod
+    def _suffixes(key):
+        words = key.split()
+        return [' '.join(words[i:]) for i in range(len(words))]
+
+    def load(self, terms):
+        """Reemplazar el contenido: iterable de (clave, texto, tipo, puntaje)"""
+        entries, keys = {}, []
+        for key, text, kind, score in terms:
+            if key:
+                entries[key] = (text, kind, score)
+        for key in entries:
+            keys.extend((suffix, key) for suffix in self._suffixes(key))
+        keys.sort()
+
+        with self._lock:
+            self._terms, self._keys = entries, keys
+            self.ready = True
+
+    def set(self, key, text, kind, score):
+        if not key:
+            return
+        with self._lock:
+            if key not in self._terms:
+                for suffix in self._suffixes(key):
+                    insort(self._keys, (suffix, key))
+            self._terms[key] = (text, kind, score)
+
+    def get(self, key):
+        return self._terms.get(key)
+
+    def remove(self, key):
+        with self._lock:
+            if self._terms.pop(key, None) is None:
+                return
+            for suffix in self._suffixes(key):
+                i = bisect_left(self._keys, (suffix, key))
+                if i < len(self._keys) and self._keys[i] == (suffix, key):
+                    del self._keys[i]
+
+    def search(self, text, limit=8, kinds=None):
+        """[(clave, texto, tipo, puntaje)] por puntaje; sin texto, los más altos"""
+        prefix = search_key(text)
+        with self._lock:
+            if prefix:
+                matched = set()
+                i = bisect_left(self._keys, (prefix,))
+                while i < len(self._keys) and self._keys[i][0].startswith(prefix):
+                    matched.add(self._keys[i][1])
+                    i += 1
+            else:
+                matched = self._terms.keys()
+            candidates = [
+                (key, *self._terms[key]) for key in matched
+                if kinds is None or self._terms[key][1] in kinds
+            ]
+        return heapq.nlargest(limit, candidates, key=lambda item: (item[3], item[0]))
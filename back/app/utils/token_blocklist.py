@@ -0,0 +1,116 @@
+"""
+Blocklist de tokens JWT.
+
+Las revocaciones se escriben en el almacenamiento compartido y cada proceso
+mantiene una copia local (dict en memoria) que se re-sincroniza como mucho
+cada BLOCKLIST_SYNC_INTERVAL segundos, y sólo si cambió la versión. Así el
+caso común ("token no revocado") es una búsqueda en memoria, sin consultas
+a la base. Cada entrada expira junto con el token más largo que puede
+afectar, por lo que el blocklist se mantiene pequeño.
+
+Tipos de entrada:
+    jti:<jti>       un token puntual (logout)
+    sid:<sesion>    todos los tokens de una sesión (revocar sesión)
+    user:<user_id>  tokens emitidos antes de un instante (cambio de contraseña)
+"""
+import threading
+import time
+
+from app.utils.shared_store import shared_store
+
+_ENTRIES_KEY = 'blocklist:entries'
+_VERSION_KEY = 'blocklist:version'
+
+
+class TokenBlocklist:
+
+    def __init__(self):
+        self.sync_interval = 2
+        self._entries = {}  # clave -> (expires_at, valor)
+        self._version = None
+        self._synced_at = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.sync_interval = app.config.get('BLOCKLIST_SYNC_INTERVAL', 2)
+
+    # --- Escritura -----------------------------------------------------------
+
+    def _add(self, key, expires_at, value=''):
+        expires_at = float(expires_at)
+        shared_store.hset(_ENTRIES_KEY, key, f'{expires_at}|{value}')
+        shared_store.incr(_VERSION_KEY)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+
+    def revoke_token(self, jti, expires_at):
+        """Revocar un token puntual hasta su expiración (timestamp)"""
+        self._add(f'jti:{jti}', expires_at)
+
+    def revoke_session(self, sesion_id, expires_at):
+        """Revocar todos los tokens (access y refresh) de una sesión"""
+        self._add(f'sid:{sesion_id}', expires_at)
+
+    def revoke_user_tokens(self, user_id, expires_at):
+        """Revocar todos los tokens del usuario emitidos antes del segundo actual"""
+        # `iat` tiene precisión de segundos: un token emitido en el mismo
+        # segundo (el login posterior al cambio de contraseña) sigue vigente
+        self._add(f'user:{user_id}', expires_at, value=str(int(time.time())))
+
+    # --- Lectura -------------------------------------------------------------
+
+    def _sync(self):
+        now = time.time()
+        if now - self._synced_at < self.sync_interval:
+            return
+
+        with self._lock:
+            if now - self._synced_at < self.sync_interval:
+                return
+            self._synced_at = now
+
+            version = shared_store.get(_VERSION_KEY)
+            if version == self._version:
+                return
+
+            entries = {}
+            expired = []
+            for key, raw in shared_store.hgetall(_ENTRIES_KEY).items():
+                expires_at, _, value = raw.partition('|')
+                expires_at = float(expires_at)
+                if expires_at <= now:
+                    expired.append(key)
+                else:
+                    entries[key] = (expires_at, value)
+
+            if expired:
+                shared_store.hdel(_ENTRIES_KEY, *expired)
+
+            self._entries = entries
+            self._version = version
+
+    def is_revoked(self, jwt_payload):
+        """Verificar un token (payload ya validado por flask-jwt-extended)"""
+        self._sync()
+        entries = self._entries
+        if not entries:
+            return False
+
+        if f'jti:{jwt_payload.get("jti")}' in entries:
+            return True
+
+        sid = jwt_payload.get('sid')
+        if sid and f'sid:{sid}' in entries:
+            return True
+
+        cutoff = entries.get(f'user:{jwt_payload.get("sub")}')
+        if cutoff and jwt_payload.get('iat', 0) < int(float(cutoff[1])):
+            return True
+
+        return False
+
+    def __len__(self):
+        return len(self._entries)
+
+
+blocklist = TokenBlocklist()
@@ -0,0 +1,78 @@
+"""
+INSERT de varias filas que resuelve los choques con filas existentes.
+
+PostgreSQL y SQLite: INSERT ... ON CONFLICT en una sola sentencia. Otros
+motores: una consulta o un UPDATE por clave y INSERT si no había fila.
+"""
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+_INSERTS = {'postgresql': pg_insert, 'sqlite': sqlite_insert}
+
+
+def _dialect_name(executor):
+    get_bind = getattr(executor, 'get_bind', None)
+    return (get_bind() if get_bind else executor).dialect.name
+
+
+def upsert_add(executor, table, rows, keys, counters):
+    """
+    Insertar `rows` (dicts con las mismas columnas) en `table`. Si ya existe
+    una fila con las mismas `keys`, se suman las columnas de `counters` y se
+    reemplaza el resto. `executor` es una Session o una Connection; las
+    claves de `rows` no deben repetirse.
+    """
+    if not rows:
+        return
+
+    insert = _INSERTS.get(_dialect_name(executor))
+    if insert is not None:
+        stmt = insert(table).values(rows)
+        executor.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c[k] for k in keys],
+            set_={
+                column: table.c[column] + stmt.excluded[column] if column in counters else stmt.excluded[column]
+                for column in rows[0] if column not in keys
+            }
+        ))
+        return
+
+    for row in rows:
+        result = executor.execute(
+            update(table)
+            .where(*[table.c[k] == row[k] for k in keys])
+            .values({
+                column: table.c[column] + row[column] if column in counters else row[column]
+                for column in row if column not in keys
+            })
+        )
+        if not result.rowcount:
+            executor.execute(table.insert().values(**row))
+
+
+def insert_missing(executor, table, rows, keys, returning):
+    """
+    Insertar las filas de `rows` que no chocan con una existente por `keys`
+    (índice único) y descartar el resto. Retorna los valores de la columna
+    `returning` de las filas insertadas.
+    """
+    if not rows:
+        return []
+
+    insert = _INSERTS.get(_dialect_name(executor))
+    if insert is not None:
+        stmt = insert(table).values(rows)\
+            .on_conflict_do_nothing(index_elements=[table.c[k] for k in keys])\
+            .returning(table.c[returning])
+        return [value for (value,) in executor.execute(stmt)]
+
+    inserted = []
+    for row in rows:
+        exists = executor.execute(
+            select(table.c[keys[0]]).where(*[table.c[k] == row[k] for k in keys])
+        ).first()
+        if exists is None:
+            executor.execute(table.insert().values(**row))
+            inserted.append(row[returning])
+    return inserted
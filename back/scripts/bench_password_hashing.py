@@ -0,0 +1,75 @@
+# scripts/bench_password_hashing.py
+"""
+Micro-benchmark de verificación de contraseñas.
+
+Reporta logins/seg (verificaciones por segundo) y latencia por costo, usando
+el mismo pool acotado que el endpoint /login, para elegir un costo que entre
+en el presupuesto de latencia.
+
+Uso:
+    python scripts/bench_password_hashing.py --algorithm bcrypt --costs 10 11 12 13
+    python scripts/bench_password_hashing.py --algorithm pbkdf2 --costs 200000 600000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.passwords import PasswordManager, build_hasher
+
+
+def bench(algorithm, cost, workers, logins):
+    manager = PasswordManager()
+    manager.init_app(SimpleNamespace(config={
+        'PASSWORD_HASH_ALGORITHM': algorithm,
+        'PASSWORD_HASH_COST': cost,
+        'PASSWORD_HASH_WORKERS': workers,
+        'PASSWORD_HASH_QUEUE_TIMEOUT': 60,
+    }))
+
+    password = 'Policia2025!'
+    hashed = build_hasher(algorithm, cost).hash(password)
+    latencies = []
+
+    def one_login(_):
+        start = time.perf_counter()
+        assert manager.verify(password, hashed)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    # Simula requests concurrentes: el doble de clientes que workers del pool
+    with ThreadPoolExecutor(max_workers=workers * 2) as clients:
+        list(clients.map(one_login, range(logins)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'logins_per_sec': logins / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de hashing de contraseñas')
+    parser.add_argument('--algorithm', default='bcrypt', choices=['bcrypt', 'pbkdf2', 'scrypt'])
+    parser.add_argument('--costs', nargs='+', type=int, default=[10, 11, 12, 13])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--logins', type=int, default=100)
+    args = parser.parse_args()
+
+    print(f'Algoritmo: {args.algorithm} | workers: {args.workers} | logins por costo: {args.logins}')
+    print(f'{"costo":>10} {"logins/seg":>12} {"p50 (ms)":>10} {"p95 (ms)":>10}')
+    for cost in args.costs:
+        result = bench(args.algorithm, cost, args.workers, args.logins)
+        print(f'{cost:>10} {result["logins_per_sec"]:>12.1f} '
+              f'{result["p50_ms"]:>10.1f} {result["p95_ms"]:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# scripts/bench_personal_typeahead.py
+"""
+Benchmark del typeahead del directorio de personal.
+
+Carga el índice de prefijos con personal sintético (por defecto 100k) y mide
+la latencia por consulta (p50/p99) con prefijos de 1 a 8 caracteres de
+apellidos, nombres y legajos, como los que envía el buscador al tipear.
+
+Uso:
+    python scripts/bench_personal_typeahead.py --personal 100000 --queries 20000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.blueprints.whoiswho.typeahead import TIERS, _entry
+from app.utils.text_search import PrefixIndex
+
+APELLIDOS = ['Pérez', 'González', 'Martínez', 'Rodríguez', 'Fernández', 'López', 'Gómez',
+             'Díaz', 'Sánchez', 'Romero', 'Álvarez', 'Torres', 'Ruiz', 'Ramírez', 'Flores',
+             'Acosta', 'Benítez', 'Medina', 'Herrera', 'Suárez', 'Aguirre', 'Giménez']
+NOMBRES = ['Juan', 'María', 'Carlos', 'Ana', 'Jorge', 'Laura', 'Luis', 'Silvia', 'Diego',
+           'Claudia', 'Martín', 'Verónica', 'Pablo', 'Gabriela', 'Sergio', 'Mónica']
+AREAS = ['Investigaciones', 'Tecnología', 'Tránsito', 'Seguridad', 'Logística', 'Personal']
+
+
+def personal_row(i, rng):
+    apellido = rng.choice(APELLIDOS)
+    if rng.random() < 0.3:
+        apellido += ' ' + rng.choice(APELLIDOS)
+    nombre = rng.choice(NOMBRES)
+    return SimpleNamespace(
+        id=str(i),
+        legajo=str(100000 + i),
+        nombre=nombre,
+        apellido=apellido,
+        rango='Oficial',
+        cargo='Analista',
+        area=rng.choice(AREAS),
+        dependencia='Comisaría 1',
+        email_institucional=f'{nombre[0].lower()}{apellido.split()[0].lower()}{i}@policia.test',
+        foto_path=None
+    )
+
+
+def queries(rows, count, rng):
+    result = []
+    for _ in range(count):
+        row = rng.choice(rows)
+        source = rng.choice([row.apellido, row.nombre, row.legajo, f'{row.nombre} {row.apellido}'])
+        result.append(source[:rng.randint(1, 8)])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del typeahead de personal')
+    parser.add_argument('--personal', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=20000)
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    rows = [personal_row(i, rng) for i in range(args.personal)]
+
+    index = PrefixIndex(TIERS)
+    start = time.perf_counter()
+    index.load((row.id, *_entry(row)) for row in rows)
+    print(f'Carga de {args.personal} personas: {time.perf_counter() - start:.2f} s')
+
+    latencies = []
+    for text in queries(rows, args.queries, rng):
+        start = time.perf_counter()
+        index.search(text, limit=args.limit)
+        latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1e3
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e3
+    print(f'{args.queries} consultas: p50 {p50:.3f} ms  p99 {p99:.3f} ms  máx {latencies[-1] * 1e3:.3f} ms')
+
+    start = time.perf_counter()
+    for row in rows[:1000]:
+        row.apellido += ' Actualizado'
+        index.add(row.id, *_entry(row))
+    elapsed = time.perf_counter() - start
+    print(f'Actualización incremental: {elapsed / 1000 * 1e3:.3f} ms por persona')
+
+
+if __name__ == '__main__':
+    main()
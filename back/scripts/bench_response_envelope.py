@@ -0,0 +1,113 @@
+# scripts/bench_response_envelope.py
+"""
+Benchmark del envelope de respuestas.
+
+Compara el camino anterior (uuid4 + utcnow + jsonify por respuesta) con el
+actual (metadata una vez por request, fragmentos pre-serializados y backend
+JSON rápido) sobre una página de 20 filas de Capacitacion.
+
+Uso:
+    python scripts/bench_response_envelope.py --iterations 5000
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import jsonify
+
+from app import create_app
+from app.utils import responses
+
+
+def legacy_paginated_response(data, page, limit, total, status=200):
+    """Implementación anterior de paginated_response"""
+    total_pages = (total + limit - 1) // limit
+    response = {
+        'success': True,
+        'data': data,
+        'pagination': {'page': page, 'limit': limit, 'total': total, 'pages': total_pages},
+        'metadata': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'request_id': str(uuid.uuid4())
+        }
+    }
+    return jsonify(response), status
+
+
+def capacitacion_row(i):
+    """Fila con la misma forma que Capacitacion.to_dict()"""
+    fecha = datetime(2025, 1, 1) + timedelta(days=i)
+    return {
+        'id': str(uuid.uuid4()),
+        'nombre': f'Curso de Ciberseguridad Operativa {i}',
+        'detalle': 'Detección y respuesta ante incidentes en dependencias policiales',
+        'descripcion_completa': 'Lorem ipsum dolor sit amet, ' * 10,
+        'fecha': fecha.isoformat(),
+        'hora_inicio': '09:00',
+        'hora_fin': '13:00',
+        'area': 'Tecnología',
+        'modalidad': 'Presencial',
+        'es_obligatorio': i % 2 == 0,
+        'fecha_caducidad': (fecha + timedelta(days=365)).isoformat(),
+        'nivel_jerarquico': 'Oficial Subalterno',
+        'tipo_formacion': 'ciberseguridad',
+        'instructor': 'Crio. Inspector Ana Martínez',
+        'ubicacion': 'Instituto Superior de Seguridad Pública',
+        'capacidad_maxima': 40,
+        'costo': None,
+        'horas_academicas': 16.0,
+        'creditos': 2.0,
+        'certificacion': True,
+        'objetivos': 'Capacitar al personal en la gestión de incidentes',
+        'metodologia': 'Teórico-práctica',
+        'evaluacion': 'Examen final',
+        'requisitos_previos': None,
+        'material_requerido': 'Notebook',
+        'observaciones': None,
+        'puestos_objetivo': '["Analista", "Operador"]',
+        'activo': True,
+        'total_participantes': 25,
+        'created_at': fecha.isoformat(),
+        'updated_at': None
+    }
+
+
+def run(label, fn, app, page, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        # Una request por iteración, como en producción
+        with app.test_request_context('/api/capacitaciones'):
+            response, _ = fn(data=page, page=1, limit=20, total=500)
+            response.get_data()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<28} {iterations / elapsed:>10.0f} resp/seg  {elapsed / iterations * 1e6:>8.1f} µs/resp  '
+          f'{len(response.get_data()):>6} bytes')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del envelope de respuestas')
+    parser.add_argument('--iterations', type=int, default=5000)
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    page = [capacitacion_row(i) for i in range(20)]
+
+    run('anterior (jsonify)', legacy_paginated_response, app, page, args.iterations)
+
+    app.config['JSON_BACKEND'] = 'std'
+    run('nuevo (json stdlib)', responses.paginated_response, app, page, args.iterations)
+
+    if responses.orjson is not None:
+        app.config['JSON_BACKEND'] = 'auto'
+        run('nuevo (orjson)', responses.paginated_response, app, page, args.iterations)
+    else:
+        print('orjson no instalado: se omite el backend rápido')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app
+from app.blueprints.capacitacion.suggestions import capacitacion_suggestions
+from app.extensions import db as _db
+from app.models import User, Personal, Capacitacion
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        _db.create_all()
+        yield app
+        # Búsquedas registradas por el test: escribirlas antes de borrar las tablas
+        capacitacion_suggestions.flush()
+        _db.session.remove()
+        _db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def db(app):
+    return _db
+
+
+@pytest.fixture
+def user(db):
+    user = User(username='tester', email='tester@example.com', nombre='Test', apellido='User')
+    user.set_password('Secreta123!')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_headers(user):
+    return {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+
+@pytest.fixture
+def make_personal(db):
+    def make(count, prefix='P'):
+        personal = [
+            Personal(legajo=f'{prefix}{i:05d}', nombre=f'Nombre{i}', apellido=f'Apellido{i}',
+                     rango='Agente', area='Operaciones')
+            for i in range(count)
+        ]
+        db.session.add_all(personal)
+        db.session.commit()
+        return personal
+    return make
+
+
+@pytest.fixture
+def make_capacitacion(db):
+    def make(**fields):
+        capacitacion = Capacitacion(nombre=fields.pop('nombre', 'Curso de prueba'),
+                                    fecha=fields.pop('fecha', datetime(2026, 1, 15)), **fields)
+        db.session.add(capacitacion)
+        db.session.commit()
+        return capacitacion
+    return make
+
+
+@pytest.fixture
+def count_queries(db):
+    """Contar las sentencias SQL ejecutadas dentro del bloque"""
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return counter
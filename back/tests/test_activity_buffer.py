@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+from app.models import Sesion
+from app.utils.activity_buffer import ActivityBuffer
+
+
+def _sesion(db, user):
+    sesion = Sesion(user_id=user.id, expires_at=datetime.utcnow() + timedelta(days=1))
+    db.session.add(sesion)
+    db.session.commit()
+    return sesion
+
+
+def test_flush_descarta_sesion_borrada(db, user):
+    buffer = ActivityBuffer()
+    viva, borrada = _sesion(db, user), _sesion(db, user)
+    viva_id, borrada_id = viva.id, borrada.id
+    when = datetime(2026, 3, 1, 12, 0)
+
+    buffer.touch_session(viva_id, when)
+    buffer.touch_session(borrada_id, when)
+    buffer.record_login(user.id, when)
+
+    db.session.delete(borrada)
+    db.session.commit()
+
+    assert buffer.flush() == 3
+    assert not buffer._sessions and not buffer._users
+
+    db.session.expire_all()
+    assert db.session.get(Sesion, viva_id).last_activity == when
+    assert user.last_login == when
+    assert user.failed_login_attempts == 0
+
+    # Los flush siguientes no quedan trabados por la sesión borrada
+    buffer.touch_session(viva_id, when + timedelta(minutes=1))
+    assert buffer.flush() == 1
+    db.session.expire_all()
+    assert db.session.get(Sesion, viva_id).last_activity == when + timedelta(minutes=1)
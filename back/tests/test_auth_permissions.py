@@ -0,0 +1,20 @@
+import pytest
+
+
+@pytest.mark.parametrize('body', [
+    {'permissions': [{}]},
+    {'permissions': [['capacitaciones.crear']]},
+    {'permissions': 'capacitaciones.crear'},
+    ['capacitaciones.crear']
+])
+def test_permissions_invalidos(client, auth_headers, body):
+    response = client.post('/api/auth/permissions', json=body, headers=auth_headers)
+    assert response.status_code == 400
+    assert response.get_json()['error']['code'] == 'VALIDATION_ERROR'
+
+
+def test_permissions_validos(client, auth_headers):
+    response = client.post('/api/auth/permissions', json={'permissions': ['capacitaciones.crear']},
+                           headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json()['data']['checks'] == {'capacitaciones.crear': False}
@@ -0,0 +1,58 @@
+"""El costo en consultas de las vistas de capacitación no depende de la cantidad de participantes"""
+import pytest
+
+from app.models import ParticipanteCapacitacion
+
+
+@pytest.fixture
+def capacitacion_con(db, make_personal, make_capacitacion):
+    def make(count):
+        capacitacion = make_capacitacion(nombre=f'Curso con {count}')
+        personal = make_personal(count, prefix=f'L{count}-')
+        db.session.add_all(
+            ParticipanteCapacitacion(capacitacion_id=capacitacion.id, personal_id=p.id)
+            for p in personal
+        )
+        db.session.commit()
+        capacitacion_id = capacitacion.id
+        # Cada request arranca con la sesión vacía, como en producción
+        db.session.expunge_all()
+        return capacitacion_id
+    return make
+
+
+def _queries(client, count_queries, auth_headers, url):
+    with count_queries() as statements:
+        response = client.get(url, headers=auth_headers)
+    assert response.status_code == 200, response.get_json()
+    return len(statements), response.get_json()
+
+
+def test_detalle_consultas_constantes(client, count_queries, auth_headers, capacitacion_con):
+    chica, grande = capacitacion_con(5), capacitacion_con(500)
+
+    consultas_chica, data = _queries(client, count_queries, auth_headers, f'/api/capacitaciones/{chica}')
+    assert len(data['data']['participantes']) == 5
+
+    consultas_grande, data = _queries(client, count_queries, auth_headers, f'/api/capacitaciones/{grande}')
+    assert len(data['data']['participantes']) == 500
+
+    assert consultas_grande == consultas_chica
+
+
+def test_participantes_consultas_constantes(client, count_queries, auth_headers, capacitacion_con):
+    chica, grande = capacitacion_con(5), capacitacion_con(500)
+
+    consultas_chica, data = _queries(
+        client, count_queries, auth_headers, f'/api/capacitaciones/{chica}/participantes?limit=100&total=exact'
+    )
+    assert len(data['data']) == 5
+
+    consultas_grande, data = _queries(
+        client, count_queries, auth_headers, f'/api/capacitaciones/{grande}/participantes?limit=100&total=exact'
+    )
+    assert len(data['data']) == 100
+    assert data['pagination']['total'] == 500
+    assert all(p['personal'] is not None for p in data['data'])
+
+    assert consultas_grande == consultas_chica
@@ -0,0 +1,13 @@
+from app import cli
+
+
+def test_purge_auth_usa_maintenance_batch_size(app, db, monkeypatch):
+    llamadas = []
+    monkeypatch.setattr(cli, 'purge_auth_tables',
+                        lambda batch_size, progress: llamadas.append(batch_size) or {})
+    app.config['MAINTENANCE_BATCH_SIZE'] = 250
+    runner = app.test_cli_runner()
+
+    assert runner.invoke(args=['maintenance', 'purge-auth']).exit_code == 0
+    assert runner.invoke(args=['maintenance', 'purge-auth', '--batch-size', '10']).exit_code == 0
+    assert llamadas == [250, 10]
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.blueprints.protocol import extraction
+from app.models.protocolo import Protocolo, ProtocoloDocumento
+
+
+@pytest.fixture
+def make_protocolo(db, tmp_path):
+    def make(filename, content=b'no es un documento'):
+        path = tmp_path / filename
+        path.write_bytes(content)
+        protocolo = Protocolo(nombre=f'Protocolo {filename}', documento_path=str(path))
+        db.session.add(protocolo)
+        db.session.commit()
+        return protocolo
+    return make
+
+
+def test_error_se_reintenta_con_backoff(db, make_protocolo):
+    protocolo = make_protocolo('roto.docx')
+
+    assert extraction.process_document(protocolo.id) == 'error'
+    assert extraction.process_document(protocolo.id) == 'error'
+    documento = db.session.get(ProtocoloDocumento, protocolo.id)
+    assert documento.intentos == 2
+
+    # Segundo intento: espera retry_delay * 2
+    now = documento.extracted_at
+    assert extraction.pending_documents(retry_delay=60, now=now + timedelta(seconds=90)) == []
+    assert extraction.pending_documents(retry_delay=60, now=now + timedelta(seconds=120)) == [protocolo.id]
+    assert extraction.pending_documents(retry_delay=60, max_retries=2, now=now + timedelta(days=1)) == []
+
+
+def test_sin_soporte_se_reencola_con_extractor_disponible(db, make_protocolo, monkeypatch):
+    protocolo = make_protocolo('manual.pdf')
+    db.session.add(ProtocoloDocumento(protocolo_id=protocolo.id, documento_path=protocolo.documento_path,
+                                      estado='sin_soporte', extracted_at=datetime.utcnow()))
+    db.session.commit()
+
+    monkeypatch.setattr(extraction, 'EXTRACTOR_PACKAGES', {'pdf': 'paquete_inexistente'})
+    assert extraction.pending_documents() == []
+
+    monkeypatch.setattr(extraction, 'EXTRACTOR_PACKAGES', {})
+    assert extraction.pending_documents() == [protocolo.id]
+
+
+def test_force_reprocesa_documentos_listos(db, make_protocolo, monkeypatch):
+    protocolo = make_protocolo('manual.pdf')
+    monkeypatch.setitem(extraction.EXTRACTORS, 'pdf', lambda path: ['Texto del manual'])
+
+    assert extraction.process_document(protocolo.id) == 'listo'
+    assert extraction.pending_documents() == []
+    assert extraction.pending_documents(force=True) == [protocolo.id]
+
+    monkeypatch.setitem(extraction.EXTRACTORS, 'pdf', lambda path: ['Texto nuevo'])
+    assert extraction.process_document(protocolo.id) == 'listo'
+    assert db.session.get(ProtocoloDocumento, protocolo.id).texto.startswith('Texto del manual')
+    extraction.process_document(protocolo.id, force=True)
+    assert db.session.get(ProtocoloDocumento, protocolo.id).texto.startswith('Texto nuevo')
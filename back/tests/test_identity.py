@@ -0,0 +1,32 @@
+from sqlalchemy import update
+
+from app.models import User
+from app.utils.identity import resolve_identity
+from app.utils.shared_store import shared_store
+
+# Cada `app.app_context()` simula una request nueva (sin la memoización de `g`)
+
+
+def test_baja_en_otro_worker_invalida_la_cache(app, db, user):
+    with app.app_context():
+        assert resolve_identity(user.id).activo
+
+    # Otro worker da de baja al usuario: esta caché local no se entera,
+    # sólo ve la versión compartida incrementada por su commit
+    db.session.execute(update(User.__table__).where(User.__table__.c.id == user.id).values(activo=False))
+    db.session.commit()
+    with app.app_context():
+        assert resolve_identity(user.id).activo
+
+    shared_store.incr('identity:version')
+    with app.app_context():
+        assert not resolve_identity(user.id).activo
+
+
+def test_commit_local_incrementa_la_version(app, db, user):
+    before = int(shared_store.get('identity:version') or 0)
+    user.activo = False
+    db.session.commit()
+    assert int(shared_store.get('identity:version')) == before + 1
+    with app.app_context():
+        assert not resolve_identity(user.id).activo
@@ -0,0 +1,43 @@
+from app.blueprints.capacitacion import inscripcion
+from app.models import ParticipanteCapacitacion
+
+
+def test_lote_respeta_tope_de_parametros(db, monkeypatch):
+    lotes = []
+    monkeypatch.setattr(inscripcion, '_inscribir_lote',
+                        lambda capacitacion, lote, *args: lotes.append(len(lote)))
+
+    inscripcion.inscribir_masivo(None, [str(i) for i in range(20000)], user_id=None, chunk_size=50000)
+
+    tope = inscripcion.max_chunk_size('sqlite')
+    assert tope * len(inscripcion.COLUMNS) <= inscripcion.MAX_BIND_PARAMS['sqlite']
+    assert lotes == [tope] * (20000 // tope) + [20000 % tope]
+
+
+def test_tope_por_motor():
+    assert inscripcion.max_chunk_size('postgresql') == 65535 // len(inscripcion.COLUMNS)
+    assert inscripcion.max_chunk_size('mssql') == inscripcion.DEFAULT_MAX_BIND_PARAMS // len(inscripcion.COLUMNS)
+
+
+def test_lote_grande_en_sqlite(db, user, make_personal, make_capacitacion):
+    capacitacion = make_capacitacion()
+    ids = [p.id for p in make_personal(inscripcion.max_chunk_size('sqlite') + 10)]
+
+    resultado = inscripcion.inscribir_masivo(capacitacion, ids, user.id, chunk_size=50000)
+
+    assert len(resultado.insertados) == len(ids)
+
+
+def test_inscribir_masivo(db, user, make_personal, make_capacitacion):
+    capacitacion = make_capacitacion()
+    personal = make_personal(5)
+    ids = [p.id for p in personal]
+
+    primera = inscripcion.inscribir_masivo(capacitacion, ids[:3], user.id, chunk_size=2)
+    segunda = inscripcion.inscribir_masivo(capacitacion, ids + ['inexistente'], user.id, chunk_size=2)
+
+    assert primera.insertados == ids[:3]
+    assert segunda.insertados == ids[3:]
+    assert segunda.ya_inscriptos == ids[:3]
+    assert segunda.no_encontrados == ['inexistente']
+    assert ParticipanteCapacitacion.query.filter_by(capacitacion_id=capacitacion.id).count() == 5
@@ -0,0 +1,72 @@
+import pytest
+
+from app.models import Role
+from app.models.personal import PersonalJerarquia
+
+
+@pytest.fixture
+def admin_headers(db, user, auth_headers):
+    role = Role(name='admin')
+    db.session.add(role)
+    db.session.flush()
+    user.role_id = role.id
+    db.session.commit()
+    return auth_headers
+
+
+@pytest.fixture
+def cadena(db, make_personal):
+    a, b, c = make_personal(3, prefix='J')
+    b.superior_directo_id = a.id
+    c.superior_directo_id = b.id
+    db.session.commit()
+    return a, b, c
+
+
+def _closure(db):
+    return sorted(db.session.query(PersonalJerarquia.ancestor_id, PersonalJerarquia.descendant_id,
+                                   PersonalJerarquia.depth).all())
+
+
+@pytest.mark.parametrize('subordinado', [0, 2])
+def test_superior_que_forma_ciclo(client, db, admin_headers, cadena, subordinado):
+    a = cadena[0]
+    antes = _closure(db)
+
+    response = client.put(f'/api/whoiswho/personal/{a.id}/superior',
+                          json={'superior_id': cadena[subordinado].id}, headers=admin_headers)
+
+    assert response.status_code == 400
+    assert response.get_json()['error']['code'] == 'VALIDATION_ERROR'
+    db.session.expire_all()
+    assert a.superior_directo_id is None
+    assert _closure(db) == antes
+
+
+def test_cambiar_superior(client, db, admin_headers, cadena):
+    a, b, c = cadena
+
+    response = client.put(f'/api/whoiswho/personal/{c.id}/superior',
+                          json={'superior_id': a.id}, headers=admin_headers)
+    assert response.status_code == 200
+
+    response = client.get(f'/api/whoiswho/personal/{c.id}/cadena-mando', headers=admin_headers)
+    cadena_mando = response.get_json()['data']['cadena']
+    assert [(p['id'], p['distancia']) for p in cadena_mando] == [(a.id, 1)]
+
+
+def test_cambiar_superior_requiere_permiso(client, auth_headers, cadena):
+    a, b, c = cadena
+    response = client.put(f'/api/whoiswho/personal/{c.id}/superior',
+                          json={'superior_id': a.id}, headers=auth_headers)
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize('depth, esperados', [(None, 2), (1, 1), (0, 0)])
+def test_subordinados_por_profundidad(client, auth_headers, cadena, depth, esperados):
+    a = cadena[0]
+    query = {} if depth is None else {'depth': depth}
+    response = client.get(f'/api/whoiswho/personal/{a.id}/subordinados', query_string=query,
+                          headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.get_json()['data']) == esperados
@@ -0,0 +1,35 @@
+import pytest
+
+from app.utils.pagination import encode_cursor
+
+
+@pytest.mark.parametrize('values', [
+    [{'dt': 'x'}, 'Nombre', 'id'],
+    [{'dt': 5}, 'Nombre', 'id'],
+    [{'a': 1}, 'Nombre', 'id'],
+    [['Apellido'], 'Nombre', 'id'],
+    [1, 'Nombre', 'id'],
+    ['Apellido', 'Nombre'],
+])
+def test_cursor_invalido(client, auth_headers, values):
+    response = client.get('/api/whoiswho/personal', query_string={'cursor': encode_cursor(values)},
+                          headers=auth_headers)
+    assert response.status_code == 400
+    assert response.get_json()['error']['code'] == 'INVALID_CURSOR'
+
+
+def test_cursor_fecha_invalida_en_protocolos(client, auth_headers):
+    response = client.get('/api/protocolos/', query_string={'cursor': encode_cursor([{'dt': 'x'}, 'id'])},
+                          headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_cursor_valido(client, auth_headers, make_personal):
+    make_personal(3)
+    first = client.get('/api/whoiswho/personal', query_string={'cursor': '', 'limit': 2},
+                       headers=auth_headers).get_json()
+    cursor = first['pagination']['next_cursor']
+    second = client.get('/api/whoiswho/personal', query_string={'cursor': cursor, 'limit': 2},
+                        headers=auth_headers).get_json()
+    assert len(first['data']) == 2
+    assert len(second['data']) == 1
@@ -0,0 +1,29 @@
+from app.models import Role
+from app.models.role import Permission, role_permissions
+from app.utils.permission_matrix import get_permission_matrix
+from app.utils.shared_store import shared_store
+
+
+def test_revocacion_en_otro_worker(db):
+    role = Role(name='operador')
+    permission = Permission(name='protocolos.editar')
+    role.permissions.append(permission)
+    db.session.add(role)
+    db.session.commit()
+    assert get_permission_matrix().allows(role.id, 'protocolos.editar')
+
+    # Otro worker revoca el permiso: esta matriz local no se entera hasta
+    # que su commit incrementa la versión compartida
+    db.session.execute(role_permissions.delete())
+    db.session.commit()
+    assert get_permission_matrix().allows(role.id, 'protocolos.editar')
+
+    shared_store.incr('permission_matrix:version')
+    assert not get_permission_matrix().allows(role.id, 'protocolos.editar')
+
+
+def test_commit_local_incrementa_la_version(db):
+    before = int(shared_store.get('permission_matrix:version') or 0)
+    db.session.add(Permission(name='protocolos.crear'))
+    db.session.commit()
+    assert int(shared_store.get('permission_matrix:version')) == before + 1
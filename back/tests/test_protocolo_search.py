@@ -0,0 +1,13 @@
+from app.blueprints.protocol.search import _MARK_START, _MARK_STOP, _safe_headline
+from app.utils.text_search import highlight, tokenize
+
+
+def test_headline_postgres_escapado_como_en_memoria():
+    texto = '<img src=x onerror=alert(1)> Protocolo de evacuación & simulacro'
+    # Lo que devolvería ts_headline con HEADLINE_OPTIONS para la búsqueda 'evacuación'
+    headline = texto.replace('evacuación', f'{_MARK_START}evacuación{_MARK_STOP}')
+
+    esperado = ('&lt;img src=x onerror=alert(1)&gt; Protocolo de '
+                '<mark>evacuación</mark> &amp; simulacro')
+    assert _safe_headline(headline) == esperado
+    assert '<mark>evacuación</mark> &amp; simulacro' in highlight(texto, set(tokenize('evacuación')))
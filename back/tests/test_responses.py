@@ -0,0 +1,26 @@
+import json
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from flask import jsonify
+
+from app.utils.responses import success_response
+
+
+@pytest.mark.parametrize('backend', ['auto', 'std'])
+def test_tipos_no_nativos_como_jsonify(app, backend):
+    app.config['JSON_BACKEND'] = backend
+    data = {
+        'fecha': datetime(2026, 3, 1, 12, 30),
+        'dia': date(2026, 3, 1),
+        'costo': Decimal('1500.50'),
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678')
+    }
+    with app.test_request_context():
+        response, status = success_response(data)
+        expected = jsonify(data).get_json()
+
+    assert status == 200
+    assert json.loads(response.get_data())['data'] == expected
@@ -0,0 +1,30 @@
+def test_sin_texto_devuelve_sugerencias(client, auth_headers, make_capacitacion):
+    make_capacitacion(nombre='Curso de ciberseguridad', tipo_formacion='Curso')
+
+    response = client.get('/api/search', query_string={'q': ''}, headers=auth_headers)
+
+    data = response.get_json()['data']
+    assert response.status_code == 200
+    assert data['resultados'] == []
+    assert 'Curso' in [s['term'] for s in data['sugerencias']]
+
+
+def test_busqueda_incluye_resultados_y_sugerencias(client, auth_headers, make_capacitacion):
+    capacitacion = make_capacitacion(nombre='Curso de ciberseguridad', tipo_formacion='Curso')
+
+    response = client.get('/api/search', query_string={'q': 'ciberseguridad'}, headers=auth_headers)
+
+    data = response.get_json()['data']
+    assert response.status_code == 200
+    assert [(r['tipo'], r['id']) for r in data['resultados']] == [('capacitacion', capacitacion.id)]
+    assert 'sugerencias' in data
+
+
+def test_limit_negativo_se_acota(client, auth_headers, make_capacitacion):
+    for i in range(3):
+        make_capacitacion(nombre=f'Curso de redes {i}')
+
+    response = client.get('/api/search', query_string={'q': 'redes', 'limit': -1}, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert len(response.get_json()['data']['resultados']) == 1
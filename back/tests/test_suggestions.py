@@ -0,0 +1,9 @@
+def test_limit_negativo_se_acota(client, auth_headers, make_capacitacion):
+    for tipo in ('Curso', 'Cursillo', 'Curso taller'):
+        make_capacitacion(nombre=f'{tipo} de redes', tipo_formacion=tipo)
+
+    response = client.get('/api/capacitaciones/suggestions', query_string={'q': 'cur', 'limit': -1},
+                          headers=auth_headers)
+
+    assert response.status_code == 200
+    assert len(response.get_json()['data']) == 1
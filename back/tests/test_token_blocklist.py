@@ -0,0 +1,13 @@
+from unittest import mock
+
+from app.utils.token_blocklist import blocklist
+
+
+def test_cutoff_de_usuario_en_segundos(app):
+    now = 1_800_000_000.75
+    with mock.patch('app.utils.token_blocklist.time.time', return_value=now):
+        blocklist.revoke_user_tokens('user-1', now + 3600)
+        # Mismo segundo que el cambio de contraseña: login posterior, vigente
+        assert not blocklist.is_revoked({'sub': 'user-1', 'jti': 'a', 'iat': int(now)})
+        assert blocklist.is_revoked({'sub': 'user-1', 'jti': 'b', 'iat': int(now) - 1})
+        assert not blocklist.is_revoked({'sub': 'user-2', 'jti': 'c', 'iat': int(now) - 1})
@@ -0,0 +1,8 @@
+def test_limit_negativo_se_acota(client, auth_headers, make_personal):
+    make_personal(3)
+
+    response = client.get('/api/whoiswho/personal/typeahead', query_string={'q': 'Apellido', 'limit': -1},
+                          headers=auth_headers)
+
+    assert response.status_code == 200
+    assert len(response.get_json()['data']) == 1
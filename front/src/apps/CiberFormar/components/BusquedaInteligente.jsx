@@ -1,9 +1,35 @@
 import { useState, useEffect, useRef } from 'react';
 import apiClient from '../../../shared/utils/apiClient';
 
+// Búsqueda global (/api/search): una sola llamada trae resultados de todas
+// las entidades, ordenados por relevancia, y las sugerencias
+const TIPOS = {
+  capacitacion: { icono: '📚', etiqueta: 'Capacitación' },
+  personal: { icono: '👥', etiqueta: 'Personal' },
+  protocolo: { icono: '📄', etiqueta: 'Protocolo' },
+  dependencia: { icono: '🏢', etiqueta: 'Dependencia' }
+};
+
+const FACETAS = {
+  capacitaciones: 'Capacitaciones',
+  personal: 'Personal',
+  protocolos: 'Protocolos',
+  dependencias: 'Dependencias'
+};
+
+const escapeHtml = (text) => String(text ?? '')
+  .replace(/&/g, '&amp;')
+  .replace(/</g, '&lt;')
+  .replace(/>/g, '&gt;')
+  .replace(/"/g, '&quot;')
+  .replace(/'/g, '&#39;');
+
 export default function BusquedaInteligente({ onResultSelect, className = "" }) {
   const [query, setQuery] = useState('');
   const [results, setResults] = useState([]);
+  const [facetas, setFacetas] = useState({});
+  const [parciales, setParciales] = useState([]);
+  const [conceptos, setConceptos] = useState([]);
   const [loading, setLoading] = useState(false);
   const [showResults, setShowResults] = useState(false);
   const [recentSearches, setRecentSearches] = useState([]);
@@ -35,6 +61,9 @@ export default function BusquedaInteligente({ onResultSelect, className = "" })
       return () => clearTimeout(debounceTimer);
     } else {
       setResults([]);
+      setFacetas({});
+      setParciales([]);
+      setConceptos([]);
     }
   }, [query]);
 
@@ -45,9 +74,10 @@ export default function BusquedaInteligente({ onResultSelect, className = "" })
 
   const loadSuggestions = async () => {
     try {
-      const response = await apiClient.get('/capacitaciones/suggestions');
+      // Sin texto, /search devuelve sólo las sugerencias populares
+      const response = await apiClient.get('/search', { params: { q: '' } });
       if (response.data.success) {
-        setSuggestions(response.data.data);
+        setSuggestions(response.data.data.sugerencias || []);
       }
     } catch (error) {
       console.error('Error loading suggestions:', error);
@@ -57,22 +87,24 @@ export default function BusquedaInteligente({ onResultSelect, className = "" })
   const performSearch = async () => {
     setLoading(true);
     try {
-      const response = await apiClient.get('/capacitaciones/search', {
-        params: { 
-          q: query,
-          intelligent: true,
-          include_personal: true,
-          include_concepts: true
-        }
+      const response = await apiClient.get('/search', {
+        params: { q: query, limit: 20 }
       });
       
       if (response.data.success) {
-        setResults(response.data.data);
+        const data = response.data.data;
+        setResults(data.resultados || []);
+        setFacetas(data.facetas || {});
+        setParciales(data.parciales || []);
+        setConceptos(data.sugerencias || []);
         setShowResults(true);
       }
     } catch (error) {
       console.error('Error searching:', error);
       setResults([]);
+      setFacetas({});
+      setParciales([]);
+      setConceptos([]);
     } finally {
       setLoading(false);
     }
@@ -112,10 +144,11 @@ export default function BusquedaInteligente({ onResultSelect, className = "" })
   };
 
   const highlightText = (text, searchQuery) => {
-    if (!searchQuery) return text;
+    const safe = escapeHtml(text);
+    if (!searchQuery) return safe;
     
-    const regex = new RegExp(`(${searchQuery.replace(/[.*+?^${}()|[\]\\]/g, '\\$&')})`, 'gi');
-    return text.replace(regex, '<mark class="bg-yellow-200">$1</mark>');
+    const escapedQuery = escapeHtml(searchQuery).replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+    return safe.replace(new RegExp(`(${escapedQuery})`, 'gi'), '<mark class="bg-yellow-200">$1</mark>');
   };
 
   const getSearchPlaceholder = () => {
@@ -208,100 +241,71 @@ export default function BusquedaInteligente({ onResultSelect, className = "" })
             <div className="max-h-80 overflow-y-auto">
               {results.length > 0 ? (
                 <div>
-                  {/* Capacitaciones */}
-                  {results.capacitaciones && results.capacitaciones.length > 0 && (
-                    <div className="p-4 border-b border-gray-100">
-                      <h4 className="text-xs font-semibold text-gray-500 uppercase tracking-wider mb-2">
-                        📚 Capacitaciones ({results.capacitaciones.length})
-                      </h4>
-                      <div className="space-y-2">
-                        {results.capacitaciones.map((capacitacion) => (
-                          <button
-                            key={capacitacion.id}
-                            onClick={() => handleResultClick({ type: 'capacitacion', data: capacitacion })}
-                            className="w-full text-left p-3 hover:bg-gray-50 rounded-lg"
-                          >
-                            <div className="flex items-center justify-between">
-                              <div>
-                                <div 
-                                  className="font-medium text-gray-900"
-                                  dangerouslySetInnerHTML={{ 
-                                    __html: highlightText(capacitacion.nombre, query) 
-                                  }}
-                                />
-                                <div className="text-sm text-gray-500 mt-1">
-                                  {new Date(capacitacion.fecha).toLocaleDateString()} • {capacitacion.modalidad}
-                                  {capacitacion.area && ` • ${capacitacion.area}`}
-                                </div>
-                                {capacitacion.detalle && (
-                                  <div 
-                                    className="text-xs text-gray-600 mt-1 line-clamp-1"
-                                    dangerouslySetInnerHTML={{ 
-                                      __html: highlightText(capacitacion.detalle, query) 
-                                    }}
-                                  />
-                                )}
-                              </div>
-                              <div className="flex items-center space-x-1">
-                                {capacitacion.es_obligatorio && (
-                                  <span className="px-2 py-1 text-xs bg-red-100 text-red-800 rounded-full">
-                                    Obligatorio
-                                  </span>
-                                )}
-                                <span className="text-xs text-gray-500">
-                                  {capacitacion.participantes_count || 0} part.
-                                </span>
-                              </div>
-                            </div>
-                          </button>
-                        ))}
-                      </div>
+                  {/* Totales por tipo */}
+                  <div className="px-4 pt-3 pb-2 flex flex-wrap gap-2 border-b border-gray-100">
+                    {Object.entries(facetas).map(([tipo, total]) => (
+                      <span key={tipo} className="px-2 py-0.5 text-xs bg-gray-100 text-gray-600 rounded-full">
+                        {FACETAS[tipo] || tipo}: {total}
+                      </span>
+                    ))}
+                  </div>
+
+                  {parciales.length > 0 && (
+                    <div className="px-4 py-2 text-xs text-amber-700 bg-amber-50 border-b border-amber-100">
+                      Resultados parciales: no respondió {parciales.map(t => FACETAS[t] || t).join(', ')}
                     </div>
                   )}
 
-                  {/* Participantes/Personal */}
-                  {results.personal && results.personal.length > 0 && (
-                    <div className="p-4 border-b border-gray-100">
-                      <h4 className="text-xs font-semibold text-gray-500 uppercase tracking-wider mb-2">
-                        👥 Personal ({results.personal.length})
-                      </h4>
-                      <div className="space-y-2">
-                        {results.personal.map((person) => (
-                          <button
-                            key={person.id}
-                            onClick={() => handleResultClick({ type: 'personal', data: person })}
-                            className="w-full text-left p-3 hover:bg-gray-50 rounded-lg"
-                          >
-                            <div className="flex items-center justify-between">
-                              <div>
-                                <div 
-                                  className="font-medium text-gray-900"
-                                  dangerouslySetInnerHTML={{ 
-                                    __html: highlightText(`${person.rango} ${person.nombre} ${person.apellido}`, query) 
-                                  }}
-                                />
-                                <div className="text-sm text-gray-500">
-                                  {person.area} • Legajo: {person.legajo}
-                                </div>
-                              </div>
-                              <span className="text-xs text-gray-500">
-                                {person.capacitaciones_count || 0} capacitaciones
-                              </span>
+                  {/* Resultados ordenados por relevancia */}
+                  <div className="p-2 border-b border-gray-100 space-y-1">
+                    {results.map((item) => (
+                      <button
+                        key={`${item.tipo}-${item.id}`}
+                        onClick={() => handleResultClick({ type: item.tipo, data: item })}
+                        className="w-full text-left p-3 hover:bg-gray-50 rounded-lg"
+                      >
+                        <div className="flex items-start space-x-3">
+                          <span className="text-lg" title={TIPOS[item.tipo]?.etiqueta}>
+                            {TIPOS[item.tipo]?.icono || '🔍'}
+                          </span>
+                          <div className="min-w-0">
+                            <div 
+                              className="font-medium text-gray-900"
+                              dangerouslySetInnerHTML={{ 
+                                __html: highlightText(item.titulo, query) 
+                              }}
+                            />
+                            <div className="text-sm text-gray-500 mt-1">
+                              {TIPOS[item.tipo]?.etiqueta}
+                              {item.subtitulo && ` • ${item.subtitulo}`}
+                              {item.fecha && ` • ${new Date(item.fecha).toLocaleDateString()}`}
                             </div>
-                          </button>
-                        ))}
-                      </div>
-                    </div>
-                  )}
+                            {/* El snippet de protocolos llega escapado, sólo con <mark> */}
+                            {item.snippet && (
+                              <div 
+                                className="text-xs text-gray-600 mt-1 line-clamp-2"
+                                dangerouslySetInnerHTML={{ __html: item.snippet }}
+                              />
+                            )}
+                            {item.documento_match && (
+                              <div className="text-xs text-gray-500 mt-1">
+                                Documento, página {item.documento_match.pagina}
+                              </div>
+                            )}
+                          </div>
+                        </div>
+                      </button>
+                    ))}
+                  </div>
 
                   {/* Conceptos/Temas */}
-                  {results.conceptos && results.conceptos.length > 0 && (
+                  {conceptos.length > 0 && (
                     <div className="p-4">
                       <h4 className="text-xs font-semibold text-gray-500 uppercase tracking-wider mb-2">
-                        🔍 Conceptos relacionados ({results.conceptos.length})
+                        🔍 Conceptos relacionados ({conceptos.length})
                       </h4>
                       <div className="grid grid-cols-2 gap-2">
-                        {results.conceptos.map((concepto, index) => (
+                        {conceptos.map((concepto, index) => (
                           <button
                             key={index}
                             onClick={() => handleSuggestionClick(concepto.term)}